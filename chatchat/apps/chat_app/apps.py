@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ChatAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "chatchat.apps.chat_app"
+
+    def ready(self):
+        # 시그널 리시버 등록
+        from . import receivers  # noqa: F401
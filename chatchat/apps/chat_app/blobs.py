@@ -0,0 +1,116 @@
+# apps/chat/blobs.py
+# 내용 주소(sha256) 기반 이미지 저장. 같은 스티커/스크린샷을 다시 올리면
+# 파일을 새로 쓰지 않고 크기별 이미지 생성도 건너뛴 채 기존 ImageBlob을 공유하는 Image만 만듦.
+import hashlib
+import os
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Image, ImageBlob
+
+HASH_BLOCK = 64 * 1024
+# 멈춘(PROCESSING인 채로 이 시간이 지난) blob으로 보는 기준이자, 같은 blob을 다시 처리하는 최소 간격
+BLOB_RETRY_INTERVAL = timedelta(minutes=10)
+RETRY_KEY = "chat:blob:{blob_id}:retry"
+
+
+def file_sha256(fileobj) -> str:
+    """
+    파일 전체의 sha256 (HASH_BLOCK씩 읽음). 다 읽은 뒤 처음 위치로 되돌림.
+    """
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(HASH_BLOCK), b""):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def _image_from_blob(blob: ImageBlob) -> Image:
+    return Image.objects.create(
+        blob=blob,
+        image=blob.image.name,
+        thumbnail=blob.thumbnail.name or None,
+        preview=blob.preview.name or None,
+        status=blob.status,
+    )
+
+
+def _needs_retry(blob: ImageBlob) -> bool:
+    """
+    같은 내용이 다시 올라왔을 때 이 blob을 다시 처리할지.
+    처리가 실패했거나 PROCESSING인 채로 BLOB_RETRY_INTERVAL이 지났으면(워커가 죽음) 다시 처리하되,
+    같은 blob은 BLOB_RETRY_INTERVAL에 한 번만 다시 예약함.
+    """
+    stuck = (blob.status == Image.Status.PROCESSING
+             and blob.created_at < timezone.now() - BLOB_RETRY_INTERVAL)
+    if blob.status != Image.Status.FAILED and not stuck:
+        return False
+    return cache.add(RETRY_KEY.format(blob_id=blob.id), 1, timeout=BLOB_RETRY_INTERVAL.total_seconds())
+
+
+def store(fileobj, filename: str, sha256: str = None) -> Image:
+    """
+    업로드 파일로 Image를 만듦. 같은 내용의 blob이 이미 있으면 그 blob을 참조만 함.
+    sha256을 이미 알고 있으면(분할 업로드) 다시 계산하지 않음.
+    """
+    from . import imaging
+
+    digest = sha256 or file_sha256(fileobj)
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                # 처리 결과 반영(imaging.process_blob)/삭제(release)와 겹치지 않도록 잠금
+                blob = ImageBlob.objects.select_for_update().filter(sha256=digest).first()
+                if blob is not None:
+                    ImageBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+                    if _needs_retry(blob):
+                        # 실패했거나 멈춘 처리를 다시 예약 (그대로 공유하면 이 파일은 계속 처리되지 않음)
+                        blob.status = Image.Status.PROCESSING
+                        ImageBlob.objects.filter(pk=blob.pk).update(status=blob.status)
+                        Image.objects.filter(blob=blob).update(status=blob.status)
+                        transaction.on_commit(lambda: imaging.schedule_blob(blob.id))
+                    return _image_from_blob(blob)
+
+                blob = ImageBlob(sha256=digest, size=fileobj.size, ref_count=1)
+                ext = os.path.splitext(filename)[1].lower()
+                blob.image.save(f"{digest}{ext}", fileobj, save=False)
+                try:
+                    with transaction.atomic():
+                        blob.save()
+                except IntegrityError:
+                    blob.image.storage.delete(blob.image.name)
+                    raise
+                image = _image_from_blob(blob)
+                transaction.on_commit(lambda: imaging.schedule_blob(blob.id))
+                return image
+        except IntegrityError:
+            fileobj.seek(0)
+            continue  # 같은 내용이 동시에 올라와 다른 요청이 먼저 만들었음 → 그 blob을 참조
+    raise RuntimeError(f"could not store blob {digest}")
+
+
+def release(blob_id) -> None:
+    """
+    Image 하나가 blob 참조를 놓음. 마지막 참조였으면 blob과 파일을 모두 삭제.
+    """
+    with transaction.atomic():
+        blob = ImageBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            ImageBlob.objects.filter(pk=blob_id).update(ref_count=F("ref_count") - 1)
+            return
+        files = [f for f in (blob.image, blob.thumbnail, blob.preview) if f]
+        blob.delete()
+        # 롤백되면 파일이 없는 blob이 남으므로 커밋 후에 지움
+        transaction.on_commit(lambda: _delete_files(files))
+
+
+def _delete_files(files) -> None:
+    for f in files:
+        f.storage.delete(f.name)
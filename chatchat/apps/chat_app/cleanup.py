@@ -0,0 +1,106 @@
+# apps/chat/cleanup.py
+# 메시지에 연결되지 않고 버려진 업로드 정리 (sweep_orphan_images 커맨드가 호출)
+import logging
+import os
+from datetime import timedelta
+from typing import Iterable, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import blobs, uploads
+from .models import Image, ImageBlob, UploadSession
+
+logger = logging.getLogger(__name__)
+
+ORPHAN_GRACE = timedelta(hours=24)  # 업로드 후 이 시간이 지나도 메시지에 연결되지 않은 이미지는 버려진 것으로 봄
+SWEEP_BATCH_SIZE = 500
+
+
+def _files_size(files: Iterable) -> int:
+    total = 0
+    for f in files:
+        if not f:
+            continue
+        try:
+            total += f.storage.size(f.name)
+        except OSError:
+            pass  # 이미 없는 파일
+    return total
+
+
+def _variant_files(obj) -> list:
+    return [obj.image, obj.thumbnail, obj.preview]
+
+
+def _sweep_image_batch(ids, cutoff, dry_run: bool = False) -> Tuple[int, int]:
+    """
+    이미지 한 배치 삭제. 반환: (지운 이미지 수, 지워지는 파일 크기 합 byte). dry_run이면 지울 대상만 집계
+    """
+    with transaction.atomic():
+        # id를 고른 뒤 그 사이 메시지에 연결된 이미지는 지우지 않도록 조건을 다시 걸고 잠금
+        orphans = Image.objects.filter(id__in=ids, message__isnull=True, uploaded_at__lt=cutoff)
+        if not dry_run:
+            orphans = orphans.select_for_update()
+        images = list(orphans.only("id", "blob", "image", "thumbnail", "preview"))
+
+        # blob을 공유하는 이미지는 이 배치가 마지막 참조일 때만 파일이 지워짐 (blobs.release)
+        refs: dict = {}
+        for img in images:
+            if img.blob_id is not None:
+                refs[img.blob_id] = refs.get(img.blob_id, 0) + 1
+        freed_blobs = [blob for blob in ImageBlob.objects.filter(id__in=refs) if blob.ref_count <= refs[blob.id]]
+        reclaimed = sum(_files_size(_variant_files(blob)) for blob in freed_blobs)
+
+        # blob 도입 전 이미지는 파일을 혼자 쓰므로 바로 지움
+        own_files = [f for img in images if img.blob_id is None for f in _variant_files(img) if f]
+        reclaimed += _files_size(own_files)
+        if dry_run or not images:
+            return len(images), reclaimed
+
+        Image.objects.filter(id__in=[img.id for img in images]).delete()  # blob 참조는 post_delete → release
+        transaction.on_commit(lambda: blobs._delete_files(own_files))
+    return len(images), reclaimed
+
+
+def sweep_orphan_images(grace: timedelta = ORPHAN_GRACE, batch_size: int = SWEEP_BATCH_SIZE,
+                        dry_run: bool = False) -> Tuple[int, int]:
+    """
+    grace보다 오래된, 메시지에 연결되지 않은 이미지를 id 순으로 batch_size개씩 삭제.
+    배치마다 따로 커밋하므로 중간에 멈춰도 다시 실행하면 남은 것부터 이어서 처리됨.
+    반환: (지운 이미지 수, 확보한 byte)
+    """
+    cutoff = timezone.now() - grace
+    orphans = Image.objects.filter(message__isnull=True, uploaded_at__lt=cutoff).order_by("id")
+
+    deleted = reclaimed = 0
+    last_id = 0
+    while True:
+        ids = list(orphans.filter(id__gt=last_id).values_list("id", flat=True)[:batch_size])
+        if not ids:
+            break
+        last_id = ids[-1]
+        count, size = _sweep_image_batch(ids, cutoff, dry_run)
+        deleted += count
+        reclaimed += size
+        logger.info("swept %d orphan images (up to id %d)", count, last_id)
+    return deleted, reclaimed
+
+
+def sweep_stale_upload_sessions(grace: timedelta = ORPHAN_GRACE, dry_run: bool = False) -> Tuple[int, int]:
+    """
+    끝내지 않은 분할 업로드의 임시 파일과 세션 삭제. 반환: (지운 세션 수, 확보한 byte)
+    """
+    stale = list(UploadSession.objects.filter(
+        status=UploadSession.Status.OPEN, updated_at__lt=timezone.now() - grace
+    ))
+    reclaimed = 0
+    for session in stale:
+        path = uploads.part_path(session)
+        if os.path.exists(path):
+            reclaimed += os.path.getsize(path)
+            if not dry_run:
+                os.remove(path)
+    if not dry_run:
+        UploadSession.objects.filter(id__in=[s.id for s in stale]).delete()
+    return len(stale), reclaimed
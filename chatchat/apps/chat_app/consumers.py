@@ -1,20 +1,37 @@
 # apps/chat/consumers.py
+import asyncio
 import json
-from typing import Optional, Set, List
+import logging
+import uuid
+from typing import Dict, Optional, Set, List
+from urllib.parse import parse_qs
 
+from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 from django.core.cache import cache
+from django.utils import timezone
 
 from .models import (
     ChatRoom,
     ChatMessage,
+    ChatReadState,
     Image,
     MatchTicket,
     User,
 )
+from . import membership, presence, ratelimit, sequence, snapshot, typing_indicator
+from .groups import room_group, user_group, wire_event
 from .matching import enqueue, remove_from_queue, try_match
-from .serializers import ChatMessageSerializer
+from .outbound import SendQueueMixin
+from .reads import read_coalescer
+from .serializers import ChatMessageSerializer, ImageSerializer, attachment_fields
+from .writer import message_writer
+
+logger = logging.getLogger(__name__)
+
+LEFT_ROOM_CLOSE_CODE = 4003  # 방에서 나갔거나 내보내짐
 
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -24,34 +41,295 @@ def _redis_client():
     return cache.client.get_client()
 
 
+def _redis(func):
+    """
+    presence/순번/rate limit/typing 같은 Redis 호출도 블로킹 I/O라 이벤트 루프에서 바로 부르지 않음.
+    DB는 쓰지 않으므로 database_sync_to_async(DB 스레드) 대신 스레드 풀에서 실행.
+      await _redis(presence.join)(room_id, user_id, channel_name)
+    """
+    return sync_to_async(func, thread_sensitive=False)
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# RoomChatMixin: ChatConsumer / UserChatConsumer 공통 (방 단위 전송/읽음 + 그룹 이벤트)
+# ────────────────────────────────────────────────────────────────────────────────
+class RoomChatMixin:
+    user: Optional[User] = None
+    _typing_timers: Optional[Dict[int, asyncio.Task]] = None  # room_id → "입력 끝" 타이머
+
+    async def send_room_message(self, room_id, data: dict):
+        # 너무 빨리 보내면 DB/브로드캐스트 전에 거절
+        retry_after = await _redis(ratelimit.take_message)(room_id, self.user.id)
+        if retry_after:
+            await self.send(json.dumps({
+                "event": "error",
+                "code": "rate_limited",
+                "room_id": room_id,
+                "client_msg_id": data.get("client_msg_id"),
+                "retry_after": round(retry_after, 2),
+            }))
+            return
+
+        # 메시지를 보냈으면 입력 중 표시는 끝
+        await self.stop_typing(room_id)
+        if settings.CHAT_WRITE_BEHIND:
+            await self._send_write_behind(room_id, data)
+            return
+
+        msg = await self.save_message(room_id, text=data.get("text", ""))
+        msg_id = msg.get("id")
+        img_ids = data.get("img_ids")
+        if img_ids:
+            msg = {**msg, "images": await self.save_image(img_ids, msg_id)}
+
+        # 같은 방 유저들에게 브로드캐스트
+        logger.debug("user %s sent message %s in room %s", self.user.id, msg_id, room_id)
+        await self._broadcast_message(room_id, msg)
+        # 재접속한 클라이언트에게 다시 보내줄 수 있도록 방 Stream에 보관
+        await _redis(sequence.append)(room_id, [(msg["seq"], {**msg, **attachment_fields(msg["images"])})])
+
+    def queue_read(self, room_id, data: dict):
+        try:
+            msg_id = int(data.get("msg_id"))
+        except (TypeError, ValueError):
+            return
+        # 바로 저장/브로드캐스트하지 않고 모아뒀다가 tick마다 한 번에 처리
+        read_coalescer.add(self.channel_layer, room_id, self.user.id, msg_id)
+
+    async def typing(self, room_id):
+        """
+        typing 프레임: (방, 유저)당 TYPING_THROTTLE마다 한 번만 방에 알리고,
+        TYPING_TIMEOUT 동안 다음 프레임이 없으면 서버가 "입력 끝"을 보냄 (클라이언트는 stop 프레임 불필요).
+        """
+        if self._typing_timers is None:
+            self._typing_timers = {}
+        timer = self._typing_timers.pop(room_id, None)
+        if timer:
+            timer.cancel()
+        self._typing_timers[room_id] = asyncio.create_task(self._typing_expire(room_id))
+
+        if await _redis(typing_indicator.should_broadcast)(room_id, self.user.id):
+            await self._broadcast_typing(room_id, True)
+
+    async def stop_typing(self, room_id):
+        timer = (self._typing_timers or {}).pop(room_id, None)
+        if timer is None:
+            return  # 입력 중이 아니었음
+        timer.cancel()
+        await _redis(typing_indicator.reset)(room_id, self.user.id)
+        await self._broadcast_typing(room_id, False)
+
+    async def _typing_expire(self, room_id):
+        await asyncio.sleep(typing_indicator.TYPING_TIMEOUT)
+        self._typing_timers.pop(room_id, None)
+        await _redis(typing_indicator.reset)(room_id, self.user.id)
+        await self._broadcast_typing(room_id, False)
+
+    async def _broadcast_typing(self, room_id, is_typing: bool):
+        await self.channel_layer.group_send(
+            room_group(room_id),
+            wire_event(
+                "chat_typing",
+                {
+                    "event": "typing",
+                    "room_id": room_id,
+                    "user_id": self.user.id,
+                    "nickname": self.user.nickname,
+                    "typing": is_typing,
+                },
+                user_id=self.user.id,
+            ),
+        )
+
+    async def _broadcast_message(self, room_id, msg: dict):
+        """
+        메시지 이벤트의 JSON은 여기서 한 번만 만들어 방 전체에 그대로 전달
+        """
+        await self.channel_layer.group_send(
+            room_group(room_id),
+            wire_event(
+                "chat_message",
+                {"event": "message", "room_id": msg["room"], **msg, **attachment_fields(msg["images"])},
+                # UserChatConsumer의 room_update용
+                room_id=int(msg["room"]),
+                sender=msg["sender"],
+                provisional=bool(msg.get("provisional")),
+                last_message={
+                    "text": msg["text"],
+                    "sender": msg["sender_nickname"],
+                    "created_at": msg["created_at"],
+                },
+            ),
+        )
+
+    async def send_snapshot(self, room_id):
+        """
+        입장 직후 방 상태 한 번에 전송. 캐시가 살아있으면 DB를 타지 않음.
+        """
+        data = await database_sync_to_async(snapshot.build)(room_id)
+        await self.send(json.dumps({"event": "snapshot", "room_id": room_id, **data}))
+
+    async def send_replay(self, room_id, last_seq):
+        """
+        재접속한 클라이언트가 마지막으로 본 seq 이후 빠진 메시지만 다시 보냄.
+        complete=False면 빠진 양이 너무 많으니 REST로 다시 받아야 함.
+        """
+        try:
+            last_seq = int(last_seq)
+        except (TypeError, ValueError):
+            return
+        messages, complete = await database_sync_to_async(sequence.replay)(room_id, last_seq)
+        await self.send(json.dumps({
+            "event": "replay",
+            "room_id": room_id,
+            "messages": messages,
+            "complete": complete,
+        }))
+
+    async def _send_write_behind(self, room_id, data: dict):
+        """
+        write-behind 모드: DB 저장을 기다리지 않고 임시 메시지로 바로 브로드캐스트한 뒤
+        워커의 writer에 저장을 맡김. 텍스트만 있는 메시지는 DB를 전혀 거치지 않음.
+        """
+        client_msg_id = str(data.get("client_msg_id") or uuid.uuid4().hex)
+        img_ids = data.get("img_ids") or []
+        images = await self.get_images(img_ids) if img_ids else []
+        # 보통은 Redis만으로 순번을 받고, 카운터가 없을 때만 DB를 봄
+        seq = await _redis(sequence.next_seq_cached)(room_id)
+        if seq is None:
+            seq = await database_sync_to_async(sequence.next_seq)(room_id)
+        msg = {
+            "id": None,
+            "client_msg_id": client_msg_id,
+            "seq": seq,
+            "provisional": True,
+            "room": room_id,
+            "sender": self.user.id,
+            "sender_nickname": self.user.nickname,
+            "text": data.get("text", ""),
+            "read_by": [self.user.id],
+            "read_count": 1,
+            "created_at": timezone.now().isoformat(),
+            "images": images,
+        }
+        await self._broadcast_message(room_id, msg)
+        await message_writer.submit({
+            "room_id": room_id,
+            "sender_id": self.user.id,
+            "text": msg["text"],
+            "img_ids": img_ids,
+            "client_msg_id": client_msg_id,
+            "seq": msg["seq"],
+            "payload": {**msg, **attachment_fields(images)},  # 저장 후 방 Stream에 보관할 내용
+        })
+
+    # ────────────────────────── DB I/O (sync → async) ──────────────────────────
+
+    @database_sync_to_async
+    def save_message(self, room_id, text: str,):
+        msg = ChatMessage.objects.create(
+            room_id=room_id,
+            sender=self.user,
+            text=text,
+        )
+        return ChatMessageSerializer(msg).data
+
+    @database_sync_to_async
+    def get_user_from_id(self, id):
+        return membership.get_user(id)
+        
+    @database_sync_to_async
+    def save_image(self, image_ids, message_id):
+        """
+        이미지 ID 목록을 받아서 해당 이미지들에 대해 message 필드를 설정합니다.
+        반환: 직렬화된 이미지 목록 (크기별 URL 포함)
+        """
+        # save()로 저장하면 백그라운드 처리(imaging)가 바꾼 파일 필드를 덮어쓸 수 있으므로 update
+        Image.objects.filter(id__in=image_ids).update(message_id=message_id)
+        return ImageSerializer(Image.objects.filter(id__in=image_ids), many=True).data
+
+    @database_sync_to_async
+    def get_images(self, image_ids):
+        """
+        아직 메시지에 연결되지 않은 업로드 이미지 정보 (write-behind 임시 메시지용)
+        """
+        images = Image.objects.filter(id__in=image_ids, message__isnull=True)
+        return ImageSerializer(images, many=True).data
+
+    # ────────────────────────── 그룹 → 클라이언트 전송 ──────────────────────────
+    # 보내는 쪽에서 만든 JSON(event["text"])을 그대로 전달 (groups.wire_event)
+    async def chat_message(self, event):
+        await self.send(event["text"])
+
+    async def chat_message_saved(self, event):
+        await self.send(event["text"])
+
+    async def chat_read(self, event):
+        # 읽음 이벤트는 다음 것이 최신 상태를 다시 알려주므로, 대기열이 넘치면 먼저 버려짐
+        await self.send(event["text"], droppable=True)
+
+    async def chat_typing(self, event):
+        if event["user_id"] != self.user.id:  # 내 입력 표시는 나에게 보내지 않음
+            await self.send(event["text"], droppable=True)
+
+
 # ────────────────────────────────────────────────────────────────────────────────
 # ChatConsumer (토큰/인증 미사용: URL의 user_id 신뢰)
 # ────────────────────────────────────────────────────────────────────────────────
-class ChatConsumer(AsyncWebsocketConsumer):
+class ChatConsumer(SendQueueMixin, RoomChatMixin, AsyncWebsocketConsumer):
     """
-    📡 WebSocket 채팅 Consumer
+    📡 WebSocket 채팅 Consumer (방 하나당 연결 하나)
 
     ── 클라이언트 → 서버 예시 ──
       { "type": "message", "text": "안녕", "attachment": null }
       { "type": "read",    "msg_id": 123 }
+      { "type": "resume",  "last_seq": 41 }   (또는 접속 URL에 ?last_seq=41)
+      { "type": "typing" }                    (입력 중. 멈추면 서버가 알아서 typing=false를 보냄)
 
     ── 서버 → 클라이언트 브로드캐스트 예시 ──
-      { "event": "message", ...serialized ChatMessage... }
-      { "event": "read",    "msg_id": 123, "user_id": 7, "read_count": 2 }
+      { "event": "message", "room_id": 5, "seq": 42, ...serialized ChatMessage... }
+      { "event": "replay",  "room_id": 5, "messages": [ ...seq 42 이후... ], "complete": true }
+      { "event": "read",    "room_id": 5,
+        "reads": [ { "msg_id": 123, "user_id": 7, "read_count": 2 }, ... ] }
+      { "event": "typing",  "room_id": 5, "user_id": 7, "nickname": "...", "typing": true }
+
+    ── 오류 예시 ──
+      { "event": "error", "code": "rate_limited", "room_id": 5, "client_msg_id": "...", "retry_after": 0.5 }
+        (settings.CHAT_RATE_LIMITS의 유저/방 버킷을 넘은 메시지는 저장/브로드캐스트되지 않음)
+
+    ※ 읽음 이벤트는 워커 단위로 READ_FLUSH_INTERVAL 동안 모아서
+       (방, 유저)별 가장 큰 msg_id만 한 번 저장/브로드캐스트함
+
+    ── write-behind 모드 (settings.CHAT_WRITE_BEHIND) ──
+      메시지는 저장 전에 임시 메시지로 먼저 브로드캐스트됨 (id=None)
+      { "event": "message", "id": null, "client_msg_id": "...", "seq": 42, "provisional": true, ... }
+      저장이 끝나면 실제 id를 알려줌 (저장 실패 시 id=null)
+      { "event": "message_saved", "room_id": 5, "client_msg_id": "...", "seq": 42, "id": 123, "created_at": "..." }
+
+    ── 느린 클라이언트 (outbound.SendQueueMixin) ──
+      보낼 프레임이 settings.CHAT_SEND_QUEUE_MAX개 넘게 쌓이면 오래된 read 이벤트부터 버리고,
+      그래도 넘치면 close code 4008(resync)로 끊음 → 클라이언트는 ?last_seq=... 로 재접속
+
+    ── 참가자에서 빠지면 ──
+      방에서 나가거나 내보내지면 더 보내거나 받지 못하도록 close code 4003으로 끊음
     """
     
 
+    presence_task: Optional[asyncio.Task] = None
+
     # ────────────────────────── 연결 / 종료 ──────────────────────────
     async def connect(self):
         # URL 예: /ws/chat/5/4 → room_id = 5
-        self.room_id = self.scope["url_route"]["kwargs"]["room_id"]
-        self.room_grp = f"chat_{self.room_id}"
+        self.room_id = int(self.scope["url_route"]["kwargs"]["room_id"])
+        self.room_grp = room_group(self.room_id)
         self.user_id = self.scope["url_route"]["kwargs"]["user_id"]
 
+        # 유저 정보/참가 여부는 캐시에서 확인 (재접속이 몰려도 DB를 거의 안 탐)
+        # 한 번 확인한 유저 정보는 연결이 끝날 때까지 self.user로 계속 사용
         self.user = await self.get_user_from_id(self.user_id)
 
-        # 방 참가자가 아니면 거부
-        if not await self.user_in_room():
+        # 없는 유저이거나 방 참가자가 아니면 거부
+        if self.user is None or not await self.user_in_room():
             await self.close()
             return
 
@@ -62,142 +340,252 @@ class ChatConsumer(AsyncWebsocketConsumer):
         # channel은 유저마다 완벽히 독립된 것으로, 서버가 웹소켓 연결 하나를 식별하는 고유한 이름입니다.
 
         await self.channel_layer.group_add(self.room_grp, self.channel_name)
+        # 참가자에서 빠졌다는 알림(rooms_left)을 받을 유저 전용 그룹
+        await self.channel_layer.group_add(user_group(self.user.id), self.channel_name)
         await self.accept()
 
-        cur = self._get_online_set(self.room_id)
-        cur.add(self.user.id)  # 현재 유저 ID를 온라인 목록에 추가
-        self._save_online_set(self.room_id, cur)
+        # 이 연결(channel_name)을 온라인으로 등록하고, 주기적으로 만료 시각을 연장
+        await _redis(presence.join)(self.room_id, self.user.id, self.channel_name)
+        self.presence_task = asyncio.create_task(self._presence_heartbeat())
+
+        # 화면을 바로 그릴 수 있도록 최근 메시지/참가자/온라인/읽음 위치를 한 번에 보냄
+        await self.send_snapshot(self.room_id)
+
+        # 재접속이면 끊겨 있던 동안의 메시지만 다시 보내줌
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        if "last_seq" in query:
+            await self.send_replay(self.room_id, query["last_seq"][0])
 
     async def disconnect(self, code):
         await self.channel_layer.group_discard(self.room_grp, self.channel_name)
-        # 연결 종료 시, 현재 유저를 온라인 목록에서 제거
-        cur = self._get_online_set(self.room_id)
-        if self.user and getattr(self.user, 'id', None) in cur:
-            cur.remove(self.user.id)
-            self._save_online_set(self.room_id, cur)
+        if self.user is not None:
+            await self.channel_layer.group_discard(user_group(self.user.id), self.channel_name)
+        # 연결 종료 시, 이 연결만 온라인 목록에서 제거 (다른 탭/기기는 유지)
+        if self.presence_task:
+            self.presence_task.cancel()
+            await _redis(presence.leave)(self.room_id, self.user.id, self.channel_name)
+            await self.stop_typing(self.room_id)
+            # 아직 반영 안 된 읽음 이벤트 / 저장 대기 메시지가 있으면 바로 처리
+            await read_coalescer.flush(self.channel_layer, self.room_id)
+            await message_writer.flush()
+
+    async def _presence_heartbeat(self):
+        """
+        연결이 살아있는 동안 presence 만료 시각을 계속 연장.
+        워커가 죽어서 disconnect가 호출되지 않으면 TTL 후 자동으로 오프라인 처리됨.
+        """
+        while True:
+            await asyncio.sleep(presence.HEARTBEAT_INTERVAL)
+            await _redis(presence.heartbeat)(self.room_id, self.user.id, self.channel_name)
 
     # ────────────────────────── 수신 메시지 처리 ──────────────────────────
     async def receive(self, text_data=None, bytes_data=None):
         data = json.loads(text_data or "{}")
 
         if data.get("type") == "message":
-            msg = await self.save_message(
-                text=data.get("text", ""),
-            )
-            msg_id = msg.get("id")
-            img_ids = data.get("img_ids")
-            img_urls = await self.save_image(img_ids, msg_id) if img_ids else []
-
-            # 같은 방 유저들에게 브로드캐스트
-            print(f"📩 [ChatConsumer] {self.user.username} sent message in room {self.room_id}: {msg['text']}")
-            await self.channel_layer.group_send(
-                self.room_grp,
-                {"type": "chat_message", "msg": msg, "img_urls": img_urls}
-            )
-
+            await self.send_room_message(self.room_id, data)
 
         elif data.get("type") == "read":
-            msg_id = data.get("msg_id")
-            read_cnt = await self.add_read(msg_id)
-            await self.channel_layer.group_send(
-                self.room_grp,
-                {
-                    "type": "chat_read",
-                    "msg_id": msg_id,
-                    "user_id": self.user.id,
-                    "read_count": read_cnt,
-                },
-            )
+            self.queue_read(self.room_id, data)
 
-    # ────────────────────────── DB I/O (sync → async) ──────────────────────────
+        elif data.get("type") == "resume":
+            await self.send_replay(self.room_id, data.get("last_seq"))
 
-    PRESENCE_KEY = "chat:room:{room_id}:online"
-    PRESENCE_TTL = 60 * 60 * 24  # 24h (원하면 조절)
+        elif data.get("type") == "typing":
+            await self.typing(self.room_id)
 
-    def _presence_key(self, room_id: int) -> str:
-        """
-        채팅방의 온라인 유저를 저장할 Redis 키 생성
-        """
-        return self.PRESENCE_KEY.format(room_id=room_id)
+    @database_sync_to_async
+    def user_in_room(self) -> bool:
+        return membership.is_member(self.room_id, self.user.id)
 
-    def _get_online_set(self, room_id: int):
-        """
-        채팅방의 온라인 유저를 저장할 Redis Set 객체 반환
-        """
-        return set(cache.get(self._presence_key(room_id)) or [])
+    # ────────────────────────── 참가자 변경 (receivers.participants_changed) ──────────────────────────
+    async def rooms_joined(self, event):
+        pass  # 다른 방에 들어간 것. 이 연결과는 무관
 
-    def _save_online_set(self, room_id: int, s: set) -> None:
-        """
-        채팅방의 온라인 유저를 Redis에 저장
-        """
-        cache.set(self._presence_key(room_id), list(s), timeout = self.PRESENCE_TTL)
+    async def rooms_left(self, event):
+        if self.room_id not in event["room_ids"]:
+            return
+        # close 전에 바로 방 그룹에서 빼서 그 사이 브로드캐스트도 받지 않음
+        await self.channel_layer.group_discard(self.room_grp, self.channel_name)
+        await self.close(code=LEFT_ROOM_CLOSE_CODE)
 
-    @database_sync_to_async
-    def user_in_room(self) -> bool:
-        return ChatRoom.objects.filter(pk=self.room_id, participants=self.user).exists()
 
-    @database_sync_to_async
-    def save_message(self, text: str,):
-        msg = ChatMessage.objects.create(
-            room_id=self.room_id,
-            sender=self.user,
-            text=text,
-        )
-        return ChatMessageSerializer(msg).data
+# ────────────────────────────────────────────────────────────────────────────────
+# UserChatConsumer: 유저 한 명의 모든 방을 연결 하나로 (토큰/인증 미사용: URL의 user_id 신뢰)
+# ────────────────────────────────────────────────────────────────────────────────
+class UserChatConsumer(SendQueueMixin, RoomChatMixin, AsyncWebsocketConsumer):
+    """
+    📡 방 목록 화면용 멀티플렉스 Consumer. 방마다 소켓을 여는 대신 하나로 모든 방을 구독.
+    모든 프레임에 room_id가 들어감.
 
-    @database_sync_to_async
-    def add_read(self, msg_id: int) -> int:
-        """
-        msg_id 이하(포함) 모든 메시지에 self.user를 read_by에 추가.
-        반환: msg_id 메시지의 read_count
-        """
-        qs = ChatMessage.objects.filter(room_id=self.room_id, pk__lte=msg_id)
-        for m in qs.exclude(read_by=self.user):
-            m.read_by.add(self.user)
+    ── 클라이언트 → 서버 예시 ──
+      { "type": "subscribe",   "room_id": 5 }
+      { "type": "unsubscribe", "room_id": 5 }
+      { "type": "message",     "room_id": 5, "text": "안녕" }
+      { "type": "read",        "room_id": 5, "msg_id": 123 }
+      { "type": "resume",      "room_id": 5, "last_seq": 41 }
+      { "type": "typing",      "room_id": 5 }
+
+    ── 서버 → 클라이언트 예시 ──
+      { "event": "subscribed",   "room_ids": [5, 8] }
+      { "event": "unsubscribed", "room_ids": [5] }
+      { "event": "message" / "message_saved" / "read" / "typing" / "replay", "room_id": 5, ... }   (ChatConsumer와 같음)
+      { "event": "room_update",  "room_id": 5,
+        "last_message": { "text": "...", "sender": "닉네임", "created_at": "..." },
+        "not_read_count": 3 }
+      방에 초대되거나 나가면 자동으로 subscribed / unsubscribed 가 옴
+
+    ※ 안 읽은 수는 구독할 때 한 번 읽어 두고, 이후에는 이벤트만으로 갱신함
+       (다른 사람 메시지 +1, 내 메시지 0, 내 읽음 이벤트는 보낸 쪽이 계산한 값) → 메시지마다 DB를 읽지 않음
+    """
 
-        latest = qs.filter(pk=msg_id).first()
-        return latest.read_by.count() if latest else 0
+    presence_task: Optional[asyncio.Task] = None
+    unread: Optional[Dict[int, int]] = None  # room_id → 내 안 읽은 수
 
+    # ────────────────────────── 연결 / 종료 ──────────────────────────
+    async def connect(self):
+        # URL 예: /ws/chat/user/4/ → user_id = 4
+        self.user_id = self.scope["url_route"]["kwargs"]["user_id"]
+        self.rooms: Set[int] = set()
+        self.unread = {}
+
+        self.user = await self.get_user_from_id(self.user_id)
+        if self.user is None:
+            await self.close()
+            return
+
+        # 방 참가/탈퇴 알림을 받을 유저 전용 그룹
+        await self.channel_layer.group_add(user_group(self.user.id), self.channel_name)
+        await self.accept()
+
+        await self._subscribe(await self.get_room_ids())
+        self.presence_task = asyncio.create_task(self._presence_heartbeat())
+
+    async def disconnect(self, code):
+        if self.user is None:
+            return
+        await self.channel_layer.group_discard(user_group(self.user.id), self.channel_name)
+        if self.presence_task:
+            self.presence_task.cancel()
+        room_ids = list(self.rooms)
+        for room_id in room_ids:
+            await self.stop_typing(room_id)
+        await self._unsubscribe(room_ids, notify=False)
+        for room_id in room_ids:
+            await read_coalescer.flush(self.channel_layer, room_id)
+        await message_writer.flush()
+
+    async def _presence_heartbeat(self):
+        while True:
+            await asyncio.sleep(presence.HEARTBEAT_INTERVAL)
+            await _redis(presence.join_many)(list(self.rooms), self.user.id, self.channel_name)
+
+    async def _subscribe(self, room_ids):
+        room_ids = [room_id for room_id in room_ids if room_id not in self.rooms]
+        if room_ids:
+            self.unread.update(await self.get_not_read_counts(room_ids))
+        for room_id in room_ids:
+            await self.channel_layer.group_add(room_group(room_id), self.channel_name)
+        self.rooms.update(room_ids)
+        await _redis(presence.join_many)(room_ids, self.user.id, self.channel_name)
+        await self.send(json.dumps({"event": "subscribed", "room_ids": sorted(room_ids)}))
+
+    async def _unsubscribe(self, room_ids, notify=True):
+        room_ids = [room_id for room_id in room_ids if room_id in self.rooms]
+        for room_id in room_ids:
+            await self.channel_layer.group_discard(room_group(room_id), self.channel_name)
+        self.rooms.difference_update(room_ids)
+        for room_id in room_ids:
+            self.unread.pop(room_id, None)
+        await _redis(presence.leave_many)(room_ids, self.user.id, self.channel_name)
+        if notify:
+            await self.send(json.dumps({"event": "unsubscribed", "room_ids": sorted(room_ids)}))
+
+    # ────────────────────────── 수신 메시지 처리 ──────────────────────────
+    async def receive(self, text_data=None, bytes_data=None):
+        data = json.loads(text_data or "{}")
+        try:
+            room_id = int(data.get("room_id"))
+        except (TypeError, ValueError):
+            await self.send(json.dumps({"event": "error", "code": "missing_room_id"}))
+            return
+
+        t = data.get("type")
+        if t == "subscribe":
+            if await database_sync_to_async(membership.is_member)(room_id, self.user.id):
+                await self._subscribe([room_id])
+            else:
+                await self.send(json.dumps({"event": "error", "code": "not_participant", "room_id": room_id}))
+
+        elif t == "unsubscribe":
+            await self._unsubscribe([room_id])
+
+        elif room_id not in self.rooms:
+            await self.send(json.dumps({"event": "error", "code": "not_subscribed", "room_id": room_id}))
+
+        elif t == "message":
+            await self.send_room_message(room_id, data)
+
+        elif t == "read":
+            self.queue_read(room_id, data)
+
+        elif t == "resume":
+            await self.send_replay(room_id, data.get("last_seq"))
+
+        elif t == "typing":
+            await self.typing(room_id)
+
+    # ────────────────────────── DB I/O (sync → async) ──────────────────────────
     @database_sync_to_async
-    def get_user_from_id(self, id):
-        return User.objects.get(id=id)
-        
-    @database_sync_to_async
-    def save_image(self, image_ids, message_id):
-        """
-        이미지 ID 목록을 받아서 해당 이미지들에 대해 message 필드를 설정합니다.
-        """
-        images = Image.objects.filter(id__in=image_ids)
-        message = ChatMessage.objects.get(id=message_id)
-        img_urls = [img.image.url for img in images]
-        for img in images:
-            img.message = message
-            img.save()
+    def get_room_ids(self):
+        return list(ChatRoom.objects.filter(participants=self.user).values_list("id", flat=True))
 
-        return img_urls
+    @database_sync_to_async
+    def get_not_read_counts(self, room_ids) -> Dict[int, int]:
+        return ChatReadState.objects.unread_counts(self.user.id, room_ids)
 
     # ────────────────────────── 그룹 → 클라이언트 전송 ──────────────────────────
     async def chat_message(self, event):
+        await super().chat_message(event)
+
+        # 방 목록 갱신: 마지막 메시지 + 내 안 읽은 수 (DB를 읽지 않고 이벤트로 계산)
+        room_id = event["room_id"]
+        if event["sender"] == self.user.id:
+            self.unread[room_id] = 0  # 보낸 사람은 자기 메시지까지 읽은 것으로 처리됨
+        else:
+            self.unread[room_id] = self.unread.get(room_id, 0) + 1
         await self.send(json.dumps({
-            "event": "message",
-            **event["msg"],
-            "img_urls": event.get("img_urls", [])
+            "event": "room_update",
+            "room_id": room_id,
+            "last_message": event["last_message"],
+            "not_read_count": self.unread[room_id],
         }))
 
     async def chat_read(self, event):
-        await self.send(json.dumps({
-            "event": "read",
-            "msg_id": event["msg_id"],
-            "user_id": event["user_id"],
-            "read_count": event["read_count"]
-        }))
-        
- 
+        await super().chat_read(event)
+
+        # 내 읽음 위치가 바뀌었으면(다른 기기 포함) 보낸 쪽이 계산한 안 읽은 수로 갱신
+        counts = dict(zip(event["user_ids"], event["unread_counts"]))
+        if self.user.id in counts:
+            room_id = int(event["room_id"])
+            self.unread[room_id] = counts[self.user.id]
+            await self.send(json.dumps({
+                "event": "room_update",
+                "room_id": room_id,
+                "not_read_count": self.unread[room_id],
+            }))
+
+    async def rooms_joined(self, event):
+        await self._subscribe(event["room_ids"])
+
+    async def rooms_left(self, event):
+        await self._unsubscribe(event["room_ids"])
+
 
 # ────────────────────────────────────────────────────────────────────────────────
 # MatchConsumer (토큰/인증 미사용: payload의 user_id 신뢰)
 # ────────────────────────────────────────────────────────────────────────────────
-class MatchConsumer(AsyncWebsocketConsumer):
+class MatchConsumer(SendQueueMixin, AsyncWebsocketConsumer):
     """
     요청:
       join_queue: { "type": "join_queue", "user_id": 7, "party_size": 3 }
@@ -239,9 +627,10 @@ class MatchConsumer(AsyncWebsocketConsumer):
             await self.send_json({"event": "error", "code": "missing_user_id"})
             return
 
-        try:
-            self.user = await database_sync_to_async(User.objects.get)(id=self.user_id)
-        except User.DoesNotExist:
+        # 같은 연결에서 같은 유저면 처음 확인한 정보를 계속 사용 (프레임마다 조회하지 않음)
+        if self.user is None or self.user.id != self.user_id:
+            self.user = await database_sync_to_async(membership.get_user)(self.user_id)
+        if self.user is None:
             await self.send_json({"event": "error", "code": "invalid_user"})
             return
 
@@ -289,7 +678,7 @@ class MatchConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_add(self.ticket_group, self.channel_name)
 
         # 큐 삽입
-        enqueue(ticket.id, party_size)
+        await _redis(enqueue)(ticket.id, party_size)
 
         # 매칭 시도
         result = await database_sync_to_async(try_match)(party_size)
@@ -331,7 +720,7 @@ class MatchConsumer(AsyncWebsocketConsumer):
             await database_sync_to_async(MatchTicket.objects.filter(id=self.ticket_id).update)(
                 status=MatchTicket.Status.CANCELLED
             )
-            remove_from_queue(self.ticket_id, self.party_size or 0)
+            await _redis(remove_from_queue)(self.ticket_id, self.party_size or 0)
 
     async def _status(self):
         ticket = await database_sync_to_async(
@@ -0,0 +1,26 @@
+# apps/chat/groups.py
+# channel layer 그룹 이름은 여기서만 만든다 (consumer, reads, writer, receivers가 같이 씀)
+import json
+
+
+def room_group(room_id) -> str:
+    """
+    방에 접속한 연결들 (ChatConsumer + 이 방을 구독한 UserChatConsumer)
+    """
+    return f"chat_{room_id}"
+
+
+def user_group(user_id) -> str:
+    """
+    유저 한 명의 UserChatConsumer 연결들 (방 참가/탈퇴 알림용)
+    """
+    return f"chat_user_{user_id}"
+
+
+def wire_event(event_type: str, frame: dict, **meta) -> dict:
+    """
+    그룹에 보낼 이벤트. 클라이언트에 갈 JSON(text)은 보내는 쪽에서 한 번만 만들고
+    받는 consumer들은 그대로 self.send(text)만 함 → 방 인원 수만큼 json.dumps 하지 않음.
+    meta: 받는 쪽이 text를 다시 파싱하지 않고 쓸 작은 값들 (UserChatConsumer의 room_update 등)
+    """
+    return {"type": event_type, "text": json.dumps(frame), **meta}
@@ -0,0 +1,221 @@
+# apps/chat/imaging.py
+# 업로드된 이미지를 크기별로 다시 인코딩 (썸네일/미리보기/원본).
+# 디코딩/리사이즈/인코딩은 CPU를 많이 쓰므로 프로세스 풀에서, 파일 저장/DB 갱신은 웹 프로세스의 스레드에서 함
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image as PILImage, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# 이름: 긴 변 최대 px
+VARIANTS = {
+    "thumbnail": 256,
+    "preview": 1080,
+    "original": 2560,
+}
+PROFILE_THUMB_SIZE = 256
+
+# WebP를 지원하지 않는 Pillow 빌드에서는 JPEG로
+IMAGE_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+IMAGE_QUALITY = 80         # 0~100. 이보다 높게 인코딩하지 않음
+IMAGE_WORKERS = 2          # CPU 프로세스 수
+
+_EXT = {"WEBP": "webp", "JPEG": "jpg"}
+
+_cpu_pool: Optional[ProcessPoolExecutor] = None
+_io_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _pools():
+    global _cpu_pool, _io_pool
+    if _cpu_pool is None:
+        _cpu_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        _io_pool = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="imaging")
+    return _cpu_pool, _io_pool
+
+
+# ────────────────────────── 프로세스 풀에서 실행 (Django 사용 안 함) ──────────────────────────
+def _encode(img: PILImage.Image, max_side: int) -> bytes:
+    img = img.copy()
+    img.thumbnail((max_side, max_side))  # 비율 유지, 이미 작으면 그대로
+    img.info = {}  # EXIF/ICC/XMP 등 메타데이터 제거
+    if IMAGE_FORMAT == "JPEG" and img.mode != "RGB":
+        img = img.convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, IMAGE_FORMAT, quality=IMAGE_QUALITY, optimize=True)
+    return buf.getvalue()
+
+
+def render(data: bytes, sizes: Dict[str, int]) -> Dict[str, bytes]:
+    """
+    원본 바이트 → {이름: 인코딩된 바이트}. EXIF 회전은 픽셀에 반영한 뒤 메타데이터를 버림.
+    """
+    with PILImage.open(io.BytesIO(data)) as src:
+        img = ImageOps.exif_transpose(src)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        return {name: _encode(img, max_side) for name, max_side in sizes.items()}
+
+
+# ────────────────────────── 웹 프로세스 (스레드) ──────────────────────────
+def _variant_name(path: str, variant: str) -> str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem}_{variant}.{_EXT[IMAGE_FORMAT]}"
+
+
+def _render_file(field) -> Dict[str, bytes]:
+    with field.open("rb") as f:
+        data = f.read()
+    cpu_pool, _ = _pools()
+    return cpu_pool.submit(render, data, VARIANTS).result()
+
+
+def _save_variants(obj, rendered: Dict[str, bytes]) -> str:
+    """
+    obj(Image/ImageBlob)의 파일 필드를 크기별 결과로 바꿈 (DB 저장은 호출한 쪽에서). 반환: 업로드 원본 이름
+    """
+    raw_name = obj.image.name
+    for variant in ("thumbnail", "preview"):
+        getattr(obj, variant).save(_variant_name(raw_name, variant), ContentFile(rendered[variant]), save=False)
+    obj.image.save(_variant_name(raw_name, "original"), ContentFile(rendered["original"]), save=False)
+    return raw_name
+
+
+def process_blob(blob_id) -> None:
+    """
+    blob 하나의 크기별 파일을 만들고, 이 blob을 쓰는 모든 Image에 반영
+    """
+    from .models import Image, ImageBlob
+
+    blob = ImageBlob.objects.filter(id=blob_id).first()
+    if blob is None or blob.status == Image.Status.READY:
+        return
+    try:
+        rendered = _render_file(blob.image)
+    except Exception:
+        logger.exception("failed to process image blob %s", blob_id)
+        with transaction.atomic():
+            ImageBlob.objects.filter(id=blob_id).update(status=Image.Status.FAILED)
+            Image.objects.filter(blob_id=blob_id).update(status=Image.Status.FAILED)
+        return
+
+    raw_name = _save_variants(blob, rendered)
+    with transaction.atomic():
+        # 그 사이 같은 blob으로 만들어지는 Image가 옛 파일 이름을 복사하지 않도록 잠금 (blobs.store)
+        exists = ImageBlob.objects.select_for_update().filter(id=blob_id).exists()
+        if exists:
+            fields = {
+                "image": blob.image.name,
+                "thumbnail": blob.thumbnail.name,
+                "preview": blob.preview.name,
+                "status": Image.Status.READY,
+            }
+            ImageBlob.objects.filter(id=blob_id).update(**fields)
+            Image.objects.filter(blob_id=blob_id).update(**fields)
+    if not exists:
+        # 그 사이 마지막 참조가 사라져 삭제됨. 업로드 원본은 blobs.release가 지우고,
+        # 방금 쓴 크기별 파일은 아무 행도 가리키지 않으므로 여기서 지움
+        for f in (blob.image, blob.thumbnail, blob.preview):
+            f.storage.delete(f.name)
+        return
+    blob.image.storage.delete(raw_name)  # 메타데이터가 남아 있는 업로드 원본은 지움
+
+
+def process_image(image_id) -> None:
+    """
+    blob 없이 파일을 혼자 쓰는 (blob 도입 전) 채팅 이미지 처리
+    """
+    from .models import Image
+
+    try:
+        img = Image.objects.get(id=image_id)
+    except Image.DoesNotExist:
+        return
+    if img.blob_id:
+        process_blob(img.blob_id)
+        return
+    if img.status == Image.Status.READY:
+        return  # 이미 처리됨 (다시 인코딩하면 화질만 나빠짐)
+    try:
+        rendered = _render_file(img.image)
+    except Exception:
+        logger.exception("failed to process image %s", image_id)
+        Image.objects.filter(id=image_id).update(status=Image.Status.FAILED)
+        return
+
+    raw_name = _save_variants(img, rendered)
+    img.status = Image.Status.READY
+    img.save(update_fields=["image", "thumbnail", "preview", "status"])
+    img.image.storage.delete(raw_name)
+
+
+def process_profile(user_id) -> None:
+    """
+    프로필 이미지의 목록용 썸네일 생성
+    """
+    from . import membership, room_list
+    from .models import ChatRoom, User
+
+    user = User.objects.filter(id=user_id).only("id", "profile_img", "profile_thumb").first()
+    if user is None or not user.profile_img:
+        return
+    try:
+        with user.profile_img.open("rb") as f:
+            data = f.read()
+        cpu_pool, _ = _pools()
+        rendered = cpu_pool.submit(render, data, {"thumbnail": PROFILE_THUMB_SIZE}).result()
+    except Exception:
+        logger.exception("failed to make profile thumbnail for user %s", user_id)
+        return
+
+    old_thumb = user.profile_thumb.name if user.profile_thumb else None
+    user.profile_thumb.save(thumb_name_for(user.profile_img.name), ContentFile(rendered["thumbnail"]), save=False)
+    # save()를 쓰면 post_save가 다시 불려서 또 예약되므로 update로 저장
+    User.objects.filter(id=user_id).update(profile_thumb=user.profile_thumb.name)
+    membership.invalidate_user(user_id)
+    # 방 목록의 프로필 이미지가 바뀜
+    ChatRoom.objects.bump_version_for_user(user_id)
+    room_list.invalidate_user_rooms(user_id)
+    if old_thumb:
+        user.profile_thumb.storage.delete(old_thumb)
+
+
+def thumb_name_for(profile_img_name: str) -> str:
+    return _variant_name(profile_img_name, "thumbnail")
+
+
+def profile_thumb_stale(user) -> bool:
+    """
+    프로필 이미지가 있는데 그 이미지로 만든 썸네일이 아니면 True
+    (썸네일 파일 이름이 원본 이름으로 시작함. 저장소가 중복 방지 접미사를 붙여도 앞부분은 같음)
+    """
+    if not user.profile_img:
+        return False
+    expected = os.path.splitext(thumb_name_for(user.profile_img.name))[0]
+    return not (user.profile_thumb and os.path.basename(user.profile_thumb.name).startswith(expected))
+
+
+def _run(func, *args):
+    try:
+        func(*args)
+    finally:
+        close_old_connections()  # 스레드마다 생긴 DB 연결 정리
+
+
+def schedule_blob(blob_id) -> None:
+    """
+    백그라운드에서 처리 (업로드 응답을 기다리게 하지 않음)
+    """
+    _, io_pool = _pools()
+    io_pool.submit(_run, process_blob, blob_id)
+
+
+def schedule_profile(user_id) -> None:
+    _, io_pool = _pools()
+    io_pool.submit(_run, process_profile, user_id)
@@ -0,0 +1,35 @@
+# 벤치마크 커맨드 공용 헬퍼 (이름이 _로 시작해서 manage.py 커맨드로는 안 잡힘)
+import math
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def throwaway_database():
+    """
+    벤치마크용 임시 테스트 DB를 만들고 끝나면 지움. 운영 DB는 건드리지 않음.
+    """
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    idx = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+    return ordered[idx]
+
+
+def summarize(values) -> str:
+    """
+    ms 단위 측정값 목록 → "p50=.. p99=.. mean=.." 문자열
+    """
+    mean = sum(values) / len(values) if values else 0.0
+    return (f"n={len(values)} p50={percentile(values, 50):.2f}ms "
+            f"p99={percentile(values, 99):.2f}ms mean={mean:.2f}ms")
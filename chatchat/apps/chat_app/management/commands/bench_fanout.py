@@ -0,0 +1,77 @@
+import json
+import time
+
+from channels_redis.core import RedisChannelLayer
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from chatchat.apps.chat_app.groups import wire_event
+from ._bench import summarize
+
+
+def _sample_message(room_id: int, seq: int) -> dict:
+    # ChatMessageSerializer 결과와 같은 모양의 메시지
+    return {
+        "id": 1000 + seq,
+        "seq": seq,
+        "room": room_id,
+        "sender": 7,
+        "sender_nickname": "벤치",
+        "text": "안녕하세요 " * 8,
+        "read_by": [7],
+        "read_count": 1,
+        "created_at": timezone.now().isoformat(),
+        "images": [],
+    }
+
+
+def _per_recipient(layer, msg: dict, members: int) -> None:
+    # 이전 방식: 이벤트에 dict를 실어 보내고, 받는 consumer마다 json.dumps
+    raw = layer.serialize({"type": "chat_message", "msg": msg, "img_urls": []})
+    for _ in range(members):
+        event = layer.deserialize(raw)
+        json.dumps({
+            "event": "message",
+            "room_id": event["msg"]["room"],
+            **event["msg"],
+            "img_urls": event.get("img_urls", []),
+        })
+
+
+def _serialize_once(layer, msg: dict, members: int) -> None:
+    # 지금 방식: 보내는 쪽에서 JSON을 한 번 만들고, 받는 consumer는 text를 그대로 전달
+    raw = layer.serialize(wire_event(
+        "chat_message",
+        {"event": "message", "room_id": msg["room"], **msg, "img_urls": []},
+        room_id=msg["room"],
+        sender=msg["sender"],
+        provisional=False,
+        last_message={"text": msg["text"], "sender": msg["sender_nickname"],
+                      "created_at": msg["created_at"]},
+    ))
+    for _ in range(members):
+        event = layer.deserialize(raw)
+        event["text"]
+
+
+class Command(BaseCommand):
+    help = ("방 브로드캐스트 한 건의 fan-out 비용(직렬화 + 수신 consumer 처리)을 "
+            "수신자별 json.dumps 방식과 한 번만 직렬화하는 방식으로 비교 (Redis/DB 불필요)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=500)
+        parser.add_argument("--members", type=int, nargs="+", default=[2, 10, 200])
+
+    def handle(self, *args, **options):
+        # serialize/deserialize만 쓰므로 Redis에 연결하지 않음
+        layer = RedisChannelLayer()
+        for members in options["members"]:
+            for label, fanout in (("per-recipient ", _per_recipient),
+                                  ("serialize-once", _serialize_once)):
+                timings = []
+                for seq in range(options["messages"]):
+                    msg = _sample_message(room_id=1, seq=seq)
+                    started = time.perf_counter()
+                    fanout(layer, msg, members)
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(f"members={members:<4} {label} {summarize(timings)}")
@@ -0,0 +1,66 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from chatchat.apps.chat_app.models import ChatRoom, User
+from chatchat.apps.chat_app.routing import websocket_urlpatterns
+from ._bench import summarize, throwaway_database
+
+
+async def _receive_event(comm, event: str) -> dict:
+    # 기다리는 이벤트가 올 때까지 다른 이벤트(message_saved 등)는 건너뜀
+    while True:
+        data = json.loads(await comm.receive_from(timeout=10))
+        if data.get("event") == event:
+            return data
+
+
+class Command(BaseCommand):
+    help = ("ChatConsumer 메시지 전송→수신 지연(p50/p99)을 동기 저장 경로와 "
+            "write-behind 경로로 비교 (임시 테스트 DB 사용)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=200)
+        parser.add_argument("--members", type=int, default=2)
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            users = [User.objects.create(username=f"bench{i}", nickname=f"bench{i}")
+                     for i in range(options["members"])]
+            room = ChatRoom.objects.create_room(participants=users, title="bench")
+
+            for write_behind in (False, True):
+                # 한 유저가 몰아서 보내므로 속도 제한은 사실상 끔
+                unlimited = {name: (1e6, 1e6) for name in settings.CHAT_RATE_LIMITS}
+                with override_settings(CHAT_WRITE_BEHIND=write_behind, CHAT_RATE_LIMITS=unlimited):
+                    latencies = async_to_sync(self._run)(room, users, options["messages"])
+                label = "write-behind" if write_behind else "sync      "
+                self.stdout.write(f"{label} {summarize(latencies)}")
+
+    async def _run(self, room, users, count):
+        app = URLRouter(websocket_urlpatterns)
+        comms = [WebsocketCommunicator(app, f"ws/chat/{room.id}/{u.id}/") for u in users]
+        for comm in comms:
+            await comm.connect()
+        sender, receiver = comms[0], comms[-1]
+
+        latencies = []
+        try:
+            for i in range(count):
+                started = time.perf_counter()
+                await sender.send_to(text_data=json.dumps({"type": "message", "text": f"bench {i}"}))
+                await _receive_event(receiver, "message")
+                latencies.append((time.perf_counter() - started) * 1000)
+            # 남은 저장 작업까지 끝낸 뒤 종료
+            await asyncio.sleep(0.2)
+        finally:
+            for comm in comms:
+                await comm.disconnect()
+        return latencies
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import tempfile
+import time
+import tracemalloc
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from chatchat.apps.chat_app import uploads
+from chatchat.apps.chat_app.models import User
+from chatchat.apps.chat_app.views import ImageUploadView, UploadChunkView, UploadCompleteView, UploadInitView
+from ._bench import throwaway_database
+
+MB = 1024 * 1024
+
+
+def _call(view, request, **kwargs):
+    """
+    요청 처리 시간(sec)과 그동안 늘어난 Python 메모리 최대치(byte). 요청 본문을 만드는 비용은 빼고 잼.
+    """
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    response = view(request, **kwargs)
+    elapsed = time.perf_counter() - started
+    return response, elapsed, tracemalloc.get_traced_memory()[1] - base
+
+
+class Command(BaseCommand):
+    help = ("이미지 업로드 처리량(MB/s)과 요청 처리 중 워커 메모리 최대 증가량을 "
+            "기존 multipart 업로드와 분할 업로드로 비교 (임시 테스트 DB/임시 폴더 사용)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size-mb", type=int, default=20)
+        parser.add_argument("--chunk-mb", type=int, default=uploads.UPLOAD_CHUNK_SIZE // MB)
+
+    def handle(self, *args, **options):
+        data = os.urandom(options["size_mb"] * MB)
+        tmp = tempfile.mkdtemp()
+        unlimited = {name: (1e6, 1e6) for name in settings.CHAT_RATE_LIMITS}
+        with throwaway_database(), \
+                override_settings(MEDIA_ROOT=tmp, CHAT_UPLOAD_DIR=os.path.join(tmp, "parts"),
+                                  CHAT_RATE_LIMITS=unlimited), \
+                mock.patch.object(uploads, "UPLOAD_MAX_SIZE", len(data)), \
+                mock.patch("chatchat.apps.chat_app.imaging.schedule_blob"):  # 크기별 인코딩은 재지 않음
+            user = User.objects.create(username="bench", nickname="bench")
+            tracemalloc.start()
+            try:
+                self._multipart(user, data)
+                self._chunked(user, data, options["chunk_mb"] * MB)
+            finally:
+                tracemalloc.stop()
+
+    def _report(self, label, size, elapsed, peak):
+        self.stdout.write(f"{label} {size / MB / elapsed:8.1f} MB/s  peak +{peak / MB:.1f} MB")
+
+    def _multipart(self, user, data):
+        request = APIRequestFactory().post(
+            "/images/", {"images": [SimpleUploadedFile("bench.bin", data)]}, format="multipart"
+        )
+        force_authenticate(request, user)
+        _, elapsed, peak = _call(ImageUploadView.as_view(), request)
+        request.close()  # 저장소로 옮겨진 임시 업로드 파일 정리
+        self._report("multipart", len(data), elapsed, peak)
+
+    def _chunked(self, user, data, chunk_size):
+        factory = APIRequestFactory()
+        request = factory.post("/uploads/", {"filename": "bench.bin", "size": len(data),
+                                             "sha256": hashlib.sha256(data).hexdigest()}, format="json")
+        force_authenticate(request, user)
+        upload_id = UploadInitView.as_view()(request).data["upload_id"]
+
+        total, peak = 0.0, 0
+        for offset in range(0, len(data), chunk_size):
+            request = factory.put(f"/uploads/{upload_id}/", data[offset:offset + chunk_size],
+                                  content_type="application/octet-stream", HTTP_UPLOAD_OFFSET=str(offset))
+            force_authenticate(request, user)
+            _, elapsed, chunk_peak = _call(UploadChunkView.as_view(), request, upload_id=upload_id)
+            total += elapsed
+            peak = max(peak, chunk_peak)
+
+        request = factory.post(f"/uploads/{upload_id}/complete/")
+        force_authenticate(request, user)
+        response, elapsed, complete_peak = _call(UploadCompleteView.as_view(), request, upload_id=upload_id)
+        assert response.status_code == 201, response.data
+        self._report("chunked  ", len(data), total + elapsed, max(peak, complete_peak))
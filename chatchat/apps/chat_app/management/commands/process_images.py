@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from chatchat.apps.chat_app import imaging
+from chatchat.apps.chat_app.models import Image, ImageBlob, User
+
+
+class Command(BaseCommand):
+    help = ("아직 처리되지 않은 채팅 이미지(PROCESSING)와 썸네일이 없는 프로필 이미지를 처리 "
+            "(워커 재시작으로 놓친 것 / 기존 데이터 백필)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retry-failed", action="store_true", help="FAILED 이미지도 다시 처리")
+
+    def handle(self, *args, **options):
+        statuses = [Image.Status.PROCESSING]
+        if options["retry_failed"]:
+            statuses.append(Image.Status.FAILED)
+
+        blob_ids = list(ImageBlob.objects.filter(status__in=statuses).values_list("id", flat=True))
+        for blob_id in blob_ids:
+            imaging.process_blob(blob_id)
+        # blob 도입 전에 올라온 (파일을 혼자 쓰는) 이미지
+        image_ids = list(
+            Image.objects.filter(status__in=statuses, blob__isnull=True).values_list("id", flat=True)
+        )
+        for image_id in image_ids:
+            imaging.process_image(image_id)
+        self.stdout.write(f"processed {len(blob_ids)} image blobs, {len(image_ids)} chat images")
+
+        users = User.objects.exclude(profile_img="").exclude(profile_img__isnull=True).only(
+            "id", "profile_img", "profile_thumb"
+        )
+        count = 0
+        for user in users.iterator():
+            if imaging.profile_thumb_stale(user):
+                imaging.process_profile(user.id)
+                count += 1
+        self.stdout.write(f"made {count} profile thumbnails")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from chatchat.apps.chat_app import search
+
+
+class Command(BaseCommand):
+    help = ("메시지 검색 색인을 처음부터 다시 만듦 (SQLite FTS5는 트랜잭션 하나에서 id 순으로 배치마다, "
+            "PostgreSQL은 REINDEX). 트리거/인덱스가 없으면 먼저 만듦")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=search.SEARCH_REBUILD_BATCH)
+
+    def handle(self, *args, **options):
+        if search.backend() is None:
+            self.stderr.write("이 데이터베이스에서는 메시지 검색을 지원하지 않습니다.")
+            return
+        done = 0
+        for done in search.rebuild(options["batch_size"]):
+            self.stdout.write(f"indexed {done} messages")
+        self.stdout.write(f"done: {done} messages")
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from chatchat.apps.chat_app import notifications
+
+
+class Command(BaseCommand):
+    help = ("쌓인 오프라인 푸시 알림을 기기별로 묶어서 보냄 "
+            "(--interval 없이 실행하면 한 번만 처리하고 종료)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=None,
+                            help="초. 지정하면 이 주기로 계속 실행")
+
+    def handle(self, *args, **options):
+        sender = notifications.get_sender()
+        while True:
+            devices = 0
+            # 보낼 시각이 된 알림이 남아 있는 동안 배치 단위로 계속 보냄
+            try:
+                while True:
+                    count = notifications.deliver_due(sender)
+                    devices += count
+                    if count == 0:
+                        break
+            except Exception as e:
+                # 보내지 못한 알림은 다시 쌓였으므로 다음 주기에 다시 보냄
+                self.stderr.write(f"push sender failed: {e!r}")
+                if options["interval"] is None:
+                    raise
+            if devices:
+                self.stdout.write(f"sent push notifications to {devices} devices")
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,34 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from chatchat.apps.chat_app import cleanup
+
+
+class Command(BaseCommand):
+    help = ("메시지에 연결되지 않은 채 grace 시간이 지난 업로드 이미지와 끝내지 않은 분할 업로드를 삭제하고 "
+            "확보한 용량을 출력 (--interval을 주면 그 주기로 계속 실행)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-hours", type=float,
+                            default=cleanup.ORPHAN_GRACE.total_seconds() / 3600)
+        parser.add_argument("--batch-size", type=int, default=cleanup.SWEEP_BATCH_SIZE)
+        parser.add_argument("--interval", type=float, default=None, help="초. 지정하면 이 주기로 계속 실행")
+        parser.add_argument("--dry-run", action="store_true", help="지우지 않고 대상만 집계")
+
+    def handle(self, *args, **options):
+        grace = timedelta(hours=options["grace_hours"])
+        while True:
+            images, image_bytes = cleanup.sweep_orphan_images(
+                grace, options["batch_size"], dry_run=options["dry_run"]
+            )
+            sessions, session_bytes = cleanup.sweep_stale_upload_sessions(grace, dry_run=options["dry_run"])
+            prefix = "[dry-run] " if options["dry_run"] else ""
+            self.stdout.write(
+                f"{prefix}orphan images: {images}, stale uploads: {sessions}, "
+                f"reclaimed: {(image_bytes + session_bytes) / 1024 / 1024:.2f} MB"
+            )
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,122 @@
+# apps/chat/membership.py
+from typing import Dict, List, Optional, Set
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+from .models import ChatRoom, User
+
+# 방 참가자 id 집합 (Redis Set). 빈 방도 "조회한 적 있음"을 표시하려고 LOADED 마커를 같이 넣음
+MEMBERS_KEY = "chat:room:{room_id}:members"
+MEMBERS_TTL = 60 * 60      # 1h. 시그널로 지우지만, 혹시 놓친 경우를 위한 안전장치
+LOADED = "-"
+
+# 유저 최소 정보 (Django cache, dict)
+USER_KEY = "chat:user:{user_id}"
+USER_TTL = 60 * 60
+USER_FIELDS = ("id", "username", "nickname", "profile_img", "profile_thumb")
+
+
+def _client():
+    return cache.client.get_client()  # raw redis client
+
+
+def _members_key(room_id) -> str:
+    return MEMBERS_KEY.format(room_id=room_id)
+
+
+def _load_members(room_id) -> Set[int]:
+    """
+    DB에서 참가자 id를 읽어 Redis Set에 채움
+    """
+    ids = set(
+        ChatRoom.participants.through.objects
+        .filter(chatroom_id=room_id)
+        .values_list("user_id", flat=True)
+    )
+    key = _members_key(room_id)
+    pipe = _client().pipeline()
+    pipe.delete(key)
+    pipe.sadd(key, LOADED, *ids)
+    pipe.expire(key, MEMBERS_TTL)
+    pipe.execute()
+    return ids
+
+
+def is_member(room_id, user_id) -> bool:
+    """
+    user_id가 방 참가자인지. 캐시에 있으면 SQL 없이 Redis 왕복 1회로 끝남.
+    """
+    pipe = _client().pipeline(transaction=False)
+    pipe.exists(_members_key(room_id))
+    pipe.sismember(_members_key(room_id), user_id)
+    loaded, member = pipe.execute()
+    if loaded:
+        return bool(member)
+    return int(user_id) in _load_members(room_id)
+
+
+def member_ids(room_id) -> Set[int]:
+    """
+    방 참가자 id 집합
+    """
+    members = _client().smembers(_members_key(room_id))
+    if not members:
+        return _load_members(room_id)
+    return {int(m) for m in members if m != LOADED.encode()}
+
+
+def invalidate_room(room_id) -> None:
+    _client().delete(_members_key(room_id))
+
+
+def _user_records(user_ids) -> Dict[int, dict]:
+    """
+    여러 유저의 캐시된 최소 정보를 한 번에 (캐시 get_many 1회 + 없는 유저만 DB 1회)
+    """
+    keys = {USER_KEY.format(user_id=user_id): int(user_id) for user_id in user_ids}
+    records = {keys[key]: record for key, record in cache.get_many(list(keys)).items()}
+
+    missing = [user_id for user_id in keys.values() if user_id not in records]
+    if missing:
+        loaded = {r["id"]: r for r in User.objects.filter(id__in=missing).values(*USER_FIELDS)}
+        cache.set_many(
+            {USER_KEY.format(user_id=user_id): r for user_id, r in loaded.items()},
+            timeout=USER_TTL,
+        )
+        records.update(loaded)
+    return records
+
+
+def get_profiles(user_ids) -> List[dict]:
+    """
+    참가자 미니 프로필 목록 [{id, nickname, profile_image}] (id 순)
+    """
+    records = _user_records(user_ids)
+    return [
+        {
+            "id": r["id"],
+            "nickname": r["nickname"],
+            "profile_image": default_storage.url(r.get("profile_thumb") or r["profile_img"])
+            if r.get("profile_thumb") or r["profile_img"] else None,
+        }
+        for _, r in sorted(records.items())
+    ]
+
+
+def get_user(user_id) -> Optional[User]:
+    """
+    캐시된 최소 정보로 만든 User 인스턴스 (DB에서 다시 읽지 않음).
+    id/username/nickname/profile_img/profile_thumb 외의 필드는 deferred 상태라, 접근하면 그때 DB에서 읽음.
+    없는 유저면 None.
+    """
+    record = _user_records([user_id]).get(int(user_id))
+    if record is None:
+        return None
+    # from_db는 값이 모델 필드 순서대로 오길 기대함
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in record]
+    return User.from_db("default", names, [record[name] for name in names])
+
+
+def invalidate_user(user_id) -> None:
+    cache.delete(USER_KEY.format(user_id=user_id))
@@ -0,0 +1,54 @@
+# apps/chat/metrics.py
+# 워커(프로세스) 안에서만 집계하는 간단한 지표 모음. 운영 지표 시스템으로 내보내기 전 단계용.
+import threading
+from typing import Callable, Dict
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = {}
+_gauges: Dict[str, Callable[[], float]] = {}
+_timings: Dict[str, list] = {}  # name → [횟수, 합계, 최대]
+
+
+def incr(name: str, amount: int = 1) -> None:
+    """
+    카운터 증가 (워커가 뜬 뒤 누적)
+    """
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def observe(name: str, value: float) -> None:
+    """
+    소요 시간 등 값 하나를 기록 (횟수/평균/최대로 집계)
+    """
+    with _lock:
+        stat = _timings.setdefault(name, [0, 0.0, 0.0])
+        stat[0] += 1
+        stat[1] += value
+        stat[2] = max(stat[2], value)
+
+
+def counter(name: str) -> int:
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def gauge(name: str, func: Callable[[], float]) -> None:
+    """
+    조회할 때마다 func()로 현재 값을 계산하는 게이지 등록
+    """
+    _gauges[name] = func
+
+
+def snapshot() -> dict:
+    with _lock:
+        counters = dict(_counters)
+        timings = {
+            name: {"count": count, "avg": total / count, "max": peak}
+            for name, (count, total, peak) in _timings.items()
+        }
+    return {
+        "counters": counters,
+        "gauges": {name: func() for name, func in _gauges.items()},
+        "timings": timings,
+    }
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.23 on 2026-10-17 10:48
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+import django.db.models.deletion
+
+
+def backfill_read_states(apps, schema_editor):
+    """
+    기존 read_by 데이터로 (room, user)별 워터마크를 채운다.
+    각 유저가 방에서 읽은 메시지 중 가장 큰 id를 워터마크로 사용.
+    """
+    ChatMessage = apps.get_model("chat_app", "ChatMessage")
+    ChatReadState = apps.get_model("chat_app", "ChatReadState")
+    ReadBy = ChatMessage.read_by.through
+
+    rows = (
+        ReadBy.objects.values("chatmessage__room_id", "user_id")
+        .annotate(last=Max("chatmessage_id"))
+        .order_by()
+    )
+    ChatReadState.objects.bulk_create(
+        (
+            ChatReadState(
+                room_id=row["chatmessage__room_id"],
+                user_id=row["user_id"],
+                last_read_message_id=row["last"],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("chat_app", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChatReadState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("last_read_message_id", models.PositiveBigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "room",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="read_states",
+                        to="chat_app.chatroom",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="read_states",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["room", "last_read_message_id"],
+                        name="chat_app_ch_room_id_1c8a39_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="chatreadstate",
+            constraint=models.UniqueConstraint(
+                fields=("room", "user"), name="uniq_chat_read_state_room_user"
+            ),
+        ),
+        migrations.RunPython(backfill_read_states, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.23 on 2026-10-17 10:59
+
+from django.db import migrations, models
+
+
+def backfill_seq(apps, schema_editor):
+    """
+    기존 메시지에 방별로 id 순서대로 1, 2, 3, ... 순번을 매김
+    """
+    ChatMessage = apps.get_model("chat_app", "ChatMessage")
+    room_ids = (
+        ChatMessage.objects.values_list("room_id", flat=True).distinct().order_by()
+    )
+    for room_id in room_ids.iterator():
+        messages = list(
+            ChatMessage.objects.filter(room_id=room_id).order_by("id").only("id")
+        )
+        for seq, msg in enumerate(messages, start=1):
+            msg.seq = seq
+        ChatMessage.objects.bulk_update(messages, ["seq"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat_app", "0003_chatreadstate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatmessage",
+            name="seq",
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="chatmessage",
+            index=models.Index(
+                fields=["room", "seq"], name="chat_app_ch_room_id_049850_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_seq, migrations.RunPython.noop),
+    ]
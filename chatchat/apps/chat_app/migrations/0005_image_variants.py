@@ -0,0 +1,40 @@
+# Generated by Django 4.2.23 on 2026-10-17 11:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat_app", "0004_chatmessage_seq"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="image",
+            name="preview",
+            field=models.ImageField(
+                blank=True, null=True, upload_to="chat/images/preview/"
+            ),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("PROCESSING", "Processing"),
+                    ("READY", "Ready"),
+                    ("FAILED", "Failed"),
+                ],
+                default="PROCESSING",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="thumbnail",
+            field=models.ImageField(
+                blank=True, null=True, upload_to="chat/images/thumb/"
+            ),
+        ),
+    ]
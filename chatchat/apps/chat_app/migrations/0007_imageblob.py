@@ -0,0 +1,57 @@
+# Generated by Django 4.2.23 on 2026-10-17 11:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat_app", "0006_uploadsession"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sha256", models.CharField(max_length=64, unique=True)),
+                ("size", models.PositiveBigIntegerField()),
+                ("image", models.ImageField(upload_to="chat/blobs/")),
+                (
+                    "thumbnail",
+                    models.ImageField(
+                        blank=True, null=True, upload_to="chat/blobs/thumb/"
+                    ),
+                ),
+                (
+                    "preview",
+                    models.ImageField(
+                        blank=True, null=True, upload_to="chat/blobs/preview/"
+                    ),
+                ),
+                ("status", models.CharField(default="PROCESSING", max_length=10)),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="images",
+                to="chat_app.imageblob",
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.23 on 2026-10-17 11:21
+
+from django.db import migrations, models
+
+
+def backfill_unread_counts(apps, schema_editor):
+    """
+    참가자마다 (room, user) 행을 만들고, 워터마크 뒤의 메시지 수로 안 읽은 수를 채운다.
+    """
+    ChatRoom = apps.get_model("chat_app", "ChatRoom")
+    ChatMessage = apps.get_model("chat_app", "ChatMessage")
+    ChatReadState = apps.get_model("chat_app", "ChatReadState")
+    Participants = ChatRoom.participants.through
+
+    ChatReadState.objects.bulk_create(
+        (
+            ChatReadState(room_id=row["chatroom_id"], user_id=row["user_id"])
+            for row in Participants.objects.values("chatroom_id", "user_id").iterator()
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    for state in ChatReadState.objects.iterator():
+        unread = ChatMessage.objects.filter(
+            room_id=state.room_id, pk__gt=state.last_read_message_id
+        ).count()
+        if unread:
+            ChatReadState.objects.filter(pk=state.pk).update(unread_count=unread)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat_app", "0007_imageblob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatreadstate",
+            name="unread_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
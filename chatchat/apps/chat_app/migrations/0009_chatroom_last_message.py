@@ -0,0 +1,64 @@
+# Generated by Django 4.2.23 on 2026-10-17 11:23
+
+from django.db import migrations, models
+
+LAST_MESSAGE_PREVIEW = 100
+
+
+def backfill_last_messages(apps, schema_editor):
+    """
+    방마다 가장 최신 메시지로 스냅샷을 채운다.
+    """
+    ChatRoom = apps.get_model("chat_app", "ChatRoom")
+    ChatMessage = apps.get_model("chat_app", "ChatMessage")
+
+    for room_id in ChatRoom.objects.values_list("id", flat=True).iterator():
+        msg = (
+            ChatMessage.objects.filter(room_id=room_id)
+            .select_related("sender").order_by("-id").first()
+        )
+        if msg is None:
+            continue
+        ChatRoom.objects.filter(pk=room_id).update(
+            last_message_id=msg.pk,
+            last_message_text=(msg.text or "")[:LAST_MESSAGE_PREVIEW],
+            last_message_sender=msg.sender.nickname or "",
+            last_message_at=msg.created_at,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat_app", "0008_chatreadstate_unread_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatroom",
+            name="last_message_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="chatroom",
+            name="last_message_id",
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="chatroom",
+            name="last_message_sender",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name="chatroom",
+            name="last_message_text",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name="chatroom",
+            index=models.Index(
+                fields=["last_message_at"], name="chat_app_ch_last_me_e17ed3_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_last_messages, migrations.RunPython.noop),
+    ]
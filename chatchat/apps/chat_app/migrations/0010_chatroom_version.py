@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-17 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat_app", "0009_chatroom_last_message"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatroom",
+            name="version",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
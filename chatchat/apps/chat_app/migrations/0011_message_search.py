@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# 마이그레이션 기록이 지금 코드에 묶이지 않도록 search.py의 SQL을 그대로 옮겨 둠
+FTS_TABLE = "chat_app_chatmessage_fts"
+PG_INDEX = "chat_app_chatmessage_text_fts"
+
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text, content='chat_app_chatmessage', content_rowid='id', tokenize='unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON chat_app_chatmessage BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON chat_app_chatmessage BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF text ON chat_app_chatmessage BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    # 기존 메시지 색인
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+PG_INSTALL = [
+    f"""CREATE INDEX IF NOT EXISTS {PG_INDEX} ON chat_app_chatmessage
+        USING GIN (to_tsvector('simple'::regconfig, COALESCE(text, '')))""",
+]
+PG_UNINSTALL = [f"DROP INDEX IF EXISTS {PG_INDEX}"]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def install_search_index(apps, schema_editor):
+    """
+    SQLite: FTS5 테이블 + 트리거를 만들고 기존 메시지를 색인. PostgreSQL: GIN 식 인덱스.
+    """
+    _run(schema_editor, {"sqlite": SQLITE_INSTALL, "postgresql": PG_INSTALL})
+
+
+def uninstall_search_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_UNINSTALL, "postgresql": PG_UNINSTALL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat_app", "0010_chatroom_version"),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.conf import settings
 #________________________________________________________________
 from django.contrib.contenttypes.fields import GenericForeignKey
@@ -6,12 +8,19 @@ from django.contrib.contenttypes.models import ContentType
 # GenericForeignKey를 사용하면 어떤 모델의 인스턴스도 참조할 수 있게 해줍니다.
 #________________________________________________________________
 from django.db import models
-from django.db.models import Q
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 #________________________________________________________________
 
 # 커스텀 유저 모델을 불러오기 위한 설정값. 보통은 auth.User 또는 직접 정의한 User 모델이 됨
 from django.conf import settings
 from chatchat.apps.user_app.models import User
+from . import sequence
+from .signals import messages_created
+
+LAST_MESSAGE_PREVIEW = 100  # 방 목록에 보여줄 마지막 메시지 최대 글자 수
+
 
 #_______________________________________________________________________
 # ✅ ChatRoomManager: 채팅방을 쉽게 만들 수 있게 도와주는 매니저
@@ -38,6 +47,33 @@ class ChatRoomManager(models.Manager):
 
         return room
 
+    def bump_version(self, room_ids) -> None:
+        """
+        방의 변경 버전을 1 올린다 (sync/ETag가 "바뀐 방"을 알 수 있도록)
+        """
+        self.filter(pk__in=list(room_ids)).update(version=F("version") + 1)
+
+    def bump_version_for_user(self, user_id) -> None:
+        """
+        user가 참가한 모든 방의 버전을 올린다 (닉네임/프로필 이미지가 바뀌어 방 응답이 달라질 때)
+        """
+        self.filter(participants=user_id).update(version=F("version") + 1)
+
+    def set_last_message(self, msg, sender_nickname) -> bool:
+        """
+        방 목록용 마지막 메시지 스냅샷을 msg로 바꾸고 버전을 올린다 (조건부 UPDATE 한 번).
+        여러 워커가 동시에 저장해도 id가 더 큰 메시지만 반영되므로 뒤로 가지 않음.
+        """
+        return bool(self.filter(
+            Q(last_message_id__isnull=True) | Q(last_message_id__lt=msg.pk), pk=msg.room_id
+        ).update(
+            last_message_id=msg.pk,
+            last_message_text=(msg.text or "")[:LAST_MESSAGE_PREVIEW],
+            last_message_sender=sender_nickname or "",
+            last_message_at=msg.created_at,
+            version=F("version") + 1,
+        ))
+
 
 #_______________________________________________________________________
 # ✅ ChatRoom 모델: DM 또는 그룹 채팅방
@@ -59,9 +95,35 @@ class ChatRoom(models.Model):
     created_at   = models.DateTimeField(auto_now_add=True)
     # 채팅방이 생성된 시간
 
+    last_message_id     = models.PositiveBigIntegerField(null=True, blank=True)
+    last_message_text   = models.CharField(max_length=LAST_MESSAGE_PREVIEW, blank=True)
+    last_message_sender = models.CharField(max_length=100, blank=True)
+    last_message_at     = models.DateTimeField(null=True, blank=True)
+    # 마지막 메시지 스냅샷 (방 목록에서 메시지/보낸 사람을 다시 읽지 않도록).
+    # 메시지가 저장될 때 set_last_message로 갱신됨. 메시지가 없으면 last_message_id가 None
+
+    version = models.PositiveBigIntegerField(default=0)
+    # 방의 변경 버전. 새 메시지/읽음 위치/참가자/제목이 바뀔 때마다 1씩 올라감 (sync.py)
+
     objects = ChatRoomManager()
     # 기본 매니저 대신 우리가 만든 Manager를 붙임 → create_room 같은 함수 사용 가능
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["last_message_at"]),  # 최근 대화 순 정렬
+        ]
+
+    def save(self, *args, **kwargs):
+        is_new = self.pk is None
+        if not is_new:
+            # 제목 등이 바뀜 → 버전을 올림. 다른 곳에서 그 사이 올린 버전을 덮어쓰지 않도록 DB 값 기준으로
+            self.version = F("version") + 1
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "version"}
+        super().save(*args, **kwargs)
+        if not is_new:
+            self.refresh_from_db(fields=["version"])
+
     def __str__(self):
         return self.title or f"Room {self.pk}"
         # 제목이 있으면 제목, 없으면 "Room 1"처럼 출력
@@ -84,7 +146,11 @@ class ChatMessage(models.Model):
 
     read_by = models.ManyToManyField(User, blank=True,
                                      related_name="read_messages")
-    # 이 메시지를 읽은 유저들 목록 (읽음 처리용)
+    # (더 이상 기록하지 않음) 예전 메시지별 읽음 목록.
+    # 읽음 처리는 ChatReadState 워터마크로 대체됨 → 기존 데이터 백필용으로만 남겨둠
+
+    seq = models.PositiveBigIntegerField(null=True, blank=True)
+    # 방 안에서 1씩 증가하는 순번 (sequence.next_seq). 재접속 시 빠진 구간을 찾는 데 사용
 
     created_at = models.DateTimeField(auto_now_add=True)
     # 메시지가 생성된 시간
@@ -92,14 +158,180 @@ class ChatMessage(models.Model):
     class Meta:
         ordering = ("created_at",)
         # 메시지 가져올 때 오래된 순서로 정렬됨 (room.messages.all() 하면 자동 정렬)
+        indexes = [
+            models.Index(fields=["room", "seq"]),
+        ]
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None  # 아직 저장되지 않은 새 메시지인지 확인
+        if is_new and self.seq is None:
+            self.seq = sequence.next_seq(self.room_id)
         super().save(*args, **kwargs)
 
         if is_new:
-            # 새 메시지라면, 보낸 사람은 자동으로 '읽은 사람 목록'에 추가
-            self.read_by.add(self.sender)
+            # 새 메시지 후처리(보낸 사람 읽음 처리 등)는 receivers.py에서
+            messages_created.send(sender=ChatMessage, messages=[self])
+
+
+#_______________________________________________________________________
+# ✅ ChatReadStateManager: 읽음 워터마크를 올리고 읽은 사람 수를 계산
+#_______________________________________________________________________
+class ChatReadStateManager(models.Manager):
+    @staticmethod
+    def _unread_after(room_id, msg_id):
+        # room에서 msg_id보다 뒤에 온 메시지 수 (UPDATE 안에서 같이 계산하는 서브쿼리)
+        return Coalesce(Subquery(
+            ChatMessage.objects.filter(room_id=room_id, pk__gt=msg_id)
+            .order_by().values("room").annotate(c=Count("pk")).values("c")
+        ), 0)
+
+    def advance(self, room_id, user_id, msg_id) -> bool:
+        """
+        (room, user)의 워터마크를 msg_id까지 올린다. 뒤로 가지는 않음.
+        메시지 수와 상관없이 UPDATE 한 번(첫 읽음이면 INSERT 한 번)으로 끝남.
+        워터마크가 움직이면 안 읽은 수도 같은 UPDATE에서 다시 계산함.
+        반환: 워터마크가 실제로 앞으로 움직였으면 True
+        """
+        if self.filter(
+            room_id=room_id, user_id=user_id, last_read_message_id__lt=msg_id
+        ).update(last_read_message_id=msg_id, updated_at=timezone.now(),
+                 unread_count=self._unread_after(room_id, msg_id)):
+            return True
+
+        _, created = self.get_or_create(
+            room_id=room_id, user_id=user_id,
+            defaults={
+                "last_read_message_id": msg_id,
+                "unread_count": ChatMessage.objects.filter(room_id=room_id, pk__gt=msg_id).count(),
+            },
+        )
+        if created:
+            return True
+
+        # 동시에 다른 요청이 더 낮은 값으로 행을 만들었을 수 있으므로 한 번 더 시도
+        return bool(self.filter(
+            room_id=room_id, user_id=user_id, last_read_message_id__lt=msg_id
+        ).update(last_read_message_id=msg_id, updated_at=timezone.now(),
+                 unread_count=self._unread_after(room_id, msg_id)))
+
+    def add_unread(self, messages) -> None:
+        """
+        새 메시지 수만큼 방 참가자들의 안 읽은 수를 올림 (방마다 UPDATE 한 번).
+        보낸 사람은 워터마크가 자기 메시지로 올라가면서 다시 계산되므로 제외.
+        나간 유저의 행은 남아 있지만 올리지 않음 (다시 들어올 때 create_missing이 다시 계산).
+        """
+        senders_by_room = {}
+        for msg in messages:
+            senders_by_room.setdefault(msg.room_id, []).append(msg.sender_id)
+        for room_id, senders in senders_by_room.items():
+            members = ChatRoom.participants.through.objects.filter(chatroom_id=room_id).values("user_id")
+            self.filter(room_id=room_id, user_id__in=members).exclude(user_id__in=set(senders)).update(
+                unread_count=F("unread_count") + len(senders)
+            )
+
+    def create_missing(self, pairs) -> None:
+        """
+        새로 들어온 참가자의 행을 미리 만들어 둠 (그래야 add_unread가 셀 수 있음).
+        pairs = [(room_id, user_id), ...]. 새 행은 워터마크가 0이므로 방의 메시지가 모두 안 읽은 것.
+        다시 들어온 참가자는 행이 이미 있지만, 나가 있던 동안 세지 않았으므로
+        안 읽은 수를 남아 있는 워터마크 기준으로 다시 계산 (방마다 UPDATE 한 번).
+        """
+        self.bulk_create(
+            [self.model(room_id=room_id, user_id=user_id) for room_id, user_id in pairs],
+            ignore_conflicts=True,
+        )
+        users_by_room = {}
+        for room_id, user_id in pairs:
+            users_by_room.setdefault(room_id, []).append(user_id)
+        for room_id, user_ids in users_by_room.items():
+            self.filter(room_id=room_id, user_id__in=user_ids).update(
+                unread_count=self._unread_after(room_id, OuterRef("last_read_message_id"))
+            )
+
+    def read_count(self, room_id, msg_id) -> int:
+        """
+        msg_id 메시지를 읽은 사람 수 = 워터마크가 msg_id 이상인 유저 수
+        """
+        return self.filter(room_id=room_id, last_read_message_id__gte=msg_id).count()
+
+    def unread_count(self, room_id, user_id) -> int:
+        """
+        user가 room에서 아직 안 읽은 메시지 수
+        """
+        return self.unread_counts(user_id, [room_id])[room_id]
+
+    def unread_counts(self, user_id, room_ids) -> dict:
+        """
+        {room_id: 안 읽은 수}. 방 개수와 상관없이 쿼리 한 번
+        (행이 없는 방이 있을 때만 그 방들의 메시지 수를 한 번 더 셈).
+        """
+        room_ids = [int(room_id) for room_id in room_ids]
+        counts = dict(
+            self.filter(user_id=user_id, room_id__in=room_ids).values_list("room_id", "unread_count")
+        )
+        missing = [room_id for room_id in room_ids if room_id not in counts]
+        if missing:
+            # 한 번도 읽지 않았고 행도 없음 → 방의 메시지 전부
+            counts.update(
+                ChatMessage.objects.filter(room_id__in=missing)
+                .order_by().values("room").annotate(c=Count("pk")).values_list("room", "c")
+            )
+        return {room_id: counts.get(room_id, 0) for room_id in room_ids}
+
+
+#_______________________________________________________________________
+# ✅ ChatReadState 모델: (채팅방, 유저)별 "마지막으로 읽은 메시지 id"
+#_______________________________________________________________________
+class ChatReadState(models.Model):
+    """
+    메시지마다 read_by 행을 쌓는 대신, 방마다 유저당 한 행만 유지한다.
+    워터마크 이하의 메시지는 모두 읽은 것으로 본다.
+    """
+    room = models.ForeignKey(ChatRoom, related_name="read_states",
+                             on_delete=models.CASCADE)
+    user = models.ForeignKey(User, related_name="read_states",
+                             on_delete=models.CASCADE)
+    last_read_message_id = models.PositiveBigIntegerField(default=0)
+    # 이 id 이하(포함)의 메시지는 모두 읽음
+    unread_count = models.PositiveIntegerField(default=0)
+    # 워터마크 뒤의 메시지 수. 메시지 저장 시 올리고, 워터마크가 움직일 때 다시 계산함
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ChatReadStateManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["room", "user"],
+                                    name="uniq_chat_read_state_room_user"),
+        ]
+        indexes = [
+            models.Index(fields=["room", "last_read_message_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.room_id}:{self.user_id}<={self.last_read_message_id}"
+
+#_______________________________________________________________________
+# ✅ ImageBlob 모델: 내용(sha256)이 같은 업로드 파일은 한 번만 저장하고 공유 (blobs.py)
+#_______________________________________________________________________
+class ImageBlob(models.Model):
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.PositiveBigIntegerField()
+    # 업로드된 원본 크기 (byte)
+
+    image = models.ImageField(upload_to="chat/blobs/")
+    thumbnail = models.ImageField(upload_to="chat/blobs/thumb/", blank=True, null=True)
+    preview = models.ImageField(upload_to="chat/blobs/preview/", blank=True, null=True)
+    status = models.CharField(max_length=10, default="PROCESSING")
+    # Image와 같은 의미 (Image.Status). 처리가 끝나면 이 blob을 쓰는 Image들에 같이 반영됨
+
+    ref_count = models.PositiveIntegerField(default=0)
+    # 이 blob을 쓰는 Image 수. 0이 되면 파일과 함께 삭제
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} (refs={self.ref_count})"
 
 #_______________________________________________________________________
 # ✅ Image 모델: 채팅방에서 사용되는 이미지 첨부
@@ -112,12 +344,56 @@ class Image(models.Model):
                              on_delete=models.CASCADE, null=True, blank=True)
     # 이 이미지가 어떤 채팅방에 속하는지
 
+    class Status(models.TextChoices):
+        PROCESSING = "PROCESSING", "Processing"
+        READY = "READY", "Ready"
+        FAILED = "FAILED", "Failed"
+
     image = models.ImageField(upload_to="chat/images/")
     # 이미지 파일. 업로드 경로 지정
+    # 처리가 끝나면 메타데이터를 지우고 크기를 줄여 다시 인코딩한 원본으로 바뀜 (imaging.py)
+
+    thumbnail = models.ImageField(upload_to="chat/images/thumb/", blank=True, null=True)
+    preview = models.ImageField(upload_to="chat/images/preview/", blank=True, null=True)
+    # 목록/말풍선용 작은 크기들. 처리 전에는 비어 있음
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PROCESSING)
+    # 크기별 이미지 생성 상태
+
+    blob = models.ForeignKey(ImageBlob, related_name="images", null=True, blank=True,
+                             on_delete=models.PROTECT)
+    # 공유하는 파일 묶음. image/thumbnail/preview는 이 blob의 파일을 가리킴
+    # (비어 있으면 blob 도입 전에 올라온, 파일을 혼자 쓰는 이미지)
 
     uploaded_at = models.DateTimeField(auto_now_add=True)
     # 이미지 업로드 시간
 
+#_______________________________________________________________________
+# ✅ UploadSession 모델: 이어받기 가능한 분할 업로드 (uploads.py)
+#_______________________________________________________________________
+class UploadSession(models.Model):
+    class Status(models.TextChoices):
+        OPEN = "OPEN", "Open"
+        COMPLETE = "COMPLETE", "Complete"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, related_name="upload_sessions", on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # 클라이언트가 알려준 전체 크기 (byte)
+    sha256 = models.CharField(max_length=64)
+    # 클라이언트가 알려준 전체 파일의 sha256 (hex). complete 때 검증
+    received = models.PositiveBigIntegerField(default=0)
+    # 지금까지 이어서 받은 byte 수 = 다음 조각의 시작 위치
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.OPEN)
+    image = models.ForeignKey(Image, null=True, blank=True, on_delete=models.SET_NULL)
+    # complete 후 만들어진 이미지
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.id} ({self.received}/{self.size})"
+
 #_______________________________________________________________________
 # ✅ UserDeviceToken 모델: 사용자 디바이스 토큰, 단말 푸시 토큰을 저장한다
 #_______________________________________________________________________
@@ -0,0 +1,194 @@
+# apps/chat/notifications.py
+# 오프라인 참가자 푸시 알림.
+#   1) 메시지가 저장되면(messages_created) 방에 접속해 있지 않은 참가자의 기기마다 Redis에 쌓아두고
+#   2) 워커(send_push_notifications 커맨드)가 기기별로 PUSH_COALESCE_WINDOW 동안 모인 것을
+#      "새 메시지 3개"처럼 하나로 묶어서 settings.CHAT_PUSH_SENDER로 한 번에 보냄
+import logging
+import time
+from collections import deque
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from . import membership, presence
+from .models import ChatRoom, UserDeviceToken
+
+logger = logging.getLogger(__name__)
+
+PUSH_COALESCE_WINDOW = 5    # sec. 기기마다 첫 메시지 후 이 시간 동안 모아서 한 번에 보냄
+PUSH_BATCH_SIZE = 500       # 한 번에 꺼내서 sender에 넘길 최대 기기 수
+PENDING_TTL = 60 * 60 * 24  # 워커가 오래 멈춰 있으면 쌓인 알림은 버림
+PUSH_RETRY_DELAY = 30       # sec. sender가 실패하면 꺼낸 알림을 다시 쌓고 이 시간 뒤에 다시 보냄
+LOCAL_OUTBOX_MAX = 1000     # LocalPushSender가 기억하는 최근 푸시 수
+
+# 기기별 대기 알림 (Hash): user, platform, count:{room_id}, last:{room_id}
+PENDING_KEY = "chat:push:pending:{token}"
+# 보낼 시각 순으로 정렬된 기기 토큰 (Sorted Set, score = 보낼 시각)
+DUE_KEY = "chat:push:due"
+
+
+def _client():
+    return cache.client.get_client()  # raw redis client
+
+
+# ────────────────────────── sender ──────────────────────────
+class LocalPushSender:
+    """
+    실제로 보내지 않고 outbox에 쌓아두는 sender (개발/테스트용).
+    outbox는 인스턴스마다 따로, 최근 LOCAL_OUTBOX_MAX개만 남김
+    """
+
+    def __init__(self):
+        self.outbox = deque(maxlen=LOCAL_OUTBOX_MAX)
+
+    def send(self, pushes: List[dict]) -> List[str]:
+        """
+        pushes를 한 번에 전송. 반환: 더 이상 유효하지 않은 토큰 목록 (비활성화됨)
+        """
+        for push in pushes:
+            logger.info("push to %s: %s / %s", push["token"], push["title"], push["body"])
+        self.outbox.extend(pushes)
+        return []
+
+
+def get_sender():
+    return import_string(settings.CHAT_PUSH_SENDER)()
+
+
+# ────────────────────────── 쌓기 ──────────────────────────
+def enqueue(messages: Iterable) -> None:
+    """
+    저장된 메시지들에 대해 오프라인 참가자의 기기마다 대기 알림을 추가.
+    presence는 파이프라인 한 번, 기기 토큰은 쿼리 한 번으로 조회.
+    """
+    by_room: Dict[int, list] = {}
+    for msg in messages:
+        by_room.setdefault(msg.room_id, []).append(msg)
+
+    online = presence.online_users_bulk(by_room)
+    # (room_id, user_id) → 그 유저가 받을 메시지들
+    pending: Dict[tuple, list] = {}
+    for room_id, room_messages in by_room.items():
+        offline = membership.member_ids(room_id) - online[room_id]
+        for msg in room_messages:
+            for user_id in offline - {msg.sender_id}:
+                pending.setdefault((room_id, user_id), []).append(msg)
+    if not pending:
+        return
+
+    devices = (
+        UserDeviceToken.objects
+        .filter(user_id__in={user_id for _, user_id in pending}, is_active=True)
+        .values_list("user_id", "token", "platform")
+    )
+    tokens_by_user: Dict[int, list] = {}
+    for user_id, token, platform in devices:
+        tokens_by_user.setdefault(user_id, []).append((token, platform))
+
+    due_at = time.time() + PUSH_COALESCE_WINDOW
+    pipe = _client().pipeline()
+    for (room_id, user_id), room_messages in pending.items():
+        for token, platform in tokens_by_user.get(user_id, []):
+            key = PENDING_KEY.format(token=token)
+            pipe.hset(key, mapping={
+                "user": user_id,
+                "platform": platform,
+                f"last:{room_id}": room_messages[-1].text,
+            })
+            pipe.hincrby(key, f"count:{room_id}", len(room_messages))
+            pipe.expire(key, PENDING_TTL)
+            pipe.zadd(DUE_KEY, {token: due_at}, nx=True)  # 이미 대기 중이면 처음 시각 유지
+    pipe.execute()
+
+
+# ────────────────────────── 보내기 ──────────────────────────
+def _take_due(now: float, limit: int) -> Dict[str, dict]:
+    """
+    보낼 시각이 된 기기들의 대기 알림을 꺼냄 (꺼내면서 지움).
+    워커가 여러 개여도 같은 알림을 두 번 보내지 않도록 꺼내기/지우기를 MULTI로 묶음.
+    """
+    client = _client()
+    tokens = [t.decode() for t in client.zrangebyscore(DUE_KEY, "-inf", now, start=0, num=limit)]
+    if not tokens:
+        return {}
+
+    pipe = client.pipeline()
+    for token in tokens:
+        key = PENDING_KEY.format(token=token)
+        pipe.hgetall(key)
+        pipe.delete(key)
+        pipe.zrem(DUE_KEY, token)
+    results = pipe.execute()
+
+    taken = {}
+    # 기기마다 [hgetall, delete, zrem] 순서
+    for token, raw in zip(tokens, results[0::3]):
+        if raw:
+            taken[token] = {k.decode(): v.decode() for k, v in raw.items()}
+    return taken
+
+
+def _requeue(taken: Dict[str, dict], due_at: float) -> None:
+    """
+    보내지 못한 알림을 다시 쌓음. 그 사이 새로 쌓인 알림이 있으면 개수는 더하고 마지막 메시지는 새 것을 유지.
+    """
+    pipe = _client().pipeline()
+    for token, fields in taken.items():
+        key = PENDING_KEY.format(token=token)
+        for field, value in fields.items():
+            if field.startswith("count:"):
+                pipe.hincrby(key, field, int(value))
+            else:
+                pipe.hsetnx(key, field, value)
+        pipe.expire(key, PENDING_TTL)
+        pipe.zadd(DUE_KEY, {token: due_at}, lt=True)  # 이미 더 빨리 보낼 예정이면 그 시각 유지
+    pipe.execute()
+
+
+def _build_pushes(taken: Dict[str, dict]) -> List[dict]:
+    room_ids = {
+        int(field.split(":", 1)[1])
+        for fields in taken.values() for field in fields if field.startswith("count:")
+    }
+    titles = dict(ChatRoom.objects.filter(id__in=room_ids).values_list("id", "title"))
+
+    pushes = []
+    for token, fields in taken.items():
+        for field, count in fields.items():
+            if not field.startswith("count:"):
+                continue
+            room_id = int(field.split(":", 1)[1])
+            if room_id not in titles:
+                continue  # 그 사이 삭제된 방
+            count = int(count)
+            pushes.append({
+                "token": token,
+                "platform": fields.get("platform", ""),
+                "user_id": int(fields["user"]),
+                "room_id": room_id,
+                "count": count,
+                "title": titles[room_id] or "새 메시지",
+                "body": fields.get(f"last:{room_id}", "") if count == 1 else f"새 메시지 {count}개",
+            })
+    return pushes
+
+
+def deliver_due(sender=None, now: float = None, limit: int = PUSH_BATCH_SIZE) -> int:
+    """
+    보낼 시각이 된 기기들의 알림을 묶어서 한 번에 전송. 반환: 처리한 기기 수 (0이면 더 없음)
+    sender가 실패하면 꺼낸 알림을 PUSH_RETRY_DELAY 뒤로 다시 쌓고 예외를 그대로 올림
+    """
+    now = time.time() if now is None else now
+    taken = _take_due(now, limit)
+    pushes = _build_pushes(taken) if taken else []
+    if pushes:
+        try:
+            invalid = (sender or get_sender()).send(pushes)
+        except Exception:
+            _requeue(taken, now + PUSH_RETRY_DELAY)
+            raise
+        if invalid:
+            UserDeviceToken.objects.filter(token__in=invalid).update(is_active=False)
+    return len(taken)
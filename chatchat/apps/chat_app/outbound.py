@@ -0,0 +1,125 @@
+# apps/chat/outbound.py
+import asyncio
+import logging
+import weakref
+from collections import deque
+from typing import Optional
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# 대기열이 넘쳐서 끊을 때 쓰는 close code. 클라이언트는 last_seq로 다시 접속해서 replay를 받으면 됨
+RESYNC_CLOSE_CODE = 4008
+
+POLICY_DROP_READS = "drop_reads"  # 가득 차면 오래된 읽음 이벤트부터 버리고, 버릴 게 없으면 resync 종료
+POLICY_CLOSE = "close"            # 가득 차면 바로 resync 종료
+
+_queues = weakref.WeakSet()
+
+
+class SendQueue:
+    """
+    연결 하나의 보낼 프레임 대기열 (최대 maxsize개).
+    droppable 프레임(읽음 이벤트 등)은 나중에 최신 상태가 다시 오므로 버려도 됨.
+    """
+
+    def __init__(self, maxsize: int, policy: str):
+        self.maxsize = maxsize
+        self.policy = policy
+        self._frames = deque()  # (text_data, bytes_data, close, droppable)
+        self._ready = asyncio.Event()
+        _queues.add(self)
+
+    def __len__(self):
+        return len(self._frames)
+
+    def put(self, frame: tuple) -> bool:
+        """
+        프레임 추가. False면 더 이상 넣을 수 없음 → 연결을 resync 코드로 닫아야 함.
+        """
+        if len(self._frames) >= self.maxsize and not self._drop_one():
+            return False
+        self._frames.append(frame)
+        self._ready.set()
+        return True
+
+    def _drop_one(self) -> bool:
+        if self.policy != POLICY_DROP_READS:
+            return False
+        for i, frame in enumerate(self._frames):
+            if frame[3]:
+                del self._frames[i]
+                metrics.incr("send_queue.dropped")
+                return True
+        return False
+
+    async def get(self) -> tuple:
+        while not self._frames:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._frames.popleft()
+
+    def clear(self) -> None:
+        self._frames.clear()
+
+
+metrics.gauge("send_queue.connections", lambda: len(_queues))
+metrics.gauge("send_queue.depth_total", lambda: sum(len(q) for q in list(_queues)))
+metrics.gauge("send_queue.depth_max", lambda: max((len(q) for q in list(_queues)), default=0))
+
+
+class SendQueueMixin:
+    """
+    consumer의 send()를 연결별 대기열 + 전송 task로 바꿈.
+
+    그룹 이벤트 핸들러는 대기열에 넣기만 하고 바로 돌아가므로, 네트워크가 느린 클라이언트
+    하나 때문에 워커 메모리가 계속 늘지 않음 (대기열 크기 = settings.CHAT_SEND_QUEUE_MAX).
+    AsyncWebsocketConsumer보다 앞에 상속해야 함.
+    """
+
+    _send_queue: Optional[SendQueue] = None
+    _sender_task: Optional[asyncio.Task] = None
+    _resync_closed = False
+
+    async def send(self, text_data=None, bytes_data=None, close=False, droppable=False):
+        if self._resync_closed:
+            return
+        if self._send_queue is None:
+            self._send_queue = SendQueue(settings.CHAT_SEND_QUEUE_MAX, settings.CHAT_SEND_QUEUE_POLICY)
+            self._sender_task = asyncio.create_task(self._sender())
+
+        if not self._send_queue.put((text_data, bytes_data, close, droppable)):
+            await self._close_for_resync()
+
+    async def _sender(self):
+        while True:
+            text_data, bytes_data, close, _ = await self._send_queue.get()
+            try:
+                await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+            except Exception:
+                # 전송 task가 없으면 프레임이 쌓이기만 하므로, 로그를 남기고 resync 코드로 끊음
+                logger.exception("websocket send failed, closing connection")
+                metrics.incr("send_queue.send_failed")
+                self._resync_closed = True
+                self._send_queue.clear()
+                try:
+                    await self.close(code=RESYNC_CLOSE_CODE)
+                except Exception:
+                    logger.exception("failed to close websocket after send failure")
+                return
+
+    async def _close_for_resync(self):
+        # 못 보낸 프레임은 버리고 끊음 → 클라이언트가 last_seq로 재접속해서 빠진 것만 받음
+        self._resync_closed = True
+        self._send_queue.clear()
+        self._sender_task.cancel()
+        metrics.incr("send_queue.resync_closed")
+        await self.close(code=RESYNC_CLOSE_CODE)
+
+    async def websocket_disconnect(self, message):
+        if self._sender_task:
+            self._sender_task.cancel()
+        await super().websocket_disconnect(message)
@@ -0,0 +1,97 @@
+# apps/chat/presence.py
+import time
+from typing import Dict, Iterable, Set
+
+from django.core.cache import cache
+
+# 방마다 Sorted Set 하나: member = "{user_id}|{channel_name}", score = 만료 시각(epoch sec)
+# → 웹소켓 연결(탭/기기) 단위로 기록하므로, 탭 하나를 닫아도 다른 탭이 살아있으면 온라인 유지
+PRESENCE_KEY = "chat:room:{room_id}:presence"
+PRESENCE_TTL = 60          # sec. 이 시간 동안 heartbeat가 없으면 오프라인으로 간주
+HEARTBEAT_INTERVAL = 20    # sec. consumer가 연결을 갱신하는 주기 (TTL보다 충분히 짧게)
+KEY_TTL = PRESENCE_TTL * 2  # 방에 아무도 없으면 키 자체도 정리
+
+
+def _client():
+    return cache.client.get_client()  # raw redis client
+
+
+def _key(room_id) -> str:
+    return PRESENCE_KEY.format(room_id=room_id)
+
+
+def _member(user_id, channel_name: str) -> str:
+    return f"{user_id}|{channel_name}"
+
+
+def join(room_id, user_id, channel_name: str) -> None:
+    """
+    연결 하나를 온라인으로 등록(또는 만료 시각 연장). ZADD 한 번이라 원자적.
+    """
+    key = _key(room_id)
+    pipe = _client().pipeline()
+    pipe.zadd(key, {_member(user_id, channel_name): time.time() + PRESENCE_TTL})
+    pipe.expire(key, KEY_TTL)
+    pipe.execute()
+
+
+# heartbeat도 만료 시각을 미루는 것뿐이라 join과 같다
+heartbeat = join
+
+
+def join_many(room_ids: Iterable[int], user_id, channel_name: str) -> None:
+    """
+    연결 하나를 여러 방에 한 번에 등록/연장 (UserChatConsumer용, 파이프라인 1회)
+    """
+    expires_at = time.time() + PRESENCE_TTL
+    pipe = _client().pipeline()
+    for room_id in room_ids:
+        key = _key(room_id)
+        pipe.zadd(key, {_member(user_id, channel_name): expires_at})
+        pipe.expire(key, KEY_TTL)
+    pipe.execute()
+
+
+def leave(room_id, user_id, channel_name: str) -> None:
+    """
+    연결 하나만 제거. 같은 유저의 다른 연결은 그대로 남음.
+    """
+    _client().zrem(_key(room_id), _member(user_id, channel_name))
+
+
+def leave_many(room_ids: Iterable[int], user_id, channel_name: str) -> None:
+    pipe = _client().pipeline()
+    for room_id in room_ids:
+        pipe.zrem(_key(room_id), _member(user_id, channel_name))
+    pipe.execute()
+
+
+def online_users_bulk(room_ids: Iterable[int]) -> Dict[int, Set[int]]:
+    """
+    여러 방의 온라인 유저 id를 파이프라인 한 번(왕복 1회)으로 조회.
+    만료된 연결(비정상 종료로 leave가 안 된 것)은 조회하면서 같이 정리함.
+    """
+    room_ids = list(room_ids)
+    if not room_ids:
+        return {}
+
+    now = time.time()
+    pipe = _client().pipeline(transaction=False)
+    for room_id in room_ids:
+        key = _key(room_id)
+        pipe.zremrangebyscore(key, "-inf", now)
+        pipe.zrangebyscore(key, now, "+inf")
+    results = pipe.execute()
+
+    online = {}
+    # 방마다 [zremrangebyscore 결과, zrangebyscore 결과] 순서
+    for room_id, members in zip(room_ids, results[1::2]):
+        online[room_id] = {int(m.split(b"|", 1)[0]) for m in members}
+    return online
+
+
+def online_users(room_id) -> Set[int]:
+    """
+    방 하나의 온라인 유저 id 집합
+    """
+    return online_users_bulk([room_id])[room_id]
@@ -0,0 +1,96 @@
+# apps/chat/ratelimit.py
+# Redis 토큰 버킷. 워커가 여러 개여도 같은 버킷을 공유함.
+# 버킷 설정(초당 충전량, 최대 버스트)은 settings.CHAT_RATE_LIMITS
+from typing import Iterable, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+BUCKET_KEY = "chat:ratelimit:{name}:{ident}"
+
+# 여러 버킷(유저, 방 ...)을 한 번에 확인하고, 모두 여유가 있을 때만 전부 차감 (원자적)
+# ARGV = [cost, rate1, burst1, rate2, burst2, ...]
+# 반환: "0"이면 통과, 아니면 다시 시도할 수 있을 때까지 남은 초
+_TAKE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local cost = tonumber(ARGV[1])
+local wait = 0
+local tokens = {}
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local left = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    left = math.min(burst, left + (now - ts) * rate)
+    if left < cost then
+        wait = math.max(wait, (cost - left) / rate)
+    end
+    tokens[i] = left
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    redis.call('HSET', key, 'tokens', tostring(tokens[i] - cost), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000) + 1000)
+end
+return '0'
+"""
+
+
+_take_script = None
+
+
+def _client():
+    return cache.client.get_client()  # raw redis client
+
+
+def _run_take(keys, args) -> float:
+    # 스크립트 본문은 처음 한 번만 보내고 이후에는 EVALSHA (서버에 없으면 redis-py가 다시 올림)
+    global _take_script
+    client = _client()
+    if _take_script is None:
+        _take_script = client.register_script(_TAKE)
+    return float(_take_script(keys=keys, args=args, client=client))
+
+
+def burst(name: str) -> float:
+    """
+    버킷의 최대 버스트 = 한 번에 차감할 수 있는 최대 cost
+    """
+    return settings.CHAT_RATE_LIMITS[name][1]
+
+
+def take(buckets: Iterable[Tuple[str, object]], cost: int = 1) -> float:
+    """
+    buckets = [(버킷 이름, 유저/방 id), ...] 에서 cost만큼 차감.
+    반환: 0이면 통과, 아니면 다시 시도할 수 있을 때까지 남은 초 (이때는 아무 버킷도 차감 안 됨)
+    cost가 버킷의 버스트보다 크면 기다려도 통과할 수 없으므로 ValueError (호출하는 쪽에서 먼저 거절)
+    """
+    limits = settings.CHAT_RATE_LIMITS
+    keys, args = [], [cost]
+    for name, ident in buckets:
+        rate, max_burst = limits[name]
+        if cost > max_burst:
+            raise ValueError(f"cost {cost} exceeds burst {max_burst} of {name}")
+        keys.append(BUCKET_KEY.format(name=name, ident=ident))
+        args += [rate, max_burst]
+    return _run_take(keys, args)
+
+
+def take_message(room_id, user_id) -> float:
+    """
+    메시지 1건: 보낸 유저 버킷 + 방 버킷
+    """
+    return take([("message_user", user_id), ("message_room", room_id)])
+
+
+def take_upload(user_id, count: int) -> float:
+    """
+    이미지 업로드: 유저 버킷에서 이미지 수만큼 차감 (count는 burst("upload_user") 이하)
+    """
+    return take([("upload_user", user_id)], cost=count)
@@ -0,0 +1,115 @@
+# apps/chat/reads.py
+import asyncio
+from typing import Dict, List, Tuple
+
+from channels.db import database_sync_to_async
+from django.db.models import Max
+
+from . import room_list, snapshot
+from .groups import room_group, wire_event
+from .models import ChatMessage, ChatReadState, ChatRoom
+
+READ_FLUSH_INTERVAL = 0.5  # sec. 이 시간 안에 들어온 읽음 이벤트는 한 번에 처리
+
+
+@database_sync_to_async
+def persist_reads(room_id, reads: Dict[int, int]) -> Tuple[List[dict], Dict[int, int]]:
+    """
+    {user_id: msg_id}를 워터마크에 반영하고, (브로드캐스트할 읽음 목록, {user_id: 안 읽은 수})를 반환.
+    방의 워터마크를 한 번만 조회해서 read_count와 안 읽은 수를 모두 계산함.
+    """
+    # 방에 없는 (미래의) 메시지 id로 워터마크가 올라가지 않도록 최신 메시지 id로 제한
+    max_id = ChatMessage.objects.filter(room_id=room_id).aggregate(m=Max("id"))["m"]
+    if not max_id:
+        return [], {}
+
+    advanced = [
+        user_id for user_id, msg_id in reads.items()
+        if ChatReadState.objects.advance(room_id, user_id, min(msg_id, max_id))
+    ]
+    if advanced:
+        ChatRoom.objects.bump_version([room_id])
+        room_list.invalidate_users(advanced)  # 안 읽은 수가 바뀜
+    snapshot.advance_reads(room_id, {user_id: min(msg_id, max_id) for user_id, msg_id in reads.items()})
+
+    states = list(
+        ChatReadState.objects.filter(room_id=room_id)
+        .values_list("user_id", "last_read_message_id", "unread_count")
+    )
+    watermarks = [last for _, last, _ in states]
+    unread = {user_id: count for user_id, _, count in states if user_id in reads}
+    results = []
+    for user_id, msg_id in reads.items():
+        msg_id = min(msg_id, max_id)
+        results.append({
+            "user_id": user_id,
+            "msg_id": msg_id,
+            "read_count": sum(1 for last in watermarks if last >= msg_id),
+        })
+    return results, unread
+
+
+class ReadCoalescer:
+    """
+    워커(프로세스)마다 하나씩 있는 읽음 이벤트 모음통.
+
+    스크롤하면서 초당 수십 개씩 오는 {"type": "read"} 프레임을
+    방별로 {user_id: 가장 큰 msg_id}만 남기고 모아두었다가,
+    interval마다 DB에 한 번 반영하고 방에 읽음 이벤트를 한 번만 보낸다.
+    """
+
+    def __init__(self, interval: float = READ_FLUSH_INTERVAL):
+        self.interval = interval
+        self._pending: Dict[int, Dict[int, int]] = {}
+        self._timers: Dict[int, asyncio.Task] = {}
+
+    def add(self, channel_layer, room_id, user_id: int, msg_id: int) -> None:
+        room_id = int(room_id)
+        reads = self._pending.setdefault(room_id, {})
+        if msg_id > reads.get(user_id, 0):
+            reads[user_id] = msg_id
+
+        # 이번 tick의 flush가 아직 예약되지 않았다면 예약
+        timer = self._timers.get(room_id)
+        if timer is None or timer.get_loop() is not asyncio.get_running_loop():
+            self._timers[room_id] = asyncio.create_task(
+                self._flush_later(channel_layer, room_id)
+            )
+
+    async def _flush_later(self, channel_layer, room_id: int) -> None:
+        await asyncio.sleep(self.interval)
+        self._timers.pop(room_id, None)
+        await self._flush(channel_layer, room_id)
+
+    async def flush(self, channel_layer, room_id) -> None:
+        """
+        예약된 tick을 기다리지 않고 즉시 처리 (연결 종료 시 등)
+        """
+        room_id = int(room_id)
+        timer = self._timers.pop(room_id, None)
+        if timer:
+            timer.cancel()
+        await self._flush(channel_layer, room_id)
+
+    async def _flush(self, channel_layer, room_id: int) -> None:
+        reads = self._pending.pop(room_id, None)
+        if not reads:
+            return
+
+        results, unread = await persist_reads(room_id, reads)
+        if results:
+            user_ids = [read["user_id"] for read in results]
+            await channel_layer.group_send(
+                room_group(room_id),
+                wire_event(
+                    "chat_read",
+                    {"event": "read", "room_id": room_id, "reads": results},
+                    room_id=room_id,
+                    user_ids=user_ids,
+                    # UserChatConsumer의 room_update용 (user_ids와 같은 순서)
+                    unread_counts=[unread.get(user_id, 0) for user_id in user_ids],
+                ),
+            )
+
+
+read_coalescer = ReadCoalescer()
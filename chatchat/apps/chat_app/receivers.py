@@ -0,0 +1,193 @@
+# apps/chat/receivers.py
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import blobs, imaging, membership, notifications, room_list, snapshot
+from .groups import user_group
+from .models import ChatMessage, ChatReadState, ChatRoom, Image, User
+from .signals import messages_created
+
+
+@receiver(messages_created, sender=ChatMessage)
+def advance_sender_watermarks(sender, messages, **kwargs):
+    """
+    보낸 사람은 자기 메시지를 읽은 것으로 처리.
+    (방, 보낸 사람)마다 가장 큰 메시지 id로 워터마크를 한 번만 올림.
+    """
+    latest = {}
+    for msg in messages:
+        key = (msg.room_id, msg.sender_id)
+        latest[key] = max(latest.get(key, 0), msg.pk)
+
+    for (room_id, user_id), msg_id in latest.items():
+        ChatReadState.objects.advance(room_id, user_id, msg_id)
+        snapshot.advance_reads(room_id, {user_id: msg_id})
+
+
+@receiver(messages_created, sender=ChatMessage)
+def update_last_message(sender, messages, **kwargs):
+    """
+    방마다 가장 최신 메시지로 방 목록용 스냅샷을 갱신하고 방 버전을 올림.
+    참가자들의 방 목록 캐시는 커밋 후 무효화
+    """
+    latest = {}
+    for msg in messages:
+        if msg.room_id not in latest or msg.pk > latest[msg.room_id].pk:
+            latest[msg.room_id] = msg
+
+    for room_id, msg in latest.items():
+        user = membership.get_user(msg.sender_id)
+        if not ChatRoom.objects.set_last_message(msg, user.nickname if user else ""):
+            ChatRoom.objects.bump_version([room_id])  # 더 최신 메시지가 먼저 반영됨. 버전만 올림
+    transaction.on_commit(lambda: room_list.invalidate_rooms(list(latest)))
+
+
+@receiver(messages_created, sender=ChatMessage)
+def count_unread(sender, messages, **kwargs):
+    """
+    방 참가자들의 안 읽은 수를 새 메시지 수만큼 올림 (방 목록에서 COUNT 하지 않도록)
+    """
+    ChatReadState.objects.add_unread(messages)
+
+
+@receiver(messages_created, sender=ChatMessage)
+def enqueue_push_notifications(sender, messages, **kwargs):
+    """
+    방에 접속해 있지 않은 참가자에게 보낼 푸시를 쌓아둠 (전송은 send_push_notifications 워커)
+    """
+    transaction.on_commit(lambda: notifications.enqueue(messages))
+
+
+@receiver(m2m_changed, sender=ChatRoom.participants.through)
+def participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    참가자가 바뀌면(create_room, out, room.participants.add/remove, user.chat_rooms...)
+      1) 해당 방의 참가자 캐시와 관련 유저들의 방 목록 캐시를 지우고
+      2) 유저들의 UserChatConsumer에 방 구독 추가/해제를 알림
+    커밋 후에 처리해야 옛 데이터로 캐시가 다시 채워지지 않음.
+    """
+    if action == "pre_clear":
+        # clear()는 post_clear에 pk_set이 없으므로 지우기 전 목록을 기억해 둠
+        related = instance.chat_rooms if reverse else instance.participants
+        instance._cleared_pks = set(related.values_list("id", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if action == "post_clear":
+        pk_set = getattr(instance, "_cleared_pks", set())
+
+    # (room_id, user_id) 쌍으로 정리
+    if reverse:
+        pairs = [(room_id, instance.pk) for room_id in pk_set]
+    else:
+        pairs = [(instance.pk, user_id) for user_id in pk_set]
+    if not pairs:
+        return
+
+    ChatRoom.objects.bump_version({room_id for room_id, _ in pairs})
+
+    if action == "post_add":
+        # 안 읽은 수를 메시지 저장 때부터 셀 수 있도록 참가자 행을 같은 트랜잭션에서 만듦
+        ChatReadState.objects.create_missing(pairs)
+
+    event_type = "rooms_joined" if action == "post_add" else "rooms_left"
+
+    def notify():
+        channel_layer = get_channel_layer()
+        rooms_by_user = {}
+        for room_id, user_id in pairs:
+            rooms_by_user.setdefault(user_id, []).append(room_id)
+        for room_id in {room_id for room_id, _ in pairs}:
+            membership.invalidate_room(room_id)
+        # 남은 참가자(참가자 목록이 바뀜) + 들어오거나 나간 유저(방이 생기거나 사라짐)
+        room_list.invalidate_rooms({room_id for room_id, _ in pairs})
+        room_list.invalidate_users(rooms_by_user)
+        for user_id, room_ids in rooms_by_user.items():
+            async_to_sync(channel_layer.group_send)(
+                user_group(user_id), {"type": event_type, "room_ids": room_ids}
+            )
+
+    transaction.on_commit(notify)
+
+
+@receiver(post_save, sender=ChatRoom)
+def invalidate_saved_room(sender, instance, created, **kwargs):
+    """
+    방 제목 등이 바뀌면 참가자들의 방 목록 캐시를 무효화
+    """
+    if not created:
+        transaction.on_commit(lambda: room_list.invalidate_rooms([instance.pk]))
+
+
+@receiver(pre_delete, sender=ChatRoom)
+def remember_deleted_room_members(sender, instance, **kwargs):
+    # 삭제되면 참가자 행도 같이 사라지므로 미리 기억해 둠
+    instance._member_ids = set(instance.participants.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=ChatRoom)
+def invalidate_deleted_room(sender, instance, **kwargs):
+    member_ids = getattr(instance, "_member_ids", set())
+
+    def invalidate():
+        membership.invalidate_room(instance.pk)
+        room_list.invalidate_users(member_ids)
+
+    transaction.on_commit(invalidate)
+
+
+PROFILE_FIELDS = ("nickname", "profile_img", "profile_thumb")  # 방 응답에 들어가는 유저 필드
+
+
+@receiver(pre_save, sender=User)
+def bump_rooms_on_profile_change(sender, instance, update_fields=None, **kwargs):
+    """
+    닉네임/프로필 이미지가 바뀌면 참가한 방들의 버전을 올리고 (sync/ETag가 알아차리도록)
+    같은 방 유저들의 방 목록 캐시를 무효화.
+    last_login 갱신처럼 해당 필드를 저장하지 않는 save는 조회 없이 넘어감.
+    """
+    if instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(PROFILE_FIELDS):
+        return
+    old = User.objects.filter(pk=instance.pk).values(*PROFILE_FIELDS).first()
+    if old is None:
+        return
+    new = {
+        "nickname": instance.nickname,
+        "profile_img": instance.profile_img.name,
+        "profile_thumb": instance.profile_thumb.name,
+    }
+    if any((old[name] or None) != (new[name] or None) for name in PROFILE_FIELDS):
+        def profile_changed():
+            ChatRoom.objects.bump_version_for_user(instance.pk)
+            room_list.invalidate_user_rooms(instance.pk)
+
+        transaction.on_commit(profile_changed)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_identity(sender, instance, **kwargs):
+    transaction.on_commit(lambda: membership.invalidate_user(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def make_profile_thumbnail(sender, instance, **kwargs):
+    """
+    프로필 이미지가 바뀌었으면 목록용 썸네일을 백그라운드에서 다시 만듦
+    """
+    if imaging.profile_thumb_stale(instance):
+        transaction.on_commit(lambda: imaging.schedule_profile(instance.pk))
+
+
+@receiver(post_delete, sender=Image)
+def release_image_blob(sender, instance, **kwargs):
+    """
+    Image가 지워지면(메시지 삭제로 같이 지워지는 경우 포함) 공유 blob 참조를 하나 놓음
+    """
+    if instance.blob_id:
+        transaction.on_commit(lambda: blobs.release(instance.blob_id))
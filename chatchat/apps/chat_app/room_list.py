@@ -0,0 +1,81 @@
+# apps/chat/room_list.py
+# 유저별 방 목록 응답 캐시.
+# 직렬화된 목록(접속 중인 유저 제외)을 유저마다 저장해 두고, 목록이 바뀌는 이벤트
+# (새 메시지, 읽음 위치, 참가자 변경, 방 제목, 참가자 닉네임/프로필 이미지)가 생기면 그 유저들 것만 무효화함.
+# 접속 중인 유저는 자주 바뀌므로 캐시하지 않고 응답할 때마다 presence에서 채움.
+import uuid
+from typing import Iterable, Optional, Tuple
+
+from django.core.cache import cache
+
+from . import membership, metrics
+from .models import ChatRoom
+
+ROOM_LIST_KEY = "chat:user:{user_id}:room_list"
+# 무효화할 때마다 새 값으로 바뀌는 세대 토큰. 캐시 항목은 만들 때의 토큰과 같을 때만 유효함
+# (DB를 읽는 사이 무효화가 일어나면, 늦게 저장된 옛 목록이 쓰이지 않도록)
+ROOM_LIST_GEN_KEY = "chat:user:{user_id}:room_list:gen"
+ROOM_LIST_TTL = 60 * 60
+
+
+def _keys(user_id) -> Tuple[str, str]:
+    return ROOM_LIST_KEY.format(user_id=user_id), ROOM_LIST_GEN_KEY.format(user_id=user_id)
+
+
+def get(user_id) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    반환: (캐시된 목록 또는 None, 지금 세대 토큰). 없으면 put()에 세대 토큰을 그대로 넘겨서 저장.
+    캐시 항목: {"stamp": ETag용 해시, "rooms": [직렬화된 방, ...]}
+    """
+    entry_key, gen_key = _keys(user_id)
+    found = cache.get_many([entry_key, gen_key])  # 왕복 1회
+    gen = found.get(gen_key)
+    entry = found.get(entry_key)
+    if entry is not None and entry["gen"] == gen:
+        metrics.incr("room_list_cache.hit")
+        return entry, gen
+    metrics.incr("room_list_cache.miss")
+    return None, gen
+
+
+def put(user_id, gen: Optional[str], entry: dict) -> None:
+    entry_key, _ = _keys(user_id)
+    cache.set(entry_key, {**entry, "gen": gen}, ROOM_LIST_TTL)
+
+
+def invalidate_users(user_ids: Iterable[int]) -> None:
+    """
+    유저들의 캐시를 무효화 (세대 토큰 교체, 왕복 1회)
+    """
+    gen = uuid.uuid4().hex
+    tokens = {_keys(user_id)[1]: gen for user_id in set(user_ids)}
+    if tokens:
+        cache.set_many(tokens, ROOM_LIST_TTL)
+
+
+def invalidate_rooms(room_ids: Iterable[int]) -> None:
+    """
+    방 참가자 전원의 캐시를 무효화 (새 메시지, 방 제목/참가자 변경 등)
+    """
+    user_ids = set()
+    for room_id in set(room_ids):
+        user_ids |= membership.member_ids(room_id)
+    invalidate_users(user_ids)
+
+
+def invalidate_user_rooms(user_id) -> None:
+    """
+    user와 같은 방에 있는 모든 유저의 캐시를 무효화 (user의 닉네임/프로필 이미지가 바뀜)
+    """
+    invalidate_rooms(
+        ChatRoom.objects.filter(participants=user_id).values_list("id", flat=True)
+    )
+
+
+def _hit_rate() -> float:
+    hits = metrics.counter("room_list_cache.hit")
+    total = hits + metrics.counter("room_list_cache.miss")
+    return hits / total if total else 0.0
+
+
+metrics.gauge("room_list_cache.hit_rate", _hit_rate)
@@ -1,7 +1,8 @@
 from django.urls import path, re_path
-from .consumers import ChatConsumer, MatchConsumer
+from .consumers import ChatConsumer, MatchConsumer, UserChatConsumer
 print("✅ [Routing] WebSocket URL patterns loaded")
 websocket_urlpatterns = [
     re_path(r"ws/chat/(?P<room_id>\d+)/(?P<user_id>\d+)/$", ChatConsumer.as_asgi()),
+    re_path(r"ws/chat/user/(?P<user_id>\d+)/$", UserChatConsumer.as_asgi()),  # 유저의 모든 방을 연결 하나로
     re_path(r"ws/match/$", MatchConsumer.as_asgi()),  # 추가
 ]
\ No newline at end of file
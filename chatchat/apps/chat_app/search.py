@@ -0,0 +1,199 @@
+# apps/chat/search.py
+# 메시지 전문 검색.
+#   - SQLite: FTS5 가상 테이블(chat_app_chatmessage_fts). 메시지 테이블을 content로 쓰고
+#     INSERT/UPDATE/DELETE 트리거가 색인을 바로바로 갱신함 (bulk_create, 방 삭제로 같이 지워지는 경우 포함)
+#   - PostgreSQL: to_tsvector(text) GIN 식 인덱스. 행이 바뀌면 PostgreSQL이 인덱스를 갱신함
+# 검색어는 단어마다 접두어 검색 ("안녕" → "안녕하세요"), 모든 단어가 들어간 메시지만.
+# 결과는 관련도 순 + 같은 점수면 최신 순이고, (점수, id) 커서로 이어서 받음.
+import base64
+import json
+import re
+from typing import List, Optional, Tuple
+
+from django.db import connection, transaction
+
+from .models import ChatMessage
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_PAGE_MAX = 100
+SEARCH_REBUILD_BATCH = 5000
+
+FTS_TABLE = "chat_app_chatmessage_fts"
+PG_INDEX = "chat_app_chatmessage_text_fts"
+PG_CONFIG = "simple"  # 한국어 형태소 사전이 없으므로 공백 단위 (접두어 검색으로 조사 붙은 단어도 찾음)
+
+# 메시지 테이블을 다시 만드는 마이그레이션(SQLite의 AlterField 등)은 트리거를 지우므로,
+# install()은 몇 번 실행해도 되도록 IF NOT EXISTS로 만듦 (rebuild_search_index가 먼저 실행).
+# 마이그레이션 0011_message_search에 같은 SQL이 들어 있음 (바꾸면 새 마이그레이션도 추가)
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text, content='chat_app_chatmessage', content_rowid='id', tokenize='unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON chat_app_chatmessage BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON chat_app_chatmessage BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF text ON chat_app_chatmessage BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+]
+SQLITE_UNINSTALL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+# SearchVector("text", config=PG_CONFIG)가 만드는 식과 같아야 인덱스를 탐
+PG_INSTALL = [
+    f"""CREATE INDEX IF NOT EXISTS {PG_INDEX} ON chat_app_chatmessage
+        USING GIN (to_tsvector('{PG_CONFIG}'::regconfig, COALESCE(text, '')))""",
+]
+PG_UNINSTALL = [f"DROP INDEX IF EXISTS {PG_INDEX}"]
+
+
+class SearchError(Exception):
+    pass
+
+
+def backend(conn=connection) -> Optional[str]:
+    return conn.vendor if conn.vendor in ("sqlite", "postgresql") else None
+
+
+def install(conn=connection) -> None:
+    statements = {"sqlite": SQLITE_INSTALL, "postgresql": PG_INSTALL}.get(backend(conn), [])
+    with conn.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def uninstall(conn=connection) -> None:
+    statements = {"sqlite": SQLITE_UNINSTALL, "postgresql": PG_UNINSTALL}.get(backend(conn), [])
+    with conn.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def rebuild(batch_size: int = SEARCH_REBUILD_BATCH):
+    """
+    색인을 처음부터 다시 만듦. SQLite는 비우기와 다시 채우기를 트랜잭션 하나로 (id 순으로 batch_size개씩),
+    PostgreSQL은 인덱스를 REINDEX. 배치마다 지금까지 색인한 메시지 수를 yield.
+    SQLite는 쓰기가 한 번에 하나라 다시 만드는 동안 트리거가 같은 메시지를 먼저 넣지 못하고,
+    중간에 멈추면 롤백되어 기존 색인이 그대로 남음.
+    """
+    install()
+    if backend() == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"REINDEX INDEX {PG_INDEX}")
+        yield ChatMessage.objects.count()
+        return
+    if backend() != "sqlite":
+        return
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        done, last_id = 0, 0
+        while True:
+            cursor.execute(
+                "SELECT id FROM chat_app_chatmessage WHERE id > %s ORDER BY id LIMIT %s",
+                [last_id, batch_size],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                return
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, text) "
+                "SELECT id, text FROM chat_app_chatmessage WHERE id BETWEEN %s AND %s",
+                [ids[0], ids[-1]],
+            )
+            done += len(ids)
+            last_id = ids[-1]
+            yield done
+
+
+# ────────────────────────── 검색 ──────────────────────────
+def terms(query: str) -> List[str]:
+    # 글자/숫자만 남김 → FTS5/tsquery 문법 문자가 섞여도 안전
+    return re.findall(r"\w+", query)
+
+
+def encode_cursor(score: float, msg_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([score, msg_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        score, msg_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), int(msg_id)
+    except (ValueError, TypeError):
+        raise SearchError("cursor가 올바르지 않습니다.")
+
+
+def _search_sqlite(words, room_ids_sql, params, after, limit) -> List[Tuple[int, float]]:
+    match = " ".join('"%s"*' % word for word in words)  # 모든 단어를 접두어로 (AND)
+    sql = f"""
+        SELECT m.id, s.score FROM (
+            SELECT rowid, bm25({FTS_TABLE}) AS score FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s
+        ) s
+        JOIN chat_app_chatmessage m ON m.id = s.rowid
+        WHERE m.room_id IN ({room_ids_sql})
+    """
+    args = [match, *params]
+    if after:
+        sql += " AND (s.score > %s OR (s.score = %s AND m.id < %s))"
+        args += [after[0], after[0], after[1]]
+    sql += " ORDER BY s.score, m.id DESC LIMIT %s"
+    args.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, args)
+        return cursor.fetchall()
+
+
+def _search_postgresql(words, room_ids_sql, params, after, limit) -> List[Tuple[int, float]]:
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+    from django.db.models import Q
+    from django.db.models.expressions import RawSQL
+
+    vector = SearchVector("text", config=PG_CONFIG)
+    query = SearchQuery(" & ".join(f"{word}:*" for word in words), config=PG_CONFIG, search_type="raw")
+    qs = (
+        ChatMessage.objects
+        .annotate(document=vector, score=-SearchRank(vector, query))  # bm25처럼 작을수록 관련도 높게
+        .filter(document=query, room_id__in=RawSQL(room_ids_sql, params))
+    )
+    if after:
+        qs = qs.filter(Q(score__gt=after[0]) | Q(score=after[0], id__lt=after[1]))
+    return list(qs.order_by("score", "-id").values_list("id", "score")[:limit])
+
+
+def search(user, query: str, room_id=None, cursor: str = None,
+           limit: int = SEARCH_PAGE_SIZE) -> Tuple[List[ChatMessage], Optional[str]]:
+    """
+    user가 참가한 방(room_id를 주면 그 방만)의 메시지 중 query의 모든 단어가 들어간 것.
+    반환: (관련도 순 메시지, 다음 페이지 커서 또는 None)
+    """
+    words = terms(query)
+    if not words:
+        return [], None
+    if backend() is None:
+        raise SearchError("이 데이터베이스에서는 메시지 검색을 지원하지 않습니다.")
+    after = decode_cursor(cursor) if cursor else None
+    limit = max(1, min(limit, SEARCH_PAGE_MAX))
+
+    room_ids_sql = "SELECT chatroom_id FROM chat_app_chatroom_participants WHERE user_id = %s"
+    params = [user.id]
+    if room_id is not None:
+        room_ids_sql += " AND chatroom_id = %s"
+        params.append(room_id)
+
+    run = _search_sqlite if backend() == "sqlite" else _search_postgresql
+    hits = run(words, room_ids_sql, params, after, limit + 1)
+    next_cursor = encode_cursor(hits[limit - 1][1], hits[limit - 1][0]) if len(hits) > limit else None
+    hits = hits[:limit]
+
+    by_id = ChatMessage.objects.select_related("sender").prefetch_related("images").in_bulk(
+        [msg_id for msg_id, _ in hits]
+    )
+    return [by_id[msg_id] for msg_id, _ in hits if msg_id in by_id], next_cursor
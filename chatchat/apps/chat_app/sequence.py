@@ -0,0 +1,131 @@
+# apps/chat/sequence.py
+import json
+from typing import List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db.models import Max
+
+# 방마다 1씩 증가하는 메시지 순번 (ChatMessage.seq 에 저장됨)
+SEQ_KEY = "chat:room:{room_id}:seq"
+
+# 최근 메시지를 담아두는 방별 Redis Stream (재접속 시 빠진 구간 재전송용)
+STREAM_KEY = "chat:room:{room_id}:stream"
+STREAM_MAXLEN = 500    # 방마다 최근 약 500개만 보관 (그보다 오래된 구간은 DB에서)
+STREAM_TTL = 60 * 60 * 24
+REPLAY_LIMIT = 200     # 한 번에 재전송하는 최대 개수. 넘으면 complete=False → 클라이언트가 REST로 다시 받음
+
+# 키가 있으면 INCR, 없으면(만료/flush) -1 → DB 최대값으로 다시 시작
+_INCR_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+return redis.call('INCR', KEYS[1])
+"""
+
+
+_incr_script = None
+
+
+def _client():
+    return cache.client.get_client()  # raw redis client
+
+
+def next_seq_cached(room_id) -> Optional[int]:
+    """
+    Redis 카운터만으로 다음 순번을 받음 (DB 안 씀 → consumer는 DB 스레드를 기다리지 않고 호출).
+    카운터가 없으면 None.
+    """
+    # 스크립트 본문은 처음 한 번만 보내고 이후에는 EVALSHA
+    global _incr_script
+    client = _client()
+    if _incr_script is None:
+        _incr_script = client.register_script(_INCR_IF_EXISTS)
+    seq = _incr_script(keys=[SEQ_KEY.format(room_id=room_id)], client=client)
+    return None if seq == -1 else seq
+
+
+def next_seq(room_id) -> int:
+    """
+    방의 다음 순번. 여러 워커가 동시에 호출해도 겹치지 않음 (Redis INCR).
+    Redis 키가 사라졌으면 DB에 저장된 최대 seq부터 이어서 시작.
+    """
+    seq = next_seq_cached(room_id)
+    if seq is not None:
+        return seq
+
+    from .models import ChatMessage
+
+    client = _client()
+    key = SEQ_KEY.format(room_id=room_id)
+    last = ChatMessage.objects.filter(room_id=room_id).aggregate(m=Max("seq"))["m"] or 0
+    client.set(key, last, nx=True)  # 동시에 다른 워커가 먼저 채웠으면 그 값을 사용
+    return client.incr(key)
+
+
+def append(room_id, entries: List[Tuple[int, dict]]) -> None:
+    """
+    브로드캐스트한 메시지를 방 Stream에 추가. entries = [(seq, payload), ...]
+    """
+    if not entries:
+        return
+    key = STREAM_KEY.format(room_id=room_id)
+    pipe = _client().pipeline(transaction=False)
+    for seq, payload in entries:
+        pipe.xadd(key, {"seq": seq, "payload": json.dumps(payload)},
+                  maxlen=STREAM_MAXLEN, approximate=True)
+    pipe.expire(key, STREAM_TTL)
+    pipe.execute()
+
+
+def recent(room_id, count: int) -> Optional[List[dict]]:
+    """
+    Stream에 있는 최근 메시지 count개 (seq 순). Stream이 비어 있으면 None.
+    """
+    entries = _client().xrevrange(STREAM_KEY.format(room_id=room_id), count=count)
+    if not entries:
+        return None
+    by_seq = sorted(
+        (int(fields[b"seq"]), fields[b"payload"]) for _, fields in entries
+    )
+    return [json.loads(payload) for _, payload in by_seq]
+
+
+def replay_from_stream(room_id, last_seq: int) -> Optional[List[dict]]:
+    """
+    last_seq 이후 메시지를 Stream에서 찾음. Stream이 그 구간을 다 갖고 있지 않으면 None.
+    """
+    entries = _client().xrange(STREAM_KEY.format(room_id=room_id))
+    if not entries:
+        return None
+
+    # 여러 워커가 append하므로 Stream 안의 순서가 seq 순서와 다를 수 있음
+    by_seq = sorted(
+        (int(fields[b"seq"]), fields[b"payload"]) for _, fields in entries
+    )
+    if by_seq[0][0] > last_seq + 1:
+        return None  # 빠진 구간의 앞부분이 이미 Stream에서 밀려남
+    return [json.loads(payload) for seq, payload in by_seq if seq > last_seq]
+
+
+def replay(room_id, last_seq: int) -> Tuple[List[dict], bool]:
+    """
+    last_seq 이후 빠진 메시지 목록 (seq 순). Stream에 없으면 DB에서 읽음.
+    반환: (메시지 목록, 전부 보냈는지)
+    """
+    messages = replay_from_stream(room_id, last_seq)
+    if messages is None:
+        from .models import ChatMessage
+        from .serializers import ChatMessageSerializer, attachment_fields
+
+        qs = (
+            ChatMessage.objects.filter(room_id=room_id, seq__gt=last_seq)
+            .select_related("sender")
+            .prefetch_related("images")
+            .order_by("seq")[:REPLAY_LIMIT + 1]
+        )
+        messages = []
+        for data in ChatMessageSerializer(qs, many=True).data:
+            messages.append({**data, **attachment_fields(data["images"])})
+
+    complete = len(messages) <= REPLAY_LIMIT
+    return messages[:REPLAY_LIMIT], complete
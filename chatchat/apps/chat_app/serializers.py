@@ -1,21 +1,54 @@
 from rest_framework import serializers
-from .models import ChatRoom, ChatMessage, Image
+from .models import ChatRoom, ChatMessage, ChatReadState, Image
+from . import presence
 
 
 class ImageSerializer(serializers.ModelSerializer):
     """
     이미지 모델을 직렬화하는 클래스.
+    variants: 크기별 URL. 아직 처리 중이면 모두 원본 URL
     """
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Image
-        fields = ('id', 'image')
-        read_only_fields = ('id',)  # ID는 읽기 전용
+        fields = ('id', 'image', 'status', 'variants')
+        read_only_fields = ('id', 'status')  # ID는 읽기 전용
+
+    def get_variants(self, obj):
+        original = obj.image.url
+        return {
+            "thumbnail": obj.thumbnail.url if obj.thumbnail else original,
+            "preview": obj.preview.url if obj.preview else original,
+            "original": original,
+        }
+
+
+def attachment_fields(images) -> dict:
+    """
+    직렬화된 이미지 목록 → 메시지 이벤트에 붙는 필드
+      img_urls: 원본 URL 목록 (기존 클라이언트용), img_variants: 크기별 URL 목록
+    """
+    return {
+        "img_urls": [img["image"] for img in images],
+        "img_variants": [img["variants"] for img in images],
+    }
+
+
+def profile_image_url(user):
+    """
+    목록/참가자 표시용 프로필 이미지 (썸네일이 있으면 썸네일)
+    """
+    if user.profile_thumb:
+        return user.profile_thumb.url
+    return user.profile_img.url if user.profile_img else None
 
 class ChatMessageSerializer(serializers.ModelSerializer):
     # 모델에는 없는 필드지만, 직접 계산해서 응답에 포함시킴
     # 첨부파일이 있을 경우 해당 파일의 URL 반환   
     # 모델에는 없지만, 이 메시지를 읽은 사람 수를 계산해서 응답에 포함
     read_count     = serializers.SerializerMethodField()
+    read_by        = serializers.SerializerMethodField()
     sender_nickname = serializers.CharField(source='sender.nickname', read_only=True)
     images = ImageSerializer(many=True, read_only=True)
     
@@ -26,11 +59,12 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         model = ChatMessage
         fields = (
             "id",              # 메시지 고유 ID
+            "seq",             # 방 안에서의 순번 (재접속 시 빠진 구간 확인용)
             "room",            # 어떤 채팅방에 속한 메시지인지
             "sender",          # 누가 보낸 메시지인지 (User 객체)
             "sender_nickname",# 보낸 사람의 닉네임 (읽기 전용)
             "text",            # 메시지 텍스트 내용
-            "read_by",         # 누가 읽었는지 (ManyToManyField)
+            "read_by",         # 누가 읽었는지 (읽음 워터마크로 계산)
             "read_count",      # 읽은 사람 수 (계산됨)
             "created_at",      # 메시지 생성 시각
             "images",         # 첨부된 이미지들 (ManyToManyField)
@@ -38,16 +72,48 @@ class ChatMessageSerializer(serializers.ModelSerializer):
 
         # 사용자가 직접 수정하거나 보낼 수 없는 읽기 전용 필드 지정
         read_only_fields = (
-            "sender", "read_by", "attachment_url",
+            "seq", "sender", "read_by", "attachment_url",
             "read_count", "created_at", 
         )
 
+    def _read_watermarks(self, obj):
+        """
+        방의 (user_id, 마지막으로 읽은 메시지 id) 목록.
+        여러 메시지를 직렬화해도 방마다 한 번만 조회하도록 context에 저장해 둠.
+        """
+        cache = self.context.setdefault("read_watermarks", {})
+        if obj.room_id not in cache:
+            cache[obj.room_id] = list(
+                ChatReadState.objects.filter(room_id=obj.room_id)
+                .values_list("user_id", "last_read_message_id")
+            )
+        return cache[obj.room_id]
+
+    def get_read_by(self, obj):
+        """
+        이 메시지를 읽은 유저 id 목록 (워터마크가 메시지 id 이상인 유저).
+        """
+        return [uid for uid, last in self._read_watermarks(obj) if last >= obj.pk]
+
     def get_read_count(self, obj):
         """
         이 메시지를 읽은 사람의 수를 반환.
-        read_by는 ManyToManyField이므로 .count()로 계산 가능.
+        read_by 행 대신 방의 읽음 워터마크로 계산함.
         """
-        return obj.read_by.count()
+        return len(self.get_read_by(obj))
+
+def last_message_fields(room):
+    """
+    방에 저장된 마지막 메시지 스냅샷 → 응답용 dict. 메시지가 없으면 None
+    """
+    if room.last_message_id is None:
+        return None
+    return {
+        "text": room.last_message_text,
+        "sender": room.last_message_sender,  # 보낸 사람의 닉네임
+        "created_at": room.last_message_at,
+    }
+
 
 class ChatRoomListSerializer(serializers.ModelSerializer):
     # 해당 채팅방에서 오간 메시지들을 포함해서 응답에 보여줌
@@ -56,6 +122,7 @@ class ChatRoomListSerializer(serializers.ModelSerializer):
     last_message = serializers.SerializerMethodField()
     participants_profile_imgs = serializers.SerializerMethodField()
     not_read_count = serializers.SerializerMethodField()
+    online_user_ids = serializers.SerializerMethodField()
 
     class Meta:
         model = ChatRoom
@@ -68,6 +135,7 @@ class ChatRoomListSerializer(serializers.ModelSerializer):
             "last_message",  # 채팅방의 마지막 메시지
             "participants_profile_imgs",  # 참가자들의 프로필 이미지 URL
             "not_read_count",  # 읽지 않은 메시지 수
+            "online_user_ids",  # 지금 접속 중인 참가자 id
         )
         # 생성 시간은 사용자가 수정할 수 없게 읽기 전용으로 설정
         read_only_fields = ("created_at",)
@@ -81,54 +149,56 @@ class ChatRoomListSerializer(serializers.ModelSerializer):
             return {
                 "id": obj.object_id,
                 "title": obj.content_object.title if obj.content_object else None,
-                "content_type": obj.content_object._meta.model_name  # 모델 이름
+                "content_type": obj.content_type.model  # 모델 이름 (연결된 객체가 삭제돼도 남아 있음)
 
             }
         return None
 
     def get_last_message(self, obj):
         """
-        채팅방의 마지막 메시지를 반환.
+        채팅방의 마지막 메시지를 반환 (방에 저장된 스냅샷, 추가 쿼리 없음).
         없으면 None을 반환.
         """
-        last_message = obj.messages.last()
-        if last_message:
-            return {
-                "text": last_message.text,
-                "sender": last_message.sender.nickname,  # 보낸 사람의 닉네임
-                "created_at": last_message.created_at,
-            }
+        return last_message_fields(obj)
 
     def get_participants_profile_imgs(self, obj):
         """
         채팅방 참가자들의 프로필 이미지 URL을 최대 4개 반환.
+        목록 API는 앞 4명을 preview_participants로 미리 가져옴.
         """
+        participants = getattr(obj, "preview_participants", None)
+        if participants is None:
+            participants = obj.participants.all()[:4]
         profile_imgs = []
-        for participant in obj.participants.all()[:4]:
-            if participant.profile_img:
-                profile_imgs.append(participant.profile_img.url)
-            else:
-                profile_imgs.append(None)
+        for participant in participants:
+            profile_imgs.append(profile_image_url(participant))
 
         return profile_imgs
 
     def get_not_read_count(self, obj):
         """
         현재 사용자가 읽지 않은 메시지 수를 반환.
+        목록 API는 쿼리셋에서 my_unread_count로 같이 가져옴 (카운터 행이 없는 방만 따로 셈).
+        """
+        unread = getattr(obj, "my_unread_count", None)
+        if unread is None:
+            return ChatReadState.objects.unread_count(obj.id, self.context['request'].user.id)
+        return unread
+
+    def get_online_user_ids(self, obj):
         """
-        user = self.context['request'].user
-        read_count = obj.messages.filter(
-            read_by=user
-        ).count()
-        total_count = obj.messages.count()
-        return total_count - read_count if total_count else 0
+        이 방에 접속 중인 유저 id 목록.
+        목록 API는 context["online_users"]에 모든 방의 presence를 한 번에 담아서 넘겨줌.
+        """
+        online_users = self.context.get("online_users")
+        if online_users is None:
+            return sorted(presence.online_users(obj.id))
+        return sorted(online_users.get(obj.id, ()))
 
         
 
 class ChatRoomSerializer(serializers.ModelSerializer):
-    # 해당 채팅방에서 오간 메시지들을 포함해서 응답에 보여줌
-    # read_only=True: 메시지를 API로 수정하거나 생성하진 않음
-    messages = ChatMessageSerializer(many=True, read_only=True)
+    # 메시지 기록은 포함하지 않음 → GET /chatrooms/<pk>/messages/ 로 페이지 단위로 받음
     content_type_info = serializers.SerializerMethodField()
     participants_profile_imgs_and_nicknames = serializers.SerializerMethodField()
 
@@ -139,7 +209,6 @@ class ChatRoomSerializer(serializers.ModelSerializer):
             "title",        # 채팅방 제목 (예: 그룹명)
             "participants", # 채팅방 참가자들 (ManyToManyField)
             "created_at",   # 방 생성 시간
-            "messages",     # 이 방의 메시지들 (역참조)
             "content_type_info",  # 연결된 모델 정보 (예: 게시글)
             "participants_profile_imgs_and_nicknames",  # 참가자들의 프로필 이미지 URL과 닉네임
         )
@@ -167,7 +236,7 @@ class ChatRoomSerializer(serializers.ModelSerializer):
             participant_info = {
                 "id": participant.id,
                 "nickname": participant.nickname,
-                "profile_image": participant.profile_img.url if participant.profile_img else None
+                "profile_image": profile_image_url(participant)
             }
             participants_info.append(participant_info)
 
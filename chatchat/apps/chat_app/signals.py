@@ -0,0 +1,7 @@
+# apps/chat/signals.py
+from django.dispatch import Signal
+
+# 메시지가 새로 저장됐을 때 (save() 한 건이든 bulk_create 여러 건이든) 보내는 시그널.
+# bulk_create는 post_save를 보내지 않으므로, 메시지 생성 후처리는 모두 여기에 연결함.
+#   kwargs: messages = 저장된 ChatMessage 리스트 (pk 채워진 상태)
+messages_created = Signal()
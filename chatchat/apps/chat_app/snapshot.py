@@ -0,0 +1,106 @@
+# apps/chat/snapshot.py
+from typing import Dict, List
+
+from django.core.cache import cache
+
+from . import membership, presence, sequence
+
+SNAPSHOT_MESSAGES = 30   # 스냅샷에 넣을 최근 메시지 수 (sequence.STREAM_MAXLEN 이하)
+
+# 방의 읽음 워터마크 (Redis Hash: user_id → last_read_message_id)
+READS_KEY = "chat:room:{room_id}:reads"
+READS_TTL = 60 * 60 * 24
+
+# 해시가 있을 때만, 그리고 값이 커질 때만 갱신 (없으면 다음 스냅샷에서 DB로 채움)
+_ADVANCE_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 1, #ARGV, 2 do
+    local cur = tonumber(redis.call('HGET', KEYS[1], ARGV[i]) or '0')
+    if cur < tonumber(ARGV[i + 1]) then
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+end
+return 1
+"""
+
+
+_advance_script = None
+
+
+def _client():
+    return cache.client.get_client()  # raw redis client
+
+
+def advance_reads(room_id, reads: Dict[int, int]) -> None:
+    """
+    워터마크가 올라갔을 때 hot cache에도 반영 ({user_id: msg_id})
+    """
+    if not reads:
+        return
+    args = []
+    for user_id, msg_id in reads.items():
+        args += [user_id, msg_id]
+    # 스크립트 본문은 처음 한 번만 보내고 이후에는 EVALSHA
+    global _advance_script
+    client = _client()
+    if _advance_script is None:
+        _advance_script = client.register_script(_ADVANCE_IF_EXISTS)
+    _advance_script(keys=[READS_KEY.format(room_id=room_id)], args=args, client=client)
+
+
+def _read_states(room_id) -> Dict[int, int]:
+    key = READS_KEY.format(room_id=room_id)
+    raw = _client().hgetall(key)
+    if raw:
+        return {int(uid): int(last) for uid, last in raw.items() if uid != b"-"}
+
+    from .models import ChatReadState
+
+    states = dict(
+        ChatReadState.objects.filter(room_id=room_id)
+        .values_list("user_id", "last_read_message_id")
+    )
+    pipe = _client().pipeline()
+    pipe.hset(key, mapping={"-": 0, **states})  # "-": 빈 방도 채워졌음을 표시
+    pipe.expire(key, READS_TTL)
+    pipe.execute()
+    return states
+
+
+def _recent_messages(room_id) -> List[dict]:
+    messages = sequence.recent(room_id, SNAPSHOT_MESSAGES)
+    if messages is not None:
+        return messages
+
+    # Stream이 비어 있으면(만료 등) DB에서 읽고 Stream을 다시 채워 둠
+    from .models import ChatMessage
+    from .serializers import ChatMessageSerializer, attachment_fields
+
+    qs = (
+        ChatMessage.objects.filter(room_id=room_id)
+        .select_related("sender")
+        .prefetch_related("images")
+        .order_by("-seq")[:SNAPSHOT_MESSAGES]
+    )
+    messages = [
+        {**data, **attachment_fields(data["images"])}
+        for data in reversed(ChatMessageSerializer(qs, many=True).data)
+    ]
+    sequence.append(room_id, [(m["seq"], m) for m in messages])
+    return messages
+
+
+def build(room_id) -> dict:
+    """
+    방에 들어왔을 때 보내는 스냅샷: 최근 메시지, 참가자 미니 프로필, 접속 중인 유저, 읽음 위치.
+    모두 Redis/캐시에서 읽으므로 캐시가 살아있으면 SQL 0회.
+    """
+    member_ids = membership.member_ids(room_id)
+    return {
+        "messages": _recent_messages(room_id),
+        "participants": membership.get_profiles(member_ids),
+        "online_user_ids": sorted(presence.online_users(room_id)),
+        "read_states": _read_states(room_id),
+    }
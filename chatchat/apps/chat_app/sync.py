@@ -0,0 +1,120 @@
+# apps/chat/sync.py
+# 앱 재개 시 증분 동기화.
+# 클라이언트는 방마다 마지막으로 받은 version과 메시지 id를 보내고, 그 뒤로 바뀐 방만 받는다.
+# 바뀌지 않은 방은 version 비교만 하므로, 응답 크기/비용은 기록 길이가 아니라 그 사이 활동량에 비례함.
+from typing import Dict, List
+
+from django.db.models import OuterRef, Subquery
+
+from . import membership
+from .models import ChatMessage, ChatReadState, ChatRoom
+from .serializers import ChatMessageSerializer, attachment_fields, last_message_fields
+
+SYNC_MESSAGES = 100  # 방마다 한 번에 보내는 최대 새 메시지 수. 넘으면 messages_complete=False → messages API로
+
+
+def parse_known(raw) -> Dict[int, dict]:
+    """
+    요청 본문의 rooms 목록 [{"id": 1, "version": 10, "after": 532}, ...] → {room_id: {version, after}}
+    형식이 잘못됐으면 ValueError
+    """
+    if not isinstance(raw, list):
+        raise ValueError("rooms는 목록이어야 합니다.")
+    known = {}
+    for item in raw:
+        if not isinstance(item, dict) or "id" not in item:
+            raise ValueError("rooms의 각 항목에는 id가 있어야 합니다.")
+        try:
+            known[int(item["id"])] = {
+                "version": int(item.get("version", 0)),
+                "after": int(item.get("after", 0)),
+            }
+        except (TypeError, ValueError):
+            raise ValueError("id, version, after는 정수여야 합니다.")
+    return known
+
+
+def _messages_after(room_id, after: int, context: dict):
+    """
+    after 이후 메시지 (오래된 순). SYNC_MESSAGES보다 많으면 최신 SYNC_MESSAGES개만.
+    반환: (메시지 목록, 전부 보냈는지)
+    """
+    page = list(
+        ChatMessage.objects.filter(room_id=room_id, pk__gt=after)
+        .select_related("sender")
+        .prefetch_related("images")
+        .order_by("-pk")[:SYNC_MESSAGES + 1]
+    )
+    complete = len(page) <= SYNC_MESSAGES
+    page = page[:SYNC_MESSAGES][::-1]
+    messages = [
+        {**data, **attachment_fields(data["images"])}
+        for data in ChatMessageSerializer(page, many=True, context=context).data
+    ]
+    return messages, complete
+
+
+def build(user, known: Dict[int, dict], context: dict = None) -> dict:
+    """
+    user의 방 중 known 이후 바뀐 방만 모아서 반환.
+      rooms:   바뀐 방(또는 클라이언트가 모르는 새 방)의 현재 상태 + after 이후 새 메시지
+      removed: 클라이언트는 알고 있지만 더 이상 참가하지 않는(또는 삭제된) 방 id
+    방 버전을 데이터보다 먼저 읽으므로, 그 사이 바뀐 내용은 다음 sync에서 한 번 더 받을 뿐 빠지지 않음.
+    """
+    context = dict(context or {})
+    my_unread = ChatReadState.objects.filter(
+        room_id=OuterRef("pk"), user=user
+    ).values("unread_count")[:1]
+    rooms = list(
+        ChatRoom.objects.filter(participants=user)
+        .annotate(my_unread_count=Subquery(my_unread))
+        .order_by("id")
+    )
+    removed = sorted(set(known) - {room.id for room in rooms})
+    changed = [
+        room for room in rooms
+        if room.id not in known or room.version > known[room.id]["version"]
+    ]
+    if not changed:
+        return {"rooms": [], "removed": removed}
+
+    room_ids = [room.id for room in changed]
+    members: Dict[int, List[int]] = {}
+    for room_id, user_id in (
+        ChatRoom.participants.through.objects
+        .filter(chatroom_id__in=room_ids).values_list("chatroom_id", "user_id")
+    ):
+        members.setdefault(room_id, []).append(user_id)
+    profiles = {
+        p["id"]: p
+        for p in membership.get_profiles({uid for ids in members.values() for uid in ids})
+    }
+
+    watermarks: Dict[int, list] = {room_id: [] for room_id in room_ids}
+    for room_id, user_id, last in (
+        ChatReadState.objects.filter(room_id__in=room_ids)
+        .values_list("room_id", "user_id", "last_read_message_id")
+    ):
+        watermarks[room_id].append((user_id, last))
+    # ChatMessageSerializer가 방마다 워터마크를 다시 읽지 않도록 미리 채워 둠
+    context["read_watermarks"] = watermarks
+
+    results = []
+    for room in changed:
+        after = known.get(room.id, {}).get("after", 0)
+        messages, complete = _messages_after(room.id, after, context)
+        unread = room.my_unread_count
+        if unread is None:
+            unread = ChatReadState.objects.unread_count(room.id, user.id)
+        results.append({
+            "id": room.id,
+            "version": room.version,
+            "title": room.title,
+            "participants": [profiles[uid] for uid in sorted(members.get(room.id, [])) if uid in profiles],
+            "last_message": last_message_fields(room),
+            "not_read_count": unread,
+            "read_states": {user_id: last for user_id, last in watermarks[room.id] if last},
+            "messages": messages,
+            "messages_complete": complete,
+        })
+    return {"rooms": results, "removed": removed}
@@ -1,3 +1,1633 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image as PILImage
+from rest_framework.test import APIClient
+
+from . import (
+    blobs, cleanup, imaging, membership, metrics, notifications, outbound, presence, ratelimit,
+    room_list, search, sequence, snapshot, typing_indicator, uploads,
+)
+from . import consumers
+from .groups import room_group, wire_event
+from .models import (
+    ChatMessage, ChatReadState, ChatRoom, Image, ImageBlob, UploadSession, User, UserDeviceToken,
+)
+from .reads import ReadCoalescer
+from .routing import websocket_urlpatterns
+from .signals import messages_created
+from . import writer
+from .writer import MessageWriter, persist_batch
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+# 방 목록은 Redis 없이 돌 수 있도록 캐시는 locmem, presence는 mock
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# Redis 자료구조(Sorted Set, Stream, Lua 스크립트)를 쓰는 테스트는 fakeredis 서버 하나를 공유
+# (django-redis는 URL마다 연결 풀을 재사용하므로 실제 Redis와 겹치지 않는 주소를 씀)
+FAKE_REDIS_CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": "redis://fakeredis:6379/1",
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "CONNECTION_POOL_KWARGS": {
+                "connection_class": fakeredis.FakeConnection,
+                "server": fakeredis.FakeServer(),
+            },
+        },
+        "KEY_PREFIX": "uniway",
+    }
+} if fakeredis else LOCMEM_CACHES
+IN_MEMORY_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+def redis_test(cls):
+    """
+    fakeredis 캐시 + 메모리 channel layer로 실행 (fakeredis가 없으면 건너뜀).
+    테스트마다 setUp에서 cache.clear()로 Redis를 비워야 함.
+    """
+    cls = override_settings(CACHES=FAKE_REDIS_CACHES, CHANNEL_LAYERS=IN_MEMORY_LAYERS)(cls)
+    return skipUnless(fakeredis, "fakeredis가 설치되어 있지 않음")(cls)
+
+
+def use_temp_media(test):
+    """
+    테스트가 끝나면 지워지는 임시 MEDIA_ROOT로 바꿈 (setUp에서 호출)
+    """
+    media_root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+    override = override_settings(MEDIA_ROOT=media_root)
+    override.enable()
+    test.addCleanup(override.disable)
+
+
+websocket_app = URLRouter(websocket_urlpatterns)
+
+
+async def receive_all(communicator, timeout=0.3):
+    """
+    timeout 동안 더 오는 프레임이 없을 때까지 받은 프레임 목록 (JSON)
+    """
+    frames = []
+    while not await communicator.receive_nothing(timeout):
+        frames.append(json.loads(await communicator.receive_from()))
+    return frames
+
+# 캐시가 없을 때 방 개수와 상관없이 항상 같은 쿼리 수:
+#   ETag용 (방 id, version, 내 안 읽은 수) / 방 목록(+ 내 안 읽은 수 Subquery) / 참가자 id /
+#   프로필용 앞 4명 / 연결된 객체(content type 1종류)
+ROOM_LIST_QUERIES = 5
+# 유저별 방 목록 캐시가 있으면 DB를 읽지 않음
+ROOM_LIST_CACHED_QUERIES = 0
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RoomListQueryCountTests(TestCase):
+    """
+    GET /api/chat/chatrooms/ 의 쿼리 수가 방 개수에 따라 늘어나지 않는지 확인
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.me = User.objects.create(username="me", nickname="나")
+        cls.others = [User.objects.create(username=f"u{i}", nickname=f"유저{i}") for i in range(5)]
+        cls.linked = ChatRoom.objects.create(title="연결된 게시글")
+
+    def setUp(self):
+        cache.clear()  # 테스트마다 유저 id가 다시 쓰일 수 있으므로 방 목록 캐시를 비움
+
+    def make_rooms(self, count):
+        """
+        참가자 6명, 마지막 메시지 스냅샷, 안 읽은 수 카운터가 있는 방 count개 (짝수 번째 방은 연결된 객체도 있음)
+        """
+        room_type = ContentType.objects.get_for_model(ChatRoom)
+        rooms = ChatRoom.objects.bulk_create([
+            ChatRoom(
+                title=f"방 {i}",
+                content_type=room_type if i % 2 == 0 else None,
+                object_id=self.linked.id if i % 2 == 0 else None,
+                last_message_id=i + 1,
+                last_message_text="안녕하세요",
+                last_message_sender="유저0",
+                last_message_at=timezone.now(),
+            )
+            for i in range(count)
+        ])
+        Participants = ChatRoom.participants.through
+        Participants.objects.bulk_create([
+            Participants(chatroom_id=room.id, user_id=user.id)
+            for room in rooms for user in [self.me, *self.others]
+        ])
+        ChatReadState.objects.bulk_create([
+            ChatReadState(room_id=room.id, user_id=self.me.id, unread_count=i)
+            for i, room in enumerate(rooms)
+        ])
+        return rooms
+
+    def get_list(self, queries=ROOM_LIST_QUERIES, **headers):
+        client = APIClient()
+        client.force_authenticate(self.me)
+        with mock.patch("chatchat.apps.chat_app.presence.online_users_bulk", return_value={}), \
+                self.assertNumQueries(queries):
+            return client.get(reverse("chatroom-list"), **headers)
+
+    def assert_rooms(self, response, count):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), count)
+        return response.data
+
+    def test_one_room(self):
+        self.make_rooms(1)
+        room = self.assert_rooms(self.get_list(), 1)[0]
+        self.assertEqual(len(room["participants"]), 6)
+        self.assertEqual(len(room["participants_profile_imgs"]), 4)
+        self.assertEqual(room["last_message"]["text"], "안녕하세요")
+        self.assertEqual(room["not_read_count"], 0)
+
+    def test_ten_rooms(self):
+        self.make_rooms(10)
+        rooms = self.assert_rooms(self.get_list(), 10)
+        self.assertEqual(sorted(room["not_read_count"] for room in rooms), list(range(10)))
+        linked = [room["content_type_info"] for room in rooms if room["content_type_info"]]
+        self.assertEqual(len(linked), 5)
+        self.assertEqual(linked[0]["title"], "연결된 게시글")
+
+    def test_five_hundred_rooms(self):
+        self.make_rooms(500)
+        self.assert_rooms(self.get_list(), 500)
+
+    def test_cached(self):
+        self.make_rooms(500)
+        rooms = self.assert_rooms(self.get_list(), 500)
+        self.assertEqual(self.assert_rooms(self.get_list(ROOM_LIST_CACHED_QUERIES), 500), rooms)
+
+    def test_invalidated(self):
+        self.make_rooms(10)
+        self.get_list()
+        room_list.invalidate_users([self.me.id])
+        self.assert_rooms(self.get_list(), 10)
+
+    def test_not_modified(self):
+        self.make_rooms(500)
+        etag = self.get_list()["ETag"]
+        response = self.get_list(ROOM_LIST_CACHED_QUERIES, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+
+@redis_test
+class UnreadCountTests(TestCase):
+    """
+    ChatReadState.unread_count: 메시지 저장 때 올리고 워터마크가 움직일 때 다시 계산
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create(username="me", nickname="나")
+        self.other = User.objects.create(username="other", nickname="상대")
+        self.room = ChatRoom.objects.create_room(participants=[self.me, self.other], title="방")
+
+    def send(self, count, sender=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [
+                ChatMessage.objects.create(room=self.room, sender=sender or self.other, text=str(i))
+                for i in range(count)
+            ]
+
+    def unread(self, user):
+        return ChatReadState.objects.unread_count(self.room.id, user.id)
+
+    def test_counts_new_messages(self):
+        sent = self.send(3)
+        self.assertEqual((self.unread(self.me), self.unread(self.other)), (3, 0))
+        ChatReadState.objects.advance(self.room.id, self.me.id, sent[1].id)
+        self.assertEqual(self.unread(self.me), 1)
+
+    def test_rejoin_recounts_from_watermark(self):
+        sent = self.send(2)
+        ChatReadState.objects.advance(self.room.id, self.me.id, sent[0].id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room.participants.remove(self.me)
+        self.send(3)
+        # 나가 있는 동안에는 세지 않음
+        self.assertEqual(ChatReadState.objects.get(room=self.room, user=self.me).unread_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room.participants.add(self.me)
+        # 워터마크 뒤의 메시지 = 나가기 전 1개 + 나가 있던 동안 3개
+        self.assertEqual(self.unread(self.me), 4)
+        self.send(1)
+        self.assertEqual(self.unread(self.me), 5)
+
+
+class ReadStateBackfillMigrationTests(TransactionTestCase):
+    """
+    0003_chatreadstate: 기존 read_by 행 → (방, 유저)별 워터마크.
+    순서대로 읽은 기록이면 워터마크로 계산한 read_by/read_count가 예전 값과 같아야 함
+    """
+
+    migrate_from = [("chat_app", "0002_initial")]
+    migrate_to = [("chat_app", "0003_chatreadstate")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        self.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_backfill_matches_read_by(self):
+        apps = self.migrate(self.migrate_from)
+        User = apps.get_model(settings.AUTH_USER_MODEL)
+        ChatRoom = apps.get_model("chat_app", "ChatRoom")
+        ChatMessage = apps.get_model("chat_app", "ChatMessage")
+        a, b, c = [User.objects.create(username=name) for name in "abc"]
+        room, other_room = ChatRoom.objects.create(title="방"), ChatRoom.objects.create(title="다른 방")
+        room.participants.add(a, b, c)
+        other_room.participants.add(a)
+        messages = [ChatMessage.objects.create(room=room, sender=c, text=f"m{i}") for i in range(4)]
+        other = ChatMessage.objects.create(room=other_room, sender=a, text="x")
+        # a는 m0~m2, b는 m0까지 읽음 (앞에서부터 차례로), c는 기록 없음
+        for msg in messages[:3]:
+            msg.read_by.add(a)
+        messages[0].read_by.add(b)
+        other.read_by.add(a)
+        old = {msg.id: set(msg.read_by.values_list("id", flat=True)) for msg in messages}
+
+        apps = self.migrate(self.migrate_to)
+        ChatReadState = apps.get_model("chat_app", "ChatReadState")
+        states = {
+            (room_id, user_id): last
+            for room_id, user_id, last in ChatReadState.objects.values_list(
+                "room_id", "user_id", "last_read_message_id"
+            )
+        }
+        self.assertEqual(states, {
+            (room.id, a.id): messages[2].id,
+            (room.id, b.id): messages[0].id,
+            (other_room.id, a.id): other.id,
+        })
+        new = {
+            msg.id: {
+                user_id for (room_id, user_id), last in states.items()
+                if room_id == room.id and last >= msg.id
+            }
+            for msg in messages
+        }
+        self.assertEqual(new, old)  # read_by가 같으면 read_count(= 개수)도 같음
+
+
+@redis_test
+class WriteBehindTests(TransactionTestCase):
+    """
+    write-behind writer의 배치 저장 (writer.persist_batch, MessageWriter)
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create(username="me", nickname="나")
+        self.other = User.objects.create(username="other", nickname="상대")
+        self.room = ChatRoom.objects.create_room(participants=[self.me, self.other], title="방")
+
+    def item(self, text, room_id=None):
+        room_id = room_id or self.room.id
+        seq = sequence.next_seq(room_id)
+        return {
+            "room_id": room_id,
+            "sender_id": self.me.id,
+            "text": text,
+            "img_ids": [],
+            "client_msg_id": f"c-{text}",
+            "seq": seq,
+            "payload": {"text": text, "seq": seq},
+        }
+
+    def test_batch_saved_once(self):
+        results = persist_batch([self.item(f"m{i}") for i in range(3)])
+
+        self.assertEqual([r["client_msg_id"] for r in results], ["c-m0", "c-m1", "c-m2"])
+        self.assertTrue(all(r["id"] for r in results))
+        self.assertEqual(ChatMessage.objects.count(), 3)
+        # 저장 후처리: 방 Stream 보관, 마지막 메시지 스냅샷
+        self.assertEqual([m["id"] for m in sequence.recent(self.room.id, 10)], [r["id"] for r in results])
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.last_message_text, "m2")
+
+    def test_receiver_failure_does_not_save_again(self):
+        calls = []
+
+        def broken_receiver(sender, messages, **kwargs):
+            calls.append(len(messages))
+            raise RuntimeError("receiver failed")
+
+        messages_created.connect(broken_receiver, sender=ChatMessage)
+        self.addCleanup(messages_created.disconnect, broken_receiver, sender=ChatMessage)
+
+        with self.assertLogs("django.dispatch", "ERROR"):
+            results = persist_batch([self.item(f"m{i}") for i in range(3)])
+
+        self.assertEqual(calls, [3])
+        self.assertTrue(all(r["id"] for r in results))
+        self.assertEqual(ChatMessage.objects.count(), 3)
+        seqs = list(ChatMessage.objects.values_list("seq", flat=True))
+        self.assertEqual(len(seqs), len(set(seqs)))
+        # 다른 receiver와 Stream 보관은 그대로 실행됨
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.last_message_text, "m2")
+        self.assertEqual(len(sequence.recent(self.room.id, 10)), 3)
+
+    def test_failed_message_reported(self):
+        bad = self.item("bad", room_id=self.room.id + 1000)  # 없는 방 → 배치 트랜잭션 실패
+        with self.assertLogs("chatchat.apps.chat_app.writer", "ERROR"):
+            results = persist_batch([self.item("ok"), bad])
+
+        self.assertIsNotNone(results[0]["id"])
+        self.assertIsNone(results[1]["id"])
+        self.assertEqual(list(ChatMessage.objects.values_list("text", flat=True)), ["ok"])
+
+    def patch_persist(self, side_effect):
+        patcher = mock.patch.object(writer, "persist_batch", side_effect=side_effect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_writer_survives_failed_batch(self):
+        calls = []
+
+        def fail_first(batch):
+            calls.append(len(batch))
+            if len(calls) == 1:
+                raise RuntimeError("db down")
+            return persist_batch(batch)
+
+        self.patch_persist(fail_first)
+        message_writer = MessageWriter(flush_interval=0)
+        first, second = self.item("lost"), self.item("kept")
+
+        async def run():
+            await message_writer.submit(first)
+            await message_writer.flush()
+            task = message_writer._task
+            await message_writer.submit(second)
+            await message_writer.flush()
+            return task is message_writer._task  # 같은 task가 계속 처리
+
+        with self.assertLogs("chatchat.apps.chat_app.writer", "ERROR"):
+            self.assertTrue(async_to_sync(run)())
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual(list(ChatMessage.objects.values_list("text", flat=True)), ["kept"])
+
+    def test_flush_waits_only_for_earlier_messages(self):
+        def slow(batch):
+            time.sleep(0.1)
+            return persist_batch(batch)
+
+        self.patch_persist(slow)
+        message_writer = MessageWriter(flush_interval=0, batch_size=1)
+        mine = self.item("mine")
+        others = [self.item(f"other{i}") for i in range(10)]
+
+        async def run():
+            await message_writer.submit(mine)
+            flushing = asyncio.create_task(message_writer.flush())
+            await asyncio.sleep(0)  # flush가 기준 위치를 잡은 뒤
+            for item in others:  # 다른 연결이 계속 보내도
+                await message_writer.submit(item)
+            started = time.monotonic()
+            await flushing
+            elapsed = time.monotonic() - started
+            await message_writer.flush()
+            return elapsed
+
+        self.assertLess(async_to_sync(run)(), 0.5)  # 10개 × 0.1초를 다 기다리지 않음
+        self.assertEqual(ChatMessage.objects.count(), 11)
+
+    def test_flush_timeout(self):
+        self.patch_persist(lambda batch: time.sleep(0.5) or persist_batch(batch))
+        message_writer = MessageWriter(flush_interval=0, flush_timeout=0.1)
+        item = self.item("slow")
+
+        async def run():
+            await message_writer.submit(item)
+            with self.assertLogs("chatchat.apps.chat_app.writer", "WARNING"):
+                await message_writer.flush()
+            await asyncio.sleep(0.6)  # 저장은 계속 진행됨
+
+        async_to_sync(run)()
+        self.assertEqual(ChatMessage.objects.count(), 1)
+
+    def test_flush_sync_saves_inflight_batch(self):
+        message_writer = MessageWriter()
+        saved, pending = self.item("saved"), self.item("pending")
+        persist_batch([saved])  # 루프가 멈추기 직전에 저장까지 끝난 메시지
+        message_writer._inflight = [saved, pending]
+
+        message_writer.flush_sync()
+        self.assertEqual(sorted(ChatMessage.objects.values_list("text", flat=True)), ["pending", "saved"])
+
+
+@redis_test
+class PresenceTests(TestCase):
+    """
+    연결(탭/기기) 단위 presence (presence.py)
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_user_online_until_last_connection_leaves(self):
+        presence.join(1, 7, "tab-a")
+        presence.join(1, 7, "tab-b")
+        presence.join(1, 8, "phone")
+        self.assertEqual(presence.online_users(1), {7, 8})
+
+        presence.leave(1, 7, "tab-a")
+        self.assertEqual(presence.online_users(1), {7, 8})
+        presence.leave(1, 7, "tab-b")
+        self.assertEqual(presence.online_users(1), {8})
+
+    def test_expired_connections_dropped(self):
+        presence.join_many([1, 2], 7, "tab-a")
+        later = time.time() + presence.PRESENCE_TTL + 1
+        with mock.patch("chatchat.apps.chat_app.presence.time.time", return_value=later):
+            self.assertEqual(presence.online_users_bulk([1, 2]), {1: set(), 2: set()})
+
+
+@redis_test
+class MembershipCacheTests(TestCase):
+    """
+    consumer가 쓰는 참가자/유저 캐시 (membership.py)와 receivers의 무효화
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create(username="me", nickname="나")
+        self.other = User.objects.create(username="other", nickname="상대")
+        self.room = ChatRoom.objects.create_room(participants=[self.me], title="방")
+
+    def test_membership_cached(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(membership.is_member(self.room.id, self.me.id))
+        with self.assertNumQueries(0):
+            self.assertTrue(membership.is_member(self.room.id, self.me.id))
+            self.assertFalse(membership.is_member(self.room.id, self.other.id))
+            self.assertEqual(membership.member_ids(self.room.id), {self.me.id})
+
+    def test_empty_room_cached(self):
+        empty = ChatRoom.objects.create(title="빈 방")
+        self.assertEqual(membership.member_ids(empty.id), set())
+        with self.assertNumQueries(0):
+            self.assertFalse(membership.is_member(empty.id, self.me.id))
+
+    def test_join_and_leave_invalidate(self):
+        self.assertFalse(membership.is_member(self.room.id, self.other.id))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room.participants.add(self.other)
+        self.assertTrue(membership.is_member(self.room.id, self.other.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.chat_rooms.remove(self.room)  # 반대 방향(유저 쪽)에서 바꿔도
+        self.assertFalse(membership.is_member(self.room.id, self.other.id))
+
+    def test_user_record_cached_until_profile_edit(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(membership.get_user(self.me.id).nickname, "나")
+        with self.assertNumQueries(0):
+            user = membership.get_user(self.me.id)
+            self.assertEqual((user.pk, user.username), (self.me.id, "me"))
+            self.assertEqual(membership.get_profiles([self.me.id])[0]["nickname"], "나")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.me.nickname = "새 이름"
+            self.me.save()
+        self.assertEqual(membership.get_user(self.me.id).nickname, "새 이름")
+        self.assertIsNone(membership.get_user(self.me.id + 1000))
+
+
+@redis_test
+class RoomSnapshotTests(TestCase):
+    """
+    입장 스냅샷 (snapshot.build): 캐시가 살아있으면 SQL 0회, 없으면 DB에서 읽고 다시 채움
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create(username="me", nickname="나")
+        self.other = User.objects.create(username="other", nickname="상대")
+        self.room = ChatRoom.objects.create_room(participants=[self.me, self.other], title="방")
+        self.sent = [ChatMessage.objects.create(room=self.room, sender=self.other, text=f"m{i}") for i in range(3)]
+        cache.clear()  # 모든 hot 상태가 비어 있는 상태에서 시작
+
+    def test_cold_then_warm(self):
+        cold = snapshot.build(self.room.id)
+        self.assertEqual([m["text"] for m in cold["messages"]], ["m0", "m1", "m2"])
+        self.assertEqual([p["id"] for p in cold["participants"]], sorted([self.me.id, self.other.id]))
+        self.assertEqual(cold["read_states"], {self.me.id: 0, self.other.id: self.sent[-1].id})
+
+        with self.assertNumQueries(0):
+            warm = snapshot.build(self.room.id)
+        self.assertEqual(warm, cold)
+
+    def test_read_advance_kept_warm(self):
+        snapshot.build(self.room.id)
+        ChatReadState.objects.advance(self.room.id, self.me.id, self.sent[1].id)
+        snapshot.advance_reads(self.room.id, {self.me.id: self.sent[1].id})
+        snapshot.advance_reads(self.room.id, {self.me.id: self.sent[0].id})  # 뒤로 가지 않음
+
+        with self.assertNumQueries(0):
+            read_states = snapshot.build(self.room.id)["read_states"]
+        self.assertEqual(read_states, {self.me.id: self.sent[1].id, self.other.id: self.sent[-1].id})
+
+    def test_expired_stream_refilled_from_db(self):
+        snapshot.build(self.room.id)
+        cache.client.get_client().delete(sequence.STREAM_KEY.format(room_id=self.room.id))
+
+        with self.assertNumQueries(3):  # 메시지 + 이미지 prefetch + 읽음 워터마크
+            messages = snapshot.build(self.room.id)["messages"]
+        self.assertEqual([m["text"] for m in messages], ["m0", "m1", "m2"])
+        with self.assertNumQueries(0):
+            self.assertEqual(snapshot.build(self.room.id)["messages"], messages)
+
+
+@redis_test
+class ChatConsumerTests(TransactionTestCase):
+    """
+    방 웹소켓: 입장 스냅샷, 메시지 브로드캐스트, presence 등록/해제
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create(username="me", nickname="나")
+        self.other = User.objects.create(username="other", nickname="상대")
+        self.room = ChatRoom.objects.create_room(participants=[self.me, self.other], title="방")
+
+    def connect(self, user):
+        return WebsocketCommunicator(websocket_app, f"ws/chat/{self.room.id}/{user.id}/")
+
+    async def test_message_broadcast_and_presence(self):
+        mine, theirs = self.connect(self.me), self.connect(self.other)
+        self.assertTrue((await mine.connect())[0])
+        self.assertTrue((await theirs.connect())[0])
+        snapshot = (await receive_all(theirs))[0]
+        self.assertEqual(snapshot["event"], "snapshot")
+        self.assertEqual(snapshot["online_user_ids"], sorted([self.me.id, self.other.id]))
+
+        await mine.send_to(text_data=json.dumps({"type": "message", "text": "안녕"}))
+        message = [f for f in await receive_all(theirs) if f["event"] == "message"][0]
+        self.assertEqual((message["text"], message["sender"], message["seq"]), ("안녕", self.me.id, 1))
+
+        await theirs.disconnect()
+        await asyncio.sleep(0.1)
+        self.assertEqual(presence.online_users(self.room.id), {self.me.id})
+        await mine.disconnect()
+
+    async def test_non_participant_rejected(self):
+        stranger = await User.objects.acreate(username="stranger", nickname="남")
+        connected, _ = await self.connect(stranger).connect()
+        self.assertFalse(connected)
+
+    async def test_removed_participant_disconnected(self):
+        mine, theirs = self.connect(self.me), self.connect(self.other)
+        self.assertTrue((await mine.connect())[0])
+        self.assertTrue((await theirs.connect())[0])
+        await receive_all(mine)
+        await receive_all(theirs)
+
+        await sync_to_async(self.room.participants.remove)(self.other)
+        closed = await theirs.receive_output(timeout=1)
+        self.assertEqual(closed, {"type": "websocket.close", "code": consumers.LEFT_ROOM_CLOSE_CODE})
+
+        # 끊긴 뒤의 방 메시지는 받지 않음
+        await mine.send_to(text_data=json.dumps({"type": "message", "text": "안녕"}))
+        self.assertTrue(any(f["event"] == "message" for f in await receive_all(mine)))
+        self.assertTrue(await theirs.receive_nothing(timeout=0.2))
+        await mine.disconnect()
+        await theirs.disconnect()
+
+
+@redis_test
+class FanoutSerializationTests(TransactionTestCase):
+    """
+    방 메시지 JSON은 보내는 쪽에서 한 번만 만들고 (groups.wire_event), 받는 consumer들은 그대로 전달
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create(username=f"u{i}", nickname=f"유저{i}") for i in range(3)]
+        self.room = ChatRoom.objects.create_room(participants=self.users, title="방")
+
+    async def raw_frames(self, communicator, timeout=0.3):
+        frames = []
+        while not await communicator.receive_nothing(timeout):
+            frames.append(await communicator.receive_from())
+        return frames
+
+    async def test_message_serialized_once(self):
+        sender, *members = self.users
+        sockets = [
+            WebsocketCommunicator(websocket_app, f"ws/chat/{self.room.id}/{user.id}/") for user in self.users
+        ]
+        inbox = WebsocketCommunicator(websocket_app, f"ws/chat/user/{members[0].id}/")
+        for communicator in (*sockets, inbox):
+            self.assertTrue((await communicator.connect())[0])
+            await self.raw_frames(communicator)
+
+        wired, dumped = [], []
+
+        def spy_wire_event(event_type, frame, **meta):
+            event = wire_event(event_type, frame, **meta)
+            wired.append(event)
+            return event
+
+        def spy_dumps(obj, *args, **kwargs):
+            dumped.append(obj)
+            return json.dumps(obj, *args, **kwargs)
+
+        json_spy = SimpleNamespace(**{**vars(json), "dumps": spy_dumps})  # consumers 모듈 안에서만 바꿈
+        with mock.patch.object(consumers, "wire_event", spy_wire_event), \
+                mock.patch.object(consumers, "json", json_spy):
+            await sockets[0].send_to(text_data=json.dumps({"type": "message", "text": "안녕"}))
+            received = [await self.raw_frames(communicator) for communicator in (*sockets, inbox)]
+
+        messages = [event for event in wired if event["type"] == "chat_message"]
+        self.assertEqual(len(messages), 1)
+        text = messages[0]["text"]
+        for frames in received:  # 방 소켓 3개 + 유저 소켓: 같은 문자열을 그대로 받음
+            self.assertEqual([f for f in frames if json.loads(f)["event"] == "message"], [text])
+        # 받는 쪽에서 메시지를 다시 직렬화하지 않음 (유저 소켓의 작은 room_update만)
+        self.assertEqual({obj.get("event") for obj in dumped if isinstance(obj, dict)}, {"room_update"})
+
+        for communicator in (*sockets, inbox):
+            await communicator.disconnect()
+
+
+@redis_test
+class TypingIndicatorTests(TransactionTestCase):
+    """
+    "입력 중" 표시: (방, 유저)당 TYPING_THROTTLE마다 한 번, TYPING_TIMEOUT 뒤 서버가 "입력 끝"
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create(username="me", nickname="나")
+        self.other = User.objects.create(username="other", nickname="상대")
+        self.room = ChatRoom.objects.create_room(participants=[self.me, self.other], title="방")
+
+    def test_throttle_shared_until_reset(self):
+        self.assertTrue(typing_indicator.should_broadcast(self.room.id, self.me.id))
+        self.assertFalse(typing_indicator.should_broadcast(self.room.id, self.me.id))  # 다른 탭이어도
+        self.assertTrue(typing_indicator.should_broadcast(self.room.id, self.other.id))
+        key = typing_indicator.THROTTLE_KEY.format(room_id=self.room.id, user_id=self.me.id)
+        self.assertTrue(0 < cache.ttl(key) <= typing_indicator.TYPING_THROTTLE)
+
+        typing_indicator.reset(self.room.id, self.me.id)
+        self.assertTrue(typing_indicator.should_broadcast(self.room.id, self.me.id))
+
+    async def test_typing_throttled_and_expires(self):
+        mine = WebsocketCommunicator(websocket_app, f"ws/chat/{self.room.id}/{self.me.id}/")
+        theirs = WebsocketCommunicator(websocket_app, f"ws/chat/{self.room.id}/{self.other.id}/")
+        await mine.connect()
+        await theirs.connect()
+        await receive_all(mine)
+        await receive_all(theirs)
+
+        with mock.patch.object(typing_indicator, "TYPING_TIMEOUT", 0.5):
+            for _ in range(3):  # 키 입력마다 오는 프레임
+                await mine.send_to(text_data=json.dumps({"type": "typing"}))
+            frames = [f for f in await receive_all(theirs, timeout=0.3) if f["event"] == "typing"]
+            self.assertEqual([(f["user_id"], f["typing"]) for f in frames], [(self.me.id, True)])
+
+            # 더 입력이 없으면 서버가 typing=false를 보냄
+            frames = [f for f in await receive_all(theirs, timeout=0.5) if f["event"] == "typing"]
+            self.assertEqual([f["typing"] for f in frames], [False])
+        self.assertEqual([f for f in await receive_all(mine) if f["event"] == "typing"], [])  # 본인에겐 안 보냄
+
+        await mine.disconnect()
+        await theirs.disconnect()
+
+
+@redis_test
+class UserChatConsumerTests(TransactionTestCase):
+    """
+    유저 웹소켓(방 여러 개를 연결 하나로)의 room_update
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create(username="me", nickname="나")
+        self.other = User.objects.create(username="other", nickname="상대")
+        self.room = ChatRoom.objects.create_room(participants=[self.me, self.other], title="방")
+
+    async def test_unread_count_from_events(self):
+        inbox = WebsocketCommunicator(websocket_app, f"ws/chat/user/{self.other.id}/")
+        self.assertTrue((await inbox.connect())[0])
+        self.assertEqual(await receive_all(inbox), [{"event": "subscribed", "room_ids": [self.room.id]}])
+        sender = WebsocketCommunicator(websocket_app, f"ws/chat/{self.room.id}/{self.me.id}/")
+        self.assertTrue((await sender.connect())[0])
+
+        # 메시지 이벤트마다 받는 쪽이 DB를 읽지 않음
+        with mock.patch.object(ChatReadState.objects, "unread_counts",
+                               side_effect=AssertionError("unread count read per event")):
+            for text in ("하나", "둘"):
+                await sender.send_to(text_data=json.dumps({"type": "message", "text": text}))
+            frames = await receive_all(inbox)
+            updates = [f for f in frames if f["event"] == "room_update"]
+            self.assertEqual([u["not_read_count"] for u in updates], [1, 2])
+            self.assertEqual(updates[-1]["last_message"]["text"], "둘")
+
+            last_id = [f for f in frames if f["event"] == "message"][-1]["id"]
+            await inbox.send_to(text_data=json.dumps({"type": "read", "room_id": self.room.id, "msg_id": last_id}))
+            frames = await receive_all(inbox, timeout=1)
+        self.assertIn({"event": "room_update", "room_id": self.room.id, "not_read_count": 0}, frames)
+
+        await sender.disconnect()
+        await inbox.disconnect()
+
+
+@redis_test
+@override_settings(CHAT_RATE_LIMITS={
+    "message_user": (1, 3),
+    "message_room": (1, 4),
+    "upload_user": (0.01, 2),
+})
+class RateLimitTests(TestCase):
+    """
+    Redis 토큰 버킷 (ratelimit.py)
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_burst_then_wait(self):
+        self.assertEqual([ratelimit.take_message(1, 7) for _ in range(3)], [0, 0, 0])
+        self.assertGreater(ratelimit.take_message(1, 7), 0)
+
+    def test_denied_take_charges_no_bucket(self):
+        for user_id in (1, 2):
+            ratelimit.take_message(1, user_id)
+            ratelimit.take_message(1, user_id)
+        self.assertGreater(ratelimit.take_message(1, 3), 0)  # 방 버킷이 비어 있음
+        # 거절된 요청은 유저 3의 버킷을 쓰지 않았으므로 다른 방에서는 버스트만큼 보낼 수 있음
+        self.assertEqual([ratelimit.take_message(2, 3) for _ in range(3)], [0, 0, 0])
+
+    def test_cost_over_burst_rejected(self):
+        with self.assertRaises(ValueError):
+            ratelimit.take_upload(7, 3)
+
+    def test_upload_view(self):
+        me = User.objects.create(username="me", nickname="나")
+        client = APIClient()
+        client.force_authenticate(me)
+
+        def upload(count):
+            files = [SimpleUploadedFile(f"{i}.png", b"png", content_type="image/png") for i in range(count)]
+            return client.post(reverse("image-upload"), {"images": files}, format="multipart")
+
+        # 버스트보다 많으면 기다려도 안 되므로 413 (Retry-After 없음)
+        response = upload(3)
+        self.assertEqual(response.status_code, 413)
+        self.assertNotIn("Retry-After", response)
+
+        ratelimit.take_upload(me.id, 2)
+        response = upload(1)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "100")
+
+
+class FakeSocket:
+    """
+    SendQueueMixin 뒤에 오는 AsyncWebsocketConsumer 대신 (보낸 프레임/close code만 기록)
+    """
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+        self.closed = []
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        if self.fail:
+            raise ConnectionResetError("client gone")
+        self.sent.append(text_data)
+
+    async def close(self, code=None):
+        self.closed.append(code)
+
+
+class QueuedSocket(outbound.SendQueueMixin, FakeSocket):
+    pass
+
+
+@override_settings(CHAT_SEND_QUEUE_MAX=2, CHAT_SEND_QUEUE_POLICY=outbound.POLICY_DROP_READS)
+class SendQueueTests(SimpleTestCase):
+    """
+    느린 클라이언트용 연결별 전송 대기열 (outbound.py)
+    """
+
+    def setUp(self):
+        queues = mock.patch.object(outbound, "_queues", outbound.weakref.WeakSet())
+        queues.start()
+        self.addCleanup(queues.stop)
+
+    def test_drop_reads_drops_oldest_droppable(self):
+        queue = outbound.SendQueue(3, outbound.POLICY_DROP_READS)
+        dropped = metrics.counter("send_queue.dropped")
+        for frame in [("m1", None, False, False), ("r1", None, False, True),
+                      ("r2", None, False, True), ("m2", None, False, False)]:
+            self.assertTrue(queue.put(frame))
+        self.assertEqual([frame[0] for frame in queue._frames], ["m1", "r2", "m2"])
+        self.assertEqual(metrics.counter("send_queue.dropped"), dropped + 1)
+
+    def test_full_without_droppable(self):
+        for policy in (outbound.POLICY_DROP_READS, outbound.POLICY_CLOSE):
+            queue = outbound.SendQueue(1, policy)
+            self.assertTrue(queue.put(("r1", None, False, True)))
+            self.assertEqual(queue.put(("m1", None, False, False)), policy == outbound.POLICY_DROP_READS)
+        self.assertFalse(queue.put(("m2", None, False, False)))  # close는 읽음 이벤트도 버리지 않음
+
+    def test_gauges(self):
+        queues = [outbound.SendQueue(5, outbound.POLICY_CLOSE) for _ in range(2)]
+        for i in range(3):
+            queues[0].put((f"m{i}", None, False, False))
+        queues[1].put(("m", None, False, False))
+        gauges = metrics.snapshot()["gauges"]
+        self.assertEqual(gauges["send_queue.connections"], 2)
+        self.assertEqual(gauges["send_queue.depth_total"], 4)
+        self.assertEqual(gauges["send_queue.depth_max"], 3)
+
+    async def test_overflow_closes_for_resync(self):
+        socket = QueuedSocket()
+        closed = metrics.counter("send_queue.resync_closed")
+        for i in range(3):  # 전송 task가 돌기 전에 3개 → 대기열(2개)이 넘침, 버릴 읽음 이벤트 없음
+            await socket.send(text_data=f"m{i}")
+        self.assertEqual(socket.closed, [outbound.RESYNC_CLOSE_CODE])
+        self.assertEqual(metrics.counter("send_queue.resync_closed"), closed + 1)
+        await socket.send(text_data="late")
+        await asyncio.sleep(0)
+        self.assertEqual(socket.sent, [])  # 끊은 뒤에는 아무것도 보내지 않음
+
+    async def test_frames_sent_in_order(self):
+        socket = QueuedSocket()
+        await socket.send(text_data="a")
+        await socket.send(text_data="b")
+        await asyncio.sleep(0.01)
+        self.assertEqual(socket.sent, ["a", "b"])
+        socket._sender_task.cancel()
+
+    async def test_send_failure_closes_connection(self):
+        socket = QueuedSocket(fail=True)
+        failed = metrics.counter("send_queue.send_failed")
+        with self.assertLogs("chatchat.apps.chat_app.outbound", "ERROR"):
+            await socket.send(text_data="a")
+            await asyncio.sleep(0.01)
+        self.assertEqual(socket.closed, [outbound.RESYNC_CLOSE_CODE])
+        self.assertEqual(metrics.counter("send_queue.send_failed"), failed + 1)
+        self.assertTrue(socket._sender_task.done())
+        await socket.send(text_data="b")  # 더 쌓지 않음
+        self.assertEqual(len(socket._send_queue), 0)
+
+
+class FailingPushSender(notifications.LocalPushSender):
+    def send(self, pushes):
+        raise ConnectionError("push service down")
+
+
+@redis_test
+class PushNotificationTests(TestCase):
+    """
+    오프라인 참가자 푸시: 기기별로 모았다가(debounce) 한 번에 묶어서 보냄 (notifications.py)
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create(username="me", nickname="나")
+        self.other = User.objects.create(username="other", nickname="상대")
+        self.room = ChatRoom.objects.create_room(participants=[self.me, self.other], title="방")
+        UserDeviceToken.objects.create(user=self.other, token="device-1", platform="ios")
+        self.sender = notifications.LocalPushSender()
+
+    def send_messages(self, *texts):
+        for text in texts:
+            notifications.enqueue([ChatMessage.objects.create(room=self.room, sender=self.me, text=text)])
+
+    def deliver_after(self, seconds, sender=None):
+        return notifications.deliver_due(sender or self.sender, now=time.time() + seconds)
+
+    def test_waits_for_coalesce_window(self):
+        self.send_messages("하나")
+        self.assertEqual(self.deliver_after(0), 0)
+        self.assertEqual(list(self.sender.outbox), [])
+
+    def test_messages_coalesced_per_device(self):
+        self.send_messages("하나", "둘", "셋")
+        self.assertEqual(self.deliver_after(notifications.PUSH_COALESCE_WINDOW + 1), 1)
+
+        [push] = self.sender.outbox
+        self.assertEqual((push["token"], push["room_id"], push["count"]), ("device-1", self.room.id, 3))
+        self.assertEqual(push["body"], "새 메시지 3개")
+        self.assertEqual(self.deliver_after(notifications.PUSH_COALESCE_WINDOW + 1), 0)  # 다시 보내지 않음
+
+    def test_single_message_shows_text(self):
+        self.send_messages("안녕하세요")
+        self.deliver_after(notifications.PUSH_COALESCE_WINDOW + 1)
+        self.assertEqual([push["body"] for push in self.sender.outbox], ["안녕하세요"])
+
+    def test_online_participant_not_pushed(self):
+        presence.join(self.room.id, self.other.id, "tab-a")
+        self.send_messages("하나")
+        self.assertEqual(self.deliver_after(notifications.PUSH_COALESCE_WINDOW + 1), 0)
+
+    def test_invalid_token_deactivated(self):
+        class RejectingSender(notifications.LocalPushSender):
+            def send(self, pushes):
+                return [push["token"] for push in pushes]
+
+        self.send_messages("하나")
+        self.deliver_after(notifications.PUSH_COALESCE_WINDOW + 1, RejectingSender())
+        self.assertFalse(UserDeviceToken.objects.get(token="device-1").is_active)
+
+    def test_failed_send_requeued(self):
+        self.send_messages("하나", "둘")
+        with self.assertRaises(ConnectionError):
+            self.deliver_after(notifications.PUSH_COALESCE_WINDOW + 1, FailingPushSender())
+        self.send_messages("셋")  # 다시 보내기 전에 새 메시지가 쌓여도 합쳐짐
+
+        self.assertEqual(self.deliver_after(notifications.PUSH_COALESCE_WINDOW + 1), 0)  # 재시도 전
+        later = notifications.PUSH_COALESCE_WINDOW + notifications.PUSH_RETRY_DELAY + 1
+        self.assertEqual(self.deliver_after(later), 1)
+        self.assertEqual([push["count"] for push in self.sender.outbox], [3])
+
+    def test_outbox_per_sender_and_bounded(self):
+        other_sender = notifications.LocalPushSender()
+        self.sender.send([{"token": "t", "title": "", "body": ""}] * (notifications.LOCAL_OUTBOX_MAX + 5))
+        self.assertEqual(len(self.sender.outbox), notifications.LOCAL_OUTBOX_MAX)
+        self.assertEqual(len(other_sender.outbox), 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ImageBlobTests(TestCase):
+    """
+    내용(sha256)이 같은 업로드는 ImageBlob 하나를 공유 (blobs.py)
+    """
+
+    def setUp(self):
+        cache.clear()
+        use_temp_media(self)
+        schedule = mock.patch("chatchat.apps.chat_app.imaging.schedule_blob")
+        self.schedule_blob = schedule.start()
+        self.addCleanup(schedule.stop)
+
+    def store(self, content=b"same bytes"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return blobs.store(SimpleUploadedFile("a.png", content), "a.png")
+
+    def test_same_content_shared(self):
+        first, second = self.store(), self.store()
+        other = self.store(b"other bytes")
+
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertNotEqual(first.blob_id, other.blob_id)
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(ImageBlob.objects.get(pk=first.blob_id).ref_count, 2)
+        # 파일 저장/처리는 내용마다 한 번
+        self.assertEqual(self.schedule_blob.call_count, 2)
+
+    def test_release_deletes_last_reference(self):
+        first, second = self.store(), self.store()
+        storage, name = first.image.storage, first.image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(ImageBlob.objects.get(pk=second.blob_id).ref_count, 1)
+        self.assertTrue(storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(ImageBlob.objects.filter(pk=second.blob_id).exists())
+        self.assertFalse(storage.exists(name))
+
+    def test_failed_blob_rescheduled_once(self):
+        first = self.store()
+        ImageBlob.objects.filter(pk=first.blob_id).update(status=Image.Status.FAILED)
+        Image.objects.filter(pk=first.pk).update(status=Image.Status.FAILED)
+        self.schedule_blob.reset_mock()
+
+        second = self.store()
+        self.assertEqual(second.status, Image.Status.PROCESSING)
+        self.assertEqual(Image.objects.get(pk=first.pk).status, Image.Status.PROCESSING)
+        self.schedule_blob.assert_called_once_with(first.blob_id)
+
+        ImageBlob.objects.filter(pk=first.blob_id).update(status=Image.Status.FAILED)
+        self.store()  # BLOB_RETRY_INTERVAL 안에서는 다시 예약하지 않음
+        self.schedule_blob.assert_called_once_with(first.blob_id)
+
+    def test_stuck_processing_rescheduled(self):
+        first = self.store()
+        self.schedule_blob.reset_mock()
+        self.store()
+        self.schedule_blob.assert_not_called()  # 아직 처리 중
+
+        stuck_since = timezone.now() - blobs.BLOB_RETRY_INTERVAL - timedelta(minutes=1)
+        ImageBlob.objects.filter(pk=first.blob_id).update(created_at=stuck_since)
+        self.store()
+        self.schedule_blob.assert_called_once_with(first.blob_id)
+
+
+def image_bytes(size, fmt="PNG", mode="RGB", **save_kwargs) -> bytes:
+    buf = io.BytesIO()
+    PILImage.new(mode, size, "red").save(buf, fmt, **save_kwargs)
+    return buf.getvalue()
+
+
+def render_inline(field):
+    """
+    imaging._render_file을 프로세스 풀 없이 (테스트 프로세스 안에서)
+    """
+    with field.open("rb") as f:
+        return imaging.render(f.read(), imaging.VARIANTS)
+
+
+class ImageRenderTests(SimpleTestCase):
+    """
+    크기별 재인코딩 (imaging.render): 긴 변 256/1080/2560, WebP(없으면 JPEG), 메타데이터 제거
+    """
+
+    def decode(self, data):
+        img = PILImage.open(io.BytesIO(data))
+        img.load()
+        return img
+
+    def test_variant_sizes(self):
+        rendered = imaging.render(image_bytes((4000, 2000)), imaging.VARIANTS)
+        sizes = {name: self.decode(data).size for name, data in rendered.items()}
+        self.assertEqual(sizes, {"thumbnail": (256, 128), "preview": (1080, 540), "original": (2560, 1280)})
+        self.assertEqual({self.decode(data).format for data in rendered.values()}, {imaging.IMAGE_FORMAT})
+
+    def test_small_image_not_upscaled(self):
+        rendered = imaging.render(image_bytes((200, 100)), imaging.VARIANTS)
+        self.assertEqual({self.decode(data).size for data in rendered.values()}, {(200, 100)})
+
+    def test_exif_rotation_applied_and_metadata_stripped(self):
+        exif = PILImage.Exif()
+        exif[0x0112] = 6     # Orientation: 90도 회전해서 보여야 함
+        exif[0x010F] = "Camera"  # Make
+        data = image_bytes((300, 100), "JPEG", exif=exif.tobytes(), icc_profile=b"\0" * 128)
+
+        thumb = self.decode(imaging.render(data, {"thumbnail": 256})["thumbnail"])
+        self.assertEqual(thumb.size, (85, 256))  # 회전이 픽셀에 반영됨
+        self.assertEqual(dict(thumb.getexif()), {})
+        self.assertFalse({"exif", "icc_profile", "xmp"} & set(thumb.info))
+
+    def test_jpeg_fallback(self):
+        with mock.patch.object(imaging, "IMAGE_FORMAT", "JPEG"):
+            rendered = imaging.render(image_bytes((300, 300), mode="RGBA"), {"thumbnail": 256})
+            self.assertEqual(imaging._variant_name("chat/a.png", "thumbnail"), "a_thumbnail.jpg")
+        thumb = self.decode(rendered["thumbnail"])
+        self.assertEqual((thumb.format, thumb.mode), ("JPEG", "RGB"))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProcessBlobTests(TestCase):
+    """
+    blob 처리 상태 (imaging.process_blob): PROCESSING → READY / FAILED
+    """
+
+    def setUp(self):
+        cache.clear()
+        use_temp_media(self)
+        for target, replacement in (("schedule_blob", mock.DEFAULT), ("_render_file", render_inline)):
+            patcher = mock.patch.object(imaging, target, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def store(self, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return blobs.store(SimpleUploadedFile("a.png", content), "a.png")
+
+    def media_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), settings.MEDIA_ROOT)
+            for root, _, names in os.walk(settings.MEDIA_ROOT) for name in names
+        )
+
+    def test_ready(self):
+        img = self.store(image_bytes((3000, 3000)))
+        raw_name = ImageBlob.objects.get(pk=img.blob_id).image.name
+        self.assertEqual(img.status, Image.Status.PROCESSING)
+
+        imaging.process_blob(img.blob_id)
+        blob = ImageBlob.objects.get(pk=img.blob_id)
+        img.refresh_from_db()
+        self.assertEqual((blob.status, img.status), (Image.Status.READY, Image.Status.READY))
+        self.assertEqual((img.image.name, img.thumbnail.name, img.preview.name),
+                         (blob.image.name, blob.thumbnail.name, blob.preview.name))
+        self.assertTrue(blob.thumbnail.name.endswith(f"_thumbnail.{imaging._EXT[imaging.IMAGE_FORMAT]}"))
+        self.assertFalse(blob.image.storage.exists(raw_name))  # 메타데이터가 남은 업로드 원본은 지움
+        self.assertEqual(len(self.media_files()), 3)
+
+    def test_failed(self):
+        img = self.store(b"not an image")
+        with self.assertLogs("chatchat.apps.chat_app.imaging", "ERROR"):
+            imaging.process_blob(img.blob_id)
+        img.refresh_from_db()
+        self.assertEqual(ImageBlob.objects.get(pk=img.blob_id).status, Image.Status.FAILED)
+        self.assertEqual(img.status, Image.Status.FAILED)
+
+    def test_blob_deleted_while_rendering(self):
+        img = self.store(image_bytes((500, 500)))
+
+        def render_then_delete(field):
+            rendered = render_inline(field)
+            with self.captureOnCommitCallbacks(execute=True):
+                img.delete()  # 마지막 참조가 사라짐 → blob과 업로드 원본 삭제
+            return rendered
+
+        with mock.patch.object(imaging, "_render_file", render_then_delete):
+            imaging.process_blob(img.blob_id)
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertEqual(self.media_files(), [])  # 크기별 파일도 남지 않음
+
+
+@redis_test
+class OrphanSweepTests(TestCase):
+    """
+    메시지에 연결되지 않고 ORPHAN_GRACE가 지난 업로드 정리 (cleanup.py)
+    """
+
+    def setUp(self):
+        cache.clear()
+        use_temp_media(self)
+        schedule = mock.patch("chatchat.apps.chat_app.imaging.schedule_blob")
+        schedule.start()
+        self.addCleanup(schedule.stop)
+        me = User.objects.create(username="me", nickname="나")
+        room = ChatRoom.objects.create_room(participants=[me], title="방")
+        self.message = ChatMessage.objects.create(room=room, sender=me, text="사진")
+
+    def image(self, content=b"legacy", shared=False, attached=False, age=timedelta(days=2)):
+        """
+        shared=True면 blobs.store로 (같은 내용끼리 파일 공유), 아니면 파일을 혼자 쓰는 예전 이미지
+        """
+        upload = SimpleUploadedFile("a.png", content)
+        img = blobs.store(upload, "a.png") if shared else Image.objects.create(image=upload)
+        Image.objects.filter(pk=img.pk).update(
+            uploaded_at=timezone.now() - age, message=self.message if attached else None
+        )
+        return img
+
+    def sweep(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return cleanup.sweep_orphan_images(**kwargs)
+
+    def test_only_old_orphans_deleted(self):
+        orphan = self.image(b"123456")
+        recent = self.image(age=timedelta(hours=1))
+        attached = self.image(attached=True)
+
+        self.assertEqual(self.sweep(batch_size=1), (1, 6))
+        self.assertEqual(set(Image.objects.values_list("id", flat=True)), {recent.id, attached.id})
+        self.assertFalse(orphan.image.storage.exists(orphan.image.name))
+
+    def test_shared_blob_reclaimed_once(self):
+        first, second = self.image(b"0123456789", shared=True), self.image(b"0123456789", shared=True)
+        self.assertEqual(self.sweep(), (2, 10))
+        self.assertFalse(ImageBlob.objects.filter(pk=first.blob_id).exists())
+        self.assertFalse(second.image.storage.exists(second.image.name))
+
+    def test_blob_still_referenced_not_reclaimed(self):
+        orphan = self.image(b"0123456789", shared=True)
+        self.image(b"0123456789", shared=True, attached=True)
+        self.assertEqual(self.sweep(), (1, 0))
+        self.assertEqual(ImageBlob.objects.get(pk=orphan.blob_id).ref_count, 1)
+        self.assertTrue(orphan.image.storage.exists(orphan.image.name))
+
+    def test_dry_run_deletes_nothing(self):
+        orphan = self.image(b"123456")
+        self.assertEqual(self.sweep(dry_run=True), (1, 6))
+        self.assertTrue(Image.objects.filter(pk=orphan.pk).exists())
+        self.assertTrue(orphan.image.storage.exists(orphan.image.name))
+
+    def test_image_attached_after_selection_kept(self):
+        img = self.image()
+        Image.objects.filter(pk=img.pk).update(message=self.message)  # id를 고른 뒤 메시지에 연결됨
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(cleanup._sweep_image_batch([img.id], timezone.now()), (0, 0))
+        self.assertTrue(Image.objects.filter(pk=img.pk).exists())
+        self.assertTrue(img.image.storage.exists(img.image.name))
+
+
+@redis_test
+@skipUnless(search.backend(connection), "메시지 검색을 지원하지 않는 DB")
+class MessageSearchTests(TestCase):
+    """
+    GET /api/chat/search/ (search.py): 참가한 방만, 접두어 검색, 커서, 색인 트리거
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create(username="me", nickname="나")
+        other = User.objects.create(username="other", nickname="남")
+        self.room = ChatRoom.objects.create_room(participants=[self.me, other], title="우리 방")
+        self.second = ChatRoom.objects.create_room(participants=[self.me], title="내 방")
+        self.foreign = ChatRoom.objects.create_room(participants=[other], title="남의 방")
+        self.client = APIClient()
+        self.client.force_authenticate(self.me)
+
+    def say(self, room, text):
+        return ChatMessage.objects.create(room=room, sender=self.me, text=text)
+
+    def get(self, **params):
+        return self.client.get(reverse("message-search"), params)
+
+    def ids(self, **params):
+        response = self.get(**params)
+        self.assertEqual(response.status_code, 200)
+        return [msg["id"] for msg in response.data["results"]]
+
+    def test_only_participating_rooms(self):
+        mine = self.say(self.room, "안녕하세요 여러분")
+        other = self.say(self.second, "안녕 다들")
+        self.say(self.foreign, "안녕하세요 남의 방")
+        self.assertEqual(set(self.ids(q="안녕")), {mine.id, other.id})
+        self.assertEqual(self.ids(q="안녕", room=self.room.id), [mine.id])
+        self.assertEqual(self.ids(q="안녕", room=self.foreign.id), [])
+
+    def test_all_words_required(self):
+        both = self.say(self.room, "내일 회의 시간")
+        self.say(self.room, "내일 점심")
+        self.assertEqual(self.ids(q="내일 회의"), [both.id])
+        self.assertEqual(self.ids(q="   "), [])
+
+    def test_cursor_pages(self):
+        sent = [self.say(self.room, f"공지 {i}") for i in range(5)]
+        seen, cursor = [], None
+        while True:
+            response = self.get(q="공지", limit=2, **({"cursor": cursor} if cursor else {}))
+            page = [msg["id"] for msg in response.data["results"]]
+            self.assertLessEqual(len(page), 2)
+            seen += page
+            cursor = response.data["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, [msg.id for msg in reversed(sent)])  # 같은 점수면 최신 순, 중복 없음
+
+    def test_bad_params(self):
+        for params, detail in (
+            ({"room": "x"}, "room은 정수여야 합니다."),
+            ({"limit": "x"}, "limit은 정수여야 합니다."),
+            ({"room": self.room.id, "limit": "x"}, "limit은 정수여야 합니다."),
+            ({"cursor": "not-a-cursor"}, "cursor가 올바르지 않습니다."),
+        ):
+            with self.subTest(**params):
+                response = self.get(q="공지", **params)
+                self.assertEqual((response.status_code, response.data["detail"]), (400, detail))
+
+    def test_triggers_follow_changes(self):
+        msg = self.say(self.room, "사과")
+        bulk = ChatMessage.objects.bulk_create([ChatMessage(room=self.room, sender=self.me, text="사과 주스")])
+        self.assertEqual(len(self.ids(q="사과")), 2)
+
+        ChatMessage.objects.filter(pk=msg.pk).update(text="바나나")
+        self.assertEqual(self.ids(q="사과"), [bulk[0].id])
+        self.assertEqual(self.ids(q="바나나"), [msg.id])
+
+        msg.delete()
+        self.assertEqual(self.ids(q="바나나"), [])
+
+    def test_rebuild(self):
+        sent = [self.say(self.room, f"복구 {i}") for i in range(3)]
+        self.assertEqual(list(search.rebuild(batch_size=2)), [2, 3])
+        self.assertEqual(self.ids(q="복구"), [msg.id for msg in reversed(sent)])
+
+    def test_rebuild_interrupted_keeps_index(self):
+        sent = [self.say(self.room, f"복구 {i}") for i in range(3)]
+        progress = search.rebuild(batch_size=2)
+        self.assertEqual(next(progress), 2)
+        progress.close()  # 중간에 멈추면 롤백 → 비우기 전 색인 그대로
+        self.assertEqual(len(self.ids(q="복구")), len(sent))
+
+    def test_rebuild_command(self):
+        self.say(self.room, "명령")
+        out = io.StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("done: 1 messages", out.getvalue())
+        self.assertEqual(len(self.ids(q="명령")), 1)
+
+
+@redis_test
+class ReadCoalescingTests(TransactionTestCase):
+    """
+    읽음 이벤트 모으기 (reads.ReadCoalescer): interval 안의 읽음은 DB 반영 + 브로드캐스트 한 번
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create(username="me", nickname="나")
+        self.other = User.objects.create(username="other", nickname="상대")
+        self.room = ChatRoom.objects.create_room(participants=[self.me, self.other], title="방")
+        self.sent = [ChatMessage.objects.create(room=self.room, sender=self.other, text=f"m{i}") for i in range(3)]
+
+    async def listen(self):
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        await layer.group_add(room_group(self.room.id), channel)
+        return layer, channel
+
+    async def test_reads_coalesced_into_one_event(self):
+        layer, channel = await self.listen()
+        coalescer = ReadCoalescer(interval=0.05)
+        first, second, third = [msg.id for msg in self.sent]
+        for msg_id in (first, third, second):
+            coalescer.add(layer, self.room.id, self.me.id, msg_id)
+
+        event = await asyncio.wait_for(layer.receive(channel), 1)
+        frame = json.loads(event["text"])
+        # 가장 큰 msg_id 하나만, 보낸 사람과 나 둘 다 읽음
+        self.assertEqual(frame["reads"], [{"user_id": self.me.id, "msg_id": third, "read_count": 2}])
+        self.assertEqual((event["user_ids"], event["unread_counts"]), ([self.me.id], [0]))
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(layer.receive(channel), 0.2)
+
+        state = await ChatReadState.objects.aget(room=self.room, user=self.me)
+        self.assertEqual((state.last_read_message_id, state.unread_count), (third, 0))
+
+    async def test_watermark_capped_at_latest_message(self):
+        layer, channel = await self.listen()
+        coalescer = ReadCoalescer(interval=60)
+        coalescer.add(layer, self.room.id, self.me.id, self.sent[-1].id + 100)
+        await coalescer.flush(layer, self.room.id)  # 예약된 tick을 기다리지 않음
+
+        frame = json.loads((await asyncio.wait_for(layer.receive(channel), 1))["text"])
+        self.assertEqual(frame["reads"][0]["msg_id"], self.sent[-1].id)
+        state = await ChatReadState.objects.aget(room=self.room, user=self.me)
+        self.assertEqual(state.last_read_message_id, self.sent[-1].id)
+
+
+@redis_test
+class SequenceReplayTests(TestCase):
+    """
+    방별 순번과 재접속 시 빠진 구간 재전송 (sequence.py)
+    """
+
+    def setUp(self):
+        cache.clear()
+        me = User.objects.create(username="me", nickname="나")
+        self.room = ChatRoom.objects.create_room(participants=[me], title="방")
+        self.sent = [ChatMessage.objects.create(room=self.room, sender=me, text=f"m{i}") for i in range(4)]
+
+    def test_seq_increments_and_resumes_from_db(self):
+        self.assertEqual([msg.seq for msg in self.sent], [1, 2, 3, 4])
+        cache.clear()  # Redis 카운터가 사라져도 (만료/flush)
+        self.assertIsNone(sequence.next_seq_cached(self.room.id))
+        self.assertEqual(sequence.next_seq(self.room.id), 5)  # DB 최대값부터 이어서
+        self.assertEqual(sequence.next_seq_cached(self.room.id), 6)
+
+    def test_replay_from_stream(self):
+        sequence.append(self.room.id, [(msg.seq, {"seq": msg.seq, "text": msg.text}) for msg in self.sent])
+        self.assertEqual(sequence.replay(self.room.id, 2), ([{"seq": 3, "text": "m2"}, {"seq": 4, "text": "m3"}], True))
+
+    def test_replay_falls_back_to_db(self):
+        # Stream에 앞부분(seq 2)이 없으면 DB에서 읽음
+        sequence.append(self.room.id, [(msg.seq, {"seq": msg.seq}) for msg in self.sent[2:]])
+        messages, complete = sequence.replay(self.room.id, 1)
+        self.assertEqual([m["text"] for m in messages], ["m1", "m2", "m3"])
+        self.assertTrue(complete)
+
+    def test_replay_limit(self):
+        with mock.patch.object(sequence, "REPLAY_LIMIT", 2):
+            messages, complete = sequence.replay(self.room.id, 0)
+        self.assertEqual([m["text"] for m in messages], ["m0", "m1"])
+        self.assertFalse(complete)  # 나머지는 REST로
+
+
+@redis_test
+class MessageHistoryTests(TestCase):
+    """
+    GET /api/chat/chatrooms/<pk>/messages/ 의 id 커서 페이지
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create(username="me", nickname="나")
+        self.room = ChatRoom.objects.create_room(participants=[self.me], title="방")
+        self.ids = [ChatMessage.objects.create(room=self.room, sender=self.me, text=f"m{i}").id for i in range(5)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.me)
+
+    def get(self, **params):
+        return self.client.get(reverse("chatroom-messages", args=[self.room.id]), params)
+
+    def page(self, **params):
+        response = self.get(**params)
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        return [m["id"] for m in data["results"]], data["has_more"], data["next_before"], data["next_after"]
+
+    def test_scroll_up_with_before(self):
+        ids = self.ids
+        self.assertEqual(self.page(limit=2), (ids[3:], True, ids[3], ids[4]))
+        self.assertEqual(self.page(limit=2, before=ids[3]), (ids[1:3], True, ids[1], ids[2]))
+        self.assertEqual(self.page(limit=2, before=ids[1]), (ids[:1], False, ids[0], ids[0]))
+
+    def test_catch_up_with_after(self):
+        ids = self.ids
+        self.assertEqual(self.page(limit=3, after=ids[0]), (ids[1:4], True, ids[1], ids[3]))
+        self.assertEqual(self.page(limit=3, after=ids[3]), (ids[4:], False, ids[4], ids[4]))
+        self.assertEqual(self.page(after=ids[4]), ([], False, None, ids[4]))
+
+    def test_bad_params(self):
+        self.assertEqual(self.get(before=1, after=1).status_code, 400)
+        self.assertEqual(self.get(limit="x").status_code, 400)
+
+    def test_other_room_hidden(self):
+        stranger = User.objects.create(username="stranger", nickname="남")
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.get().status_code, 404)
+
+
+@redis_test
+class RoomSyncTests(TestCase):
+    """
+    POST /api/chat/chatrooms/sync/: 마지막으로 받은 version 이후 바뀐 방만
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create(username="me", nickname="나")
+        self.quiet = ChatRoom.objects.create_room(participants=[self.me], title="조용한 방")
+        self.busy = ChatRoom.objects.create_room(participants=[self.me], title="바쁜 방")
+        self.client = APIClient()
+        self.client.force_authenticate(self.me)
+
+    def say(self, room, text):
+        return ChatMessage.objects.create(room=room, sender=self.me, text=text)
+
+    def known(self, *rooms, after=0):
+        """
+        지금 상태를 클라이언트가 받아 둔 것처럼
+        """
+        return [
+            {"id": room.id, "version": ChatRoom.objects.get(pk=room.id).version, "after": after}
+            for room in rooms
+        ]
+
+    def sync(self, rooms):
+        return self.client.post(reverse("chatroom-sync"), {"rooms": rooms}, format="json")
+
+    def test_only_changed_rooms(self):
+        seen = self.say(self.busy, "이미 받음")
+        known = self.known(self.quiet, self.busy, after=seen.id)
+        new = self.say(self.busy, "새 메시지")
+
+        response = self.sync(known)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([room["id"] for room in response.data["rooms"]], [self.busy.id])
+        room = response.data["rooms"][0]
+        self.assertEqual([m["id"] for m in room["messages"]], [new.id])
+        self.assertTrue(room["messages_complete"])
+        self.assertEqual(response.data["removed"], [])
+
+    def test_nothing_changed(self):
+        self.assertEqual(self.sync(self.known(self.quiet, self.busy)).data, {"rooms": [], "removed": []})
+
+    def test_new_and_removed_rooms(self):
+        known = self.known(self.quiet) + [{"id": self.busy.id + 1000, "version": 1}]
+        data = self.sync(known).data
+        self.assertEqual([room["id"] for room in data["rooms"]], [self.busy.id])  # 모르는 방은 새로 받음
+        self.assertEqual(data["removed"], [self.busy.id + 1000])
+
+    def test_bad_input(self):
+        self.assertEqual(self.sync("x").status_code, 400)
+        self.assertEqual(self.sync([{"version": 1}]).status_code, 400)
+        self.assertEqual(self.sync([{"id": "a"}]).status_code, 400)
+
+
+@redis_test
+class ChunkedUploadTests(TestCase):
+    """
+    이어받기 가능한 분할 업로드 (uploads.py): init → PUT 조각 → GET 위치 → complete
+    """
+
+    CONTENT = b"0123456789abcdef"
+
+    def setUp(self):
+        cache.clear()
+        use_temp_media(self)
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir, ignore_errors=True)
+        override = override_settings(CHAT_UPLOAD_DIR=upload_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        schedule = mock.patch("chatchat.apps.chat_app.imaging.schedule_blob")
+        schedule.start()
+        self.addCleanup(schedule.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="me", nickname="나"))
+
+    def init(self, sha256=None):
+        response = self.client.post(reverse("upload-init"), {
+            "filename": "a.png",
+            "size": len(self.CONTENT),
+            "sha256": sha256 or hashlib.sha256(self.CONTENT).hexdigest(),
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        return response.data["upload_id"]
+
+    def put(self, upload_id, offset, chunk):
+        return self.client.put(
+            reverse("upload-chunk", args=[upload_id]), chunk,
+            content_type="application/octet-stream", HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def complete(self, upload_id):
+        return self.client.post(reverse("upload-complete", args=[upload_id]))
+
+    def test_resume_and_complete(self):
+        upload_id = self.init()
+        self.assertEqual(self.put(upload_id, 0, self.CONTENT[:10]).data["received"], 10)
+        self.assertEqual(self.put(upload_id, 4, self.CONTENT[4:]).status_code, 409)  # 받은 위치와 다름
+        self.assertEqual(self.complete(upload_id).status_code, 409)  # 아직 다 못 받음
+
+        # 끊긴 뒤: 받은 위치를 확인하고 그 뒤부터 보냄
+        self.assertEqual(self.client.get(reverse("upload-chunk", args=[upload_id])).data["received"], 10)
+        self.assertEqual(self.put(upload_id, 10, self.CONTENT[10:]).data["received"], len(self.CONTENT))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.complete(upload_id)
+        self.assertEqual(response.status_code, 201)
+        image = Image.objects.get(pk=response.data["image_ids"][0])
+        with image.image.open("rb") as f:
+            self.assertEqual(f.read(), self.CONTENT)
+        self.assertEqual(self.complete(upload_id).data["image_ids"], [image.id])  # 다시 불러도 같은 이미지
+
+    def test_too_large_chunk(self):
+        upload_id = self.init()
+        self.assertEqual(self.put(upload_id, 0, self.CONTENT + b"x").status_code, 413)
+
+    def test_sha_mismatch_restarts(self):
+        upload_id = self.init(sha256="0" * 64)
+        self.put(upload_id, 0, self.CONTENT)
+        self.assertEqual(self.complete(upload_id).status_code, 422)
+        session = UploadSession.objects.get(pk=upload_id)
+        self.assertEqual((session.received, session.status), (0, UploadSession.Status.OPEN))
+        self.assertFalse(Image.objects.exists())
+
+    def test_sha256_must_be_hex(self):
+        response = self.client.post(reverse("upload-init"), {
+            "filename": "a.png", "size": len(self.CONTENT), "sha256": "z" * 64,
+        }, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_broken_stream_keeps_written_part(self):
+        session = UploadSession.objects.get(pk=self.init())
+
+        class BrokenStream:
+            def __init__(self):
+                self.reads = 0
+
+            def read(self, size):
+                self.reads += 1
+                if self.reads > 1:
+                    raise OSError("client disconnected")
+                return ChunkedUploadTests.CONTENT[:4]
+
+        with mock.patch.object(uploads, "UPLOAD_READ_BLOCK", 4), self.assertRaises(OSError):
+            uploads.append(session, 0, BrokenStream(), len(self.CONTENT))  # 원래 오류가 그대로 올라옴
+        session.refresh_from_db()
+        self.assertEqual(session.received, 4)  # 끊기기 전까지 쓴 만큼은 이어 보낼 수 있음
+
+    def test_other_users_upload_hidden(self):
+        upload_id = self.init()
+        self.client.force_authenticate(User.objects.create(username="stranger", nickname="남"))
+        self.assertEqual(self.put(upload_id, 0, self.CONTENT).status_code, 404)
+        self.assertEqual(self.complete(upload_id).status_code, 404)
@@ -0,0 +1,22 @@
+# apps/chat/typing_indicator.py
+# "입력 중" 표시. DB에 저장하지 않고 channel layer로만 흘려보냄.
+from django.core.cache import cache
+
+TYPING_THROTTLE = 3   # sec. (방, 유저)당 이 시간에 한 번만 방에 알림 (키 입력마다 오는 프레임은 버림)
+TYPING_TIMEOUT = 6    # sec. 이 시간 동안 typing 프레임이 없으면 서버가 "입력 끝"을 알림
+
+THROTTLE_KEY = "chat:room:{room_id}:typing:{user_id}"
+
+
+def should_broadcast(room_id, user_id) -> bool:
+    """
+    이번 typing 프레임을 방에 알릴지. 같은 유저의 다른 연결(탭/기기)과도 공유되는 제한 (SET NX EX).
+    """
+    return cache.add(THROTTLE_KEY.format(room_id=room_id, user_id=user_id), 1, timeout=TYPING_THROTTLE)
+
+
+def reset(room_id, user_id) -> None:
+    """
+    입력이 끝났으면(메시지 전송/만료) 다음 typing은 바로 알릴 수 있게 제한을 풂
+    """
+    cache.delete(THROTTLE_KEY.format(room_id=room_id, user_id=user_id))
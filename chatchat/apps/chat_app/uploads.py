@@ -0,0 +1,120 @@
+# apps/chat/uploads.py
+# 이어받기 가능한 분할 업로드. 조각을 받는 즉시 디스크의 임시 파일에 이어 쓰므로
+# 한 번에 메모리에 올라가는 양은 UPLOAD_READ_BLOCK으로 제한됨.
+#   init → (append 조각 × N, 끊기면 status로 received 확인 후 그 위치부터 다시) → complete(sha256 검증)
+import os
+import re
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+
+from . import blobs
+from .models import Image, UploadSession
+
+UPLOAD_MAX_SIZE = 30 * 1024 * 1024     # 파일 하나 최대 크기 (byte)
+UPLOAD_CHUNK_SIZE = 1024 * 1024        # 클라이언트에 권장하는 조각 크기
+UPLOAD_MAX_CHUNK = 8 * 1024 * 1024     # 요청 하나에 받을 최대 조각 크기
+UPLOAD_READ_BLOCK = 64 * 1024          # 요청 본문을 이 크기씩 읽어서 바로 씀
+
+SHA256_RE = re.compile(r"[0-9a-fA-F]{64}")
+
+
+class UploadError(Exception):
+    """
+    status: 돌려줄 HTTP 상태 코드
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def part_path(session: UploadSession) -> str:
+    return os.path.join(settings.CHAT_UPLOAD_DIR, f"{session.id}.part")
+
+
+def init(user, filename: str, size: int, sha256: str) -> UploadSession:
+    if not 0 < size <= UPLOAD_MAX_SIZE:
+        raise UploadError(f"파일 크기는 1 ~ {UPLOAD_MAX_SIZE} byte 여야 합니다.")
+    if not SHA256_RE.fullmatch(sha256):
+        raise UploadError("sha256은 64자리 hex 문자열이어야 합니다.")
+
+    session = UploadSession.objects.create(
+        user=user, filename=os.path.basename(filename)[:255], size=size, sha256=sha256.lower()
+    )
+    os.makedirs(settings.CHAT_UPLOAD_DIR, exist_ok=True)
+    open(part_path(session), "wb").close()
+    return session
+
+
+def append(session: UploadSession, offset: int, stream, length: int) -> int:
+    """
+    stream에서 length byte를 읽어 offset 위치에 씀. 반환: 새 received.
+    중간에 연결이 끊겨도 실제로 쓴 만큼은 received에 반영되므로 그 위치부터 이어 보내면 됨.
+    """
+    if session.status != UploadSession.Status.OPEN:
+        raise UploadError("이미 완료된 업로드입니다.", status=409)
+    if offset != session.received:
+        raise UploadError("offset이 받은 위치와 다릅니다.", status=409)
+    if length > UPLOAD_MAX_CHUNK or offset + length > session.size:
+        raise UploadError("조각이 너무 크거나 파일 크기를 넘습니다.", status=413)
+
+    written = 0
+    error = None
+    try:
+        with open(part_path(session), "r+b") as f:
+            f.seek(offset)
+            while written < length:
+                block = stream.read(min(UPLOAD_READ_BLOCK, length - written))
+                if not block:
+                    break
+                f.write(block)
+                written += len(block)
+    except Exception as e:
+        error = e  # 연결 끊김/디스크 오류 등. 그 전까지 쓴 만큼은 반영한 뒤 원래 오류를 다시 올림
+
+    # 같은 offset으로 동시에 온 요청 중 먼저 반영한 쪽만 인정
+    if written and not UploadSession.objects.filter(
+        pk=session.pk, received=offset, status=UploadSession.Status.OPEN
+    ).update(received=offset + written):
+        raise UploadError("같은 위치에 다른 조각이 먼저 반영됐습니다.", status=409) from error
+    session.received = offset + written
+    if error is not None:
+        raise error
+    return session.received
+
+
+def complete(session: UploadSession) -> Image:
+    """
+    크기와 sha256을 확인하고 Image를 만듦. 해시가 다르면 받은 내용을 버리고 처음부터 다시 받게 함.
+    """
+    with transaction.atomic():
+        # 같은 세션에 complete가 동시에 와도 Image는 하나만 만들어지도록 잠금
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.status == UploadSession.Status.COMPLETE:
+            return session.image  # 응답을 못 받고 다시 호출한 경우
+        if session.received != session.size:
+            raise UploadError("아직 다 받지 못했습니다.", status=409)
+
+        path = part_path(session)
+        with open(path, "rb") as f:
+            digest = blobs.file_sha256(f)
+        if digest != session.sha256:
+            session.received = 0
+            session.save(update_fields=["received", "updated_at"])
+            error = UploadError("sha256이 일치하지 않습니다. 처음부터 다시 올려 주세요.", status=422)
+        else:
+            error = None
+            with open(path, "rb") as f:
+                # 같은 내용이 이미 있으면 파일을 새로 쓰지 않고 공유 (blobs.store)
+                image = blobs.store(File(f, name=session.filename), session.filename, sha256=digest)
+            session.status = UploadSession.Status.COMPLETE
+            session.image = image
+            session.save(update_fields=["status", "image", "updated_at"])
+
+    # 예외로 빠져나가면 received=0 저장이 롤백되므로 트랜잭션 밖에서 올림
+    if error:
+        raise error
+    os.remove(path)
+    return image
@@ -1,5 +1,8 @@
 from rest_framework.routers import DefaultRouter
-from .views import ChatRoomViewSet, ImageUploadView
+from .views import (
+    ChatMetricsView, ChatRoomViewSet, ImageUploadView, MessageSearchView,
+    UploadChunkView, UploadCompleteView, UploadInitView,
+)
 from django.urls import path
 
 router = DefaultRouter()
@@ -7,6 +10,11 @@ router.register("chatrooms", ChatRoomViewSet, basename="chatroom")
 
 urlpatterns = [
     path("images/", ImageUploadView.as_view(), name="image-upload"),
+    path("metrics/", ChatMetricsView.as_view(), name="chat-metrics"),
+    path("search/", MessageSearchView.as_view(), name="message-search"),
+    path("uploads/", UploadInitView.as_view(), name="upload-init"),
+    path("uploads/<uuid:upload_id>/", UploadChunkView.as_view(), name="upload-chunk"),
+    path("uploads/<uuid:upload_id>/complete/", UploadCompleteView.as_view(), name="upload-complete"),
 ]
 
-
+urlpatterns += router.urls  # /chatrooms/
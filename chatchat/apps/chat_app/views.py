@@ -1,9 +1,36 @@
+import hashlib
+import json
+import math
+import time
+
+from django.db.models import F, OuterRef, Prefetch, Subquery
+from django.utils.http import parse_etags
+
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import ChatRoom, ChatMessage, Image, UserDeviceToken
-from .serializers import ChatRoomListSerializer, ChatRoomSerializer, ChatMessageSerializer
+from rest_framework.utils.encoders import JSONEncoder
+from .models import ChatRoom, ChatMessage, ChatReadState, Image, UploadSession, User, UserDeviceToken
+from .serializers import ChatRoomListSerializer, ChatRoomSerializer, ChatMessageSerializer, attachment_fields
 from rest_framework.views import APIView
+from . import blobs, metrics, presence, ratelimit, room_list, search, sync, uploads
+
+MESSAGE_PAGE_SIZE = 50   # 메시지 기록 한 페이지 기본 개수
+MESSAGE_PAGE_MAX = 200   # limit으로 요청할 수 있는 최대 개수
+
+def _etag(stamp) -> str:
+    # 응답 내용을 결정하는 값들로 만든 strong ETag
+    return '"%s"' % hashlib.sha1(json.dumps(stamp, default=str).encode()).hexdigest()
+
+
+def _not_modified(request, etag: str) -> bool:
+    if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+    return etag in if_none_match or "*" in if_none_match
+
+
+def _not_modified_response(etag: str) -> Response:
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
 
 class ChatRoomViewSet(viewsets.ModelViewSet):
     """
@@ -29,15 +56,110 @@ class ChatRoomViewSet(viewsets.ModelViewSet):
             return None
         return super().paginate_queryset(queryset)
 
+    def list(self, request, *args, **kwargs):
+        """
+        GET /chatrooms/
+        방 목록 + 각 방의 접속 중인 유저 + 내 안 읽은 수.
+        직렬화된 목록은 유저별로 캐시해 두고(room_list.py), 목록이 바뀌는 이벤트가 있을 때만 다시 만듦.
+        다시 만들 때도 방 개수와 상관없이 쿼리 수가 일정함 (list_queryset 참고).
+        접속 중인 유저는 캐시하지 않고 매번 Redis 파이프라인 한 번으로 채움.
+
+        ETag = (방 id, 방 version, 내 안 읽은 수) 해시 + 접속 중인 유저.
+        If-None-Match가 같으면 직렬화 없이 304 (캐시가 있으면 DB를 전혀 읽지 않음).
+        """
+        cached, gen = room_list.get(request.user.id)
+        if cached is None:
+            cached = self.build_room_list()
+            room_list.put(request.user.id, gen, cached)
+
+        online_users = presence.online_users_bulk(room["id"] for room in cached["rooms"])
+        online = {room["id"]: sorted(online_users.get(room["id"], ())) for room in cached["rooms"]}
+        etag = _etag([cached["stamp"], sorted(online.items())])
+        if _not_modified(request, etag):
+            return _not_modified_response(etag)
+
+        rooms = [{**room, "online_user_ids": online[room["id"]]} for room in cached["rooms"]]
+        return Response(rooms, headers={"ETag": etag})
+
+    def build_room_list(self) -> dict:
+        """
+        캐시에 넣을 방 목록 (접속 중인 유저 제외)과 ETag용 해시를 DB에서 만듦
+        """
+        started = time.perf_counter()
+        queryset = self.filter_queryset(self.get_queryset())
+        stamps = list(
+            queryset.prefetch_related(None).values_list("id", "version", "my_unread_count")
+        )
+        context = self.get_serializer_context()
+        context["online_users"] = {}  # 응답할 때 채움
+        rooms = self.get_serializer(list(queryset), many=True, context=context).data
+        metrics.observe("room_list_cache.rebuild_ms", (time.perf_counter() - started) * 1000)
+        return {
+            "stamp": _etag(stamps),
+            # 캐시에 저장할 수 있도록 JSON 기본 타입으로 (datetime 등은 응답과 같은 형식의 문자열로)
+            "rooms": json.loads(json.dumps(rooms, cls=JSONEncoder)),
+        }
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        GET /chatrooms/<pk>/
+        ETag = 방 version (제목/참가자/참가자 프로필이 바뀌면 올라감).
+        If-None-Match가 같으면 방을 읽지 않고 304 (version만 조회).
+        """
+        try:
+            stamp = self.get_queryset().filter(pk=kwargs["pk"]).values_list("id", "version").first()
+        except (TypeError, ValueError):
+            stamp = None  # 잘못된 pk → 아래 get_object가 404
+        if stamp is not None:
+            etag = _etag(stamp)
+            if _not_modified(request, etag):
+                return _not_modified_response(etag)
+        response = super().retrieve(request, *args, **kwargs)
+        if stamp is not None:
+            response["ETag"] = etag
+        return response
+
+    def list_queryset(self, queryset):
+        """
+        목록에 필요한 것을 방마다 따로 읽지 않도록 한 번에:
+          - 참가자 id 전체 / 프로필용 앞 4명 → 각각 prefetch 쿼리 1번
+          - 연결된 객체(Post 등) → GenericForeignKey prefetch (content type마다 1번)
+          - 내 안 읽은 수 → ChatReadState 카운터를 Subquery로
+          - 마지막 메시지 → 방에 저장된 스냅샷 (쿼리 없음)
+        """
+        my_unread = ChatReadState.objects.filter(
+            room_id=OuterRef("pk"), user=self.request.user
+        ).values("unread_count")[:1]
+        return (
+            queryset
+            .select_related("content_type")
+            .annotate(my_unread_count=Subquery(my_unread))  # ETag 계산에도 씀
+            .prefetch_related(
+                Prefetch("participants", queryset=User.objects.only("id")),
+                Prefetch(
+                    "participants",
+                    queryset=User.objects.only("id", "profile_img", "profile_thumb").order_by("id")[:4],
+                    to_attr="preview_participants",
+                ),
+                "content_object",
+            )
+        )
+
     def get_queryset(self):
         """
         오버라이딩: 전체 방이 아닌,
         현재 로그인한 유저가 '참여자'로 들어있는 방만 필터링해서 보여줌.
-        GET 요청 시 자동으로 호출됨. 
+        GET 요청 시 자동으로 호출됨.
         GET: /api/chatrooms/
         GET: /api/chatrooms/3
+        최근 대화가 있었던 방부터 (메시지가 없는 방은 맨 뒤)
         """
-        return ChatRoom.objects.filter(participants=self.request.user)
+        queryset = ChatRoom.objects.filter(participants=self.request.user).order_by(
+            F("last_message_at").desc(nulls_last=True), "-created_at"
+        )
+        if self.action == "list":
+            queryset = self.list_queryset(queryset)
+        return queryset
 
     def perform_create(self, serializer):
         """
@@ -76,6 +198,128 @@ class ChatRoomViewSet(viewsets.ModelViewSet):
                 room.content_object.members.remove(user) 
         return Response({"message": "채팅방에서 나갔습니다."}, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=["get"])
+    def messages(self, request, pk=None):
+        """
+        GET /chatrooms/<pk>/messages/?before=<id>&limit=50   → id가 before보다 작은 메시지 중 최신 limit개
+        GET /chatrooms/<pk>/messages/?after=<id>&limit=50    → id가 after보다 큰 메시지 중 오래된 순 limit개
+        둘 다 없으면 가장 최근 limit개. 결과는 항상 오래된 순.
+        응답: { "results": [...], "has_more": true, "next_before": 123, "next_after": 172 }
+          - 위로 스크롤: before=next_before, 아래로 이어받기: after=next_after
+          - has_more: 요청한 방향으로 더 있는지
+        offset 대신 id를 기준으로 잘라서, 메시지가 많은 방에서도 페이지마다 비용이 같음.
+        """
+        room = self.get_object()
+        try:
+            before = int(request.query_params["before"]) if "before" in request.query_params else None
+            after = int(request.query_params["after"]) if "after" in request.query_params else None
+            limit = int(request.query_params.get("limit", MESSAGE_PAGE_SIZE))
+        except ValueError:
+            return Response({"detail": "before, after, limit은 정수여야 합니다."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if before is not None and after is not None:
+            return Response({"detail": "before와 after는 함께 쓸 수 없습니다."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, MESSAGE_PAGE_MAX))
+
+        qs = (
+            ChatMessage.objects.filter(room=room)
+            .select_related("sender")
+            .prefetch_related("images")
+        )
+        if after is not None:
+            page = list(qs.filter(pk__gt=after).order_by("pk")[:limit + 1])
+            has_more = len(page) > limit
+            page = page[:limit]
+        else:
+            if before is not None:
+                qs = qs.filter(pk__lt=before)
+            page = list(qs.order_by("-pk")[:limit + 1])
+            has_more = len(page) > limit
+            page = page[:limit][::-1]
+
+        results = [
+            {**data, **attachment_fields(data["images"])}
+            for data in ChatMessageSerializer(page, many=True, context={"request": request}).data
+        ]
+        return Response({
+            "results": results,
+            "has_more": has_more,
+            "next_before": page[0].pk if page else before,
+            "next_after": page[-1].pk if page else after,
+        })
+
+    @action(detail=False, methods=["post"])
+    def sync(self, request):
+        """
+        POST /chatrooms/sync/
+        { "rooms": [ { "id": 1, "version": 10, "after": 532 }, ... ] }
+          - version: 그 방에 대해 마지막으로 받은 version
+          - after:   마지막으로 받은 메시지 id
+        앱을 다시 열었을 때 목록/상세를 다시 받는 대신, 그 뒤로 바뀐 방만 받음.
+        응답: { "rooms": [바뀐 방의 현재 상태 + 새 메시지], "removed": [나간/삭제된 방 id] }
+        (방마다 새 메시지가 많으면 messages_complete=False → messages API로 나머지를 받음)
+        """
+        try:
+            known = sync.parse_known(request.data.get("rooms", []))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(sync.build(request.user, known, context={"request": request}))
+
+
+class ChatMetricsView(APIView):
+    """
+    GET /api/chat/metrics/
+    이 워커(프로세스)의 채팅 지표 (연결별 전송 대기열 길이, 버린 프레임 수 등). 스태프 전용.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics.snapshot())
+
+
+class MessageSearchView(APIView):
+    """
+    GET /api/chat/search/?q=검색어&room=<room_id>&cursor=...&limit=20
+    내가 참가한 방(room을 주면 그 방만)의 메시지 검색. 관련도 순, 같은 점수면 최신 순.
+    응답: { "results": [메시지, ...], "next_cursor": "..." }  (다음 페이지는 cursor=next_cursor, 없으면 null)
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        # 어느 파라미터가 잘못됐는지 알려주도록 하나씩 변환
+        params = {}
+        for name, default in (("room", None), ("limit", search.SEARCH_PAGE_SIZE)):
+            try:
+                params[name] = int(request.query_params[name]) if name in request.query_params else default
+            except ValueError:
+                return Response({"detail": f"{name}은 정수여야 합니다."},
+                                status=status.HTTP_400_BAD_REQUEST)
+        try:
+            messages, next_cursor = search.search(
+                request.user, request.query_params.get("q", ""),
+                room_id=params["room"], cursor=request.query_params.get("cursor"), limit=params["limit"],
+            )
+        except search.SearchError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # ChatMessageSerializer가 방마다 워터마크를 다시 읽지 않도록 한 번에 채워 둠
+        watermarks = {msg.room_id: [] for msg in messages}
+        for room, user_id, last in (
+            ChatReadState.objects.filter(room_id__in=watermarks)
+            .values_list("room_id", "user_id", "last_read_message_id")
+        ):
+            watermarks[room].append((user_id, last))
+        context = {"request": request, "read_watermarks": watermarks}
+        results = [
+            {**data, **attachment_fields(data["images"])}
+            for data in ChatMessageSerializer(messages, many=True, context=context).data
+        ]
+        return Response({"results": results, "next_cursor": next_cursor})
+
+
 class ImageUploadView(APIView):
     """
     채팅방 메시지에 첨부할 이미지를 업로드하는 API.
@@ -93,15 +337,115 @@ class ImageUploadView(APIView):
             return Response({"error": "이미지 파일이 필요합니다."}, status=status.HTTP_400_BAD_REQUEST)
 
         images = request.FILES.getlist('images')
+        max_images = int(ratelimit.burst("upload_user"))
+        if len(images) > max_images:
+            # 버킷이 가득 차 있어도 통과할 수 없으므로 다시 시도하라고 하지 않음
+            return Response({"error": f"한 번에 최대 {max_images}장까지 올릴 수 있습니다."},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        retry_after = ratelimit.take_upload(request.user.id, len(images))
+        if retry_after:
+            return Response(
+                {"error": "업로드 요청이 너무 많습니다. 잠시 후 다시 시도해 주세요.",
+                 "retry_after": round(retry_after, 2)},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
         img_ids = []
         for image in images:
-            img = Image.objects.create(image=image)
+            # 같은 내용이 이미 있으면 파일 저장/크기별 이미지 생성 없이 공유.
+            # 처음 올라온 내용이면 썸네일/미리보기 생성과 원본 재인코딩은 백그라운드에서 (status: PROCESSING → READY)
+            img = blobs.store(image, image.name)
             img_ids.append(img.id)
         
         return Response({"image_ids": img_ids}, status=status.HTTP_201_CREATED)
 
 
+class UploadInitView(APIView):
+    """
+    POST /api/chat/uploads/   { "filename": "a.jpg", "size": 1234567, "sha256": "..." }
+    분할 업로드 시작. 응답의 upload_id로 조각을 보냄.
+    """
 
+    permission_classes = [permissions.IsAuthenticated]
 
-        
-        
+    def post(self, request):
+        retry_after = ratelimit.take_upload(request.user.id, 1)
+        if retry_after:
+            return Response(
+                {"error": "업로드 요청이 너무 많습니다. 잠시 후 다시 시도해 주세요.",
+                 "retry_after": round(retry_after, 2)},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+        try:
+            session = uploads.init(
+                request.user,
+                filename=str(request.data.get("filename", "")),
+                size=int(request.data.get("size", 0)),
+                sha256=str(request.data.get("sha256", "")),
+            )
+        except (TypeError, ValueError):
+            return Response({"error": "size는 정수여야 합니다."}, status=status.HTTP_400_BAD_REQUEST)
+        except uploads.UploadError as e:
+            return Response({"error": str(e)}, status=e.status)
+
+        return Response(
+            {"upload_id": session.id, "received": 0, "chunk_size": uploads.UPLOAD_CHUNK_SIZE},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class UploadChunkView(APIView):
+    """
+    GET /api/chat/uploads/<upload_id>/   → 지금까지 받은 byte 수 (끊긴 뒤 이어 보낼 위치)
+    PUT /api/chat/uploads/<upload_id>/   본문 = 조각의 raw bytes, 헤더 Upload-Offset = 조각 시작 위치
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def _session(self, request, upload_id):
+        return UploadSession.objects.filter(id=upload_id, user=request.user).first()
+
+    def get(self, request, upload_id):
+        session = self._session(request, upload_id)
+        if session is None:
+            return Response({"error": "업로드를 찾을 수 없습니다."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"received": session.received, "size": session.size, "status": session.status})
+
+    def put(self, request, upload_id):
+        session = self._session(request, upload_id)
+        if session is None:
+            return Response({"error": "업로드를 찾을 수 없습니다."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.headers["Content-Length"])
+        except (KeyError, ValueError):
+            return Response({"error": "Upload-Offset, Content-Length 헤더가 필요합니다."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # request.data를 쓰지 않고 본문을 직접 조금씩 읽어서 파일에 씀 (전체를 메모리/임시파일에 올리지 않음)
+            received = uploads.append(session, offset, request._request, length)
+        except uploads.UploadError as e:
+            return Response({"error": str(e), "received": session.received}, status=e.status)
+        return Response({"received": received, "size": session.size})
+
+
+class UploadCompleteView(APIView):
+    """
+    POST /api/chat/uploads/<upload_id>/complete/
+    다 받았으면 sha256을 확인하고 이미지로 등록 → 기존 업로드와 같은 image_ids 응답
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, upload_id):
+        session = UploadSession.objects.filter(id=upload_id, user=request.user).first()
+        if session is None:
+            return Response({"error": "업로드를 찾을 수 없습니다."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            image = uploads.complete(session)
+        except uploads.UploadError as e:
+            return Response({"error": str(e)}, status=e.status)
+
+        return Response({"image_ids": [image.id]}, status=status.HTTP_201_CREATED)
@@ -0,0 +1,227 @@
+# apps/chat/writer.py
+import asyncio
+import atexit
+import logging
+from typing import List, Optional
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from . import sequence
+from .groups import room_group, wire_event
+from .models import ChatMessage, Image
+from .signals import messages_created
+
+logger = logging.getLogger(__name__)
+
+WRITE_QUEUE_MAX = 1000        # 워커당 저장 대기 메시지 최대 개수 (가득 차면 보내는 쪽이 기다림)
+WRITE_BATCH_SIZE = 100        # bulk_create 한 번에 넣을 최대 개수
+WRITE_FLUSH_INTERVAL = 0.05   # sec. 첫 메시지가 들어온 뒤 이 시간만큼 더 모아서 저장
+WRITE_FLUSH_TIMEOUT = 5       # sec. 연결 종료 시 자기 메시지가 저장되기를 기다리는 최대 시간
+
+
+def _save(batch: List[dict]) -> List[ChatMessage]:
+    """
+    대기 메시지들을 bulk_create로 저장하고 이미지를 연결 (트랜잭션 하나).
+    """
+    objs = [
+        ChatMessage(room_id=item["room_id"], sender_id=item["sender_id"],
+                    text=item["text"], seq=item["seq"])
+        for item in batch
+    ]
+    with transaction.atomic():
+        created = ChatMessage.objects.bulk_create(objs)
+        for item, msg in zip(batch, created):
+            if item["img_ids"]:
+                Image.objects.filter(id__in=item["img_ids"], message__isnull=True).update(message=msg)
+    return created
+
+
+def _after_save(saved: List[tuple]) -> None:
+    """
+    저장이 끝난 메시지의 후처리 (시그널 receiver, 방 Stream 보관).
+    메시지는 이미 커밋됐으므로 여기서 실패해도 다시 저장하지 않고 로그만 남김.
+    """
+    # receiver 하나가 실패해도 나머지는 실행됨 (실패는 django.dispatch 로거에 남음)
+    messages_created.send_robust(sender=ChatMessage, messages=[msg for _, msg in saved])
+
+    # 저장이 끝난 (실제 id가 있는) 메시지를 방 Stream에 보관
+    entries = {}
+    for item, msg in saved:
+        payload = {**item["payload"], "id": msg.pk, "provisional": False,
+                   "created_at": msg.created_at.isoformat()}
+        entries.setdefault(item["room_id"], []).append((item["seq"], payload))
+    for room_id, room_entries in entries.items():
+        try:
+            sequence.append(room_id, room_entries)
+        except Exception:
+            logger.exception("failed to append %d messages to room %s stream", len(room_entries), room_id)
+
+
+def persist_batch(batch: List[dict]) -> List[dict]:
+    """
+    배치를 저장. 배치 전체가 실패하면(삭제된 방 등) 한 건씩 다시 저장해서
+    문제 있는 메시지만 실패 처리함. 다시 저장하는 건 트랜잭션이 실패했을 때뿐.
+    반환: 확정 이벤트 목록 (client_msg_id → 실제 id, 실패하면 id=None)
+    """
+    try:
+        saved = list(zip(batch, _save(batch)))
+    except Exception:
+        logger.exception("bulk persist failed, retrying one by one (%d messages)", len(batch))
+        saved = []
+        for item in batch:
+            try:
+                saved.append((item, _save([item])[0]))
+            except Exception:
+                logger.exception("failed to persist message %s", item["client_msg_id"])
+                saved.append((item, None))
+
+    stored = [(item, msg) for item, msg in saved if msg is not None]
+    if stored:
+        _after_save(stored)
+
+    results = []
+    for item, msg in saved:
+        result = {
+            "room_id": item["room_id"],
+            "client_msg_id": item["client_msg_id"],
+            "seq": item["seq"],
+            "id": None,
+        }
+        if msg is not None:
+            result.update(id=msg.pk, created_at=msg.created_at.isoformat())
+        results.append(result)
+    return results
+
+
+class MessageWriter:
+    """
+    write-behind 모드에서 메시지를 모아서 저장하는 워커(프로세스)당 하나뿐인 writer.
+
+    consumer는 임시 id(client_msg_id)와 순번(seq)으로 먼저 브로드캐스트하고
+    submit()으로 넘기기만 함 → writer가 bulk_create로 저장한 뒤
+    방에 chat_message_saved(실패 시 id=None) 이벤트로 실제 id를 알려줌.
+    """
+
+    def __init__(self, maxsize=WRITE_QUEUE_MAX, batch_size=WRITE_BATCH_SIZE,
+                 flush_interval=WRITE_FLUSH_INTERVAL, flush_timeout=WRITE_FLUSH_TIMEOUT):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.flush_timeout = flush_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._progress: Optional[asyncio.Condition] = None
+        self._inflight: List[dict] = []  # 대기열에서 꺼냈지만 아직 저장이 끝나지 않은 배치
+        self._submitted = 0  # 지금까지 대기열에 넣은 수
+        self._done = 0       # 그중 처리가 끝난 수 (대기열 순서대로 처리하므로 앞에서부터)
+
+    def _running(self) -> bool:
+        # 이벤트 루프가 바뀌었으면(테스트 등) 이전 루프의 task는 더 이상 돌지 않음
+        return (self._task is not None and not self._task.done()
+                and self._task.get_loop() is asyncio.get_running_loop())
+
+    def _ensure_started(self):
+        if self._running():
+            return
+        # 이전 루프에서 남은 메시지(꺼내 둔 배치 + 대기열)는 새 대기열로 옮겨서 이어서 저장
+        leftover, self._inflight = self._inflight, []
+        if self._queue is not None:
+            while not self._queue.empty():
+                leftover.append(self._queue.get_nowait())
+        self._queue = asyncio.Queue(maxsize=max(self.maxsize, len(leftover)))
+        for item in leftover:
+            self._queue.put_nowait(item)
+        self._progress = asyncio.Condition()
+        self._done = self._submitted - len(leftover)
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, item: dict) -> None:
+        """
+        저장 대기열에 추가. 대기열이 가득 차면 자리가 날 때까지 기다림 (bounded).
+        """
+        self._ensure_started()
+        await self._queue.put(item)
+        self._submitted += 1
+
+    def _take(self, batch: List[dict]) -> None:
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return
+
+    async def _run(self):
+        while True:
+            self._inflight = [await self._queue.get()]
+            # 조금 더 기다리면서 같이 저장할 메시지를 모음
+            await asyncio.sleep(self.flush_interval)
+            self._take(self._inflight)
+            batch = self._inflight
+            try:
+                await self._write(batch)
+            except Exception:
+                # 배치 하나가 실패해도 writer는 계속 돌아야 대기열의 나머지가 저장됨
+                logger.exception("failed to write batch of %d messages", len(batch))
+            self._inflight = []
+            for _ in batch:
+                self._queue.task_done()
+            async with self._progress:
+                self._done += len(batch)
+                self._progress.notify_all()
+
+    async def _write(self, batch: List[dict]) -> None:
+        results = await database_sync_to_async(persist_batch)(batch)
+        channel_layer = get_channel_layer()
+        for result in results:
+            await channel_layer.group_send(
+                room_group(result["room_id"]),
+                wire_event("chat_message_saved",
+                           {"event": "message_saved", "created_at": None, **result}),
+            )
+
+    async def flush(self) -> None:
+        """
+        지금까지 넣은 메시지가 저장될 때까지 기다림 (연결 종료 시 호출).
+        그 뒤에 다른 연결이 넣은 메시지는 기다리지 않고, 최대 flush_timeout까지만 기다림.
+        """
+        if not self._running():
+            return
+        mark = self._submitted
+        try:
+            async with self._progress:
+                await asyncio.wait_for(
+                    self._progress.wait_for(lambda: self._done >= mark), self.flush_timeout
+                )
+        except asyncio.TimeoutError:
+            logger.warning("writer flush timed out after %ss (%d messages pending)",
+                           self.flush_timeout, mark - self._done)
+
+    def flush_sync(self) -> None:
+        """
+        프로세스 종료 직전(이벤트 루프가 이미 멈춘 뒤) 남은 메시지를 동기로 저장.
+        이 시점엔 브로드캐스트할 연결이 없으므로 저장만 함.
+        """
+        if self._inflight:
+            # 저장 도중에 루프가 멈췄을 수 있으므로 이미 저장된 (room, seq)는 빼고 저장
+            batch, self._inflight = self._inflight, []
+            saved = set(
+                ChatMessage.objects.filter(
+                    room_id__in={item["room_id"] for item in batch},
+                    seq__in={item["seq"] for item in batch},
+                ).values_list("room_id", "seq")
+            )
+            batch = [item for item in batch if (item["room_id"], item["seq"]) not in saved]
+            if batch:
+                persist_batch(batch)
+        if self._queue is None:
+            return
+        while not self._queue.empty():
+            batch: List[dict] = []
+            self._take(batch)
+            persist_batch(batch)
+
+
+message_writer = MessageWriter()
+atexit.register(message_writer.flush_sync)
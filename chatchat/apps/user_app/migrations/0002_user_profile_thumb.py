@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-17 11:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="profile_thumb",
+            field=models.ImageField(blank=True, null=True, upload_to="profile/thumb/"),
+        ),
+    ]
@@ -10,6 +10,7 @@ class User(AbstractUser):
     GENDER = (("남", "Male"), ("여", "Female"))
     gender      = models.CharField(max_length=1, choices=GENDER, blank=True, null=True)
     profile_img = models.ImageField(upload_to="profile/", blank=True, null=True)
+    profile_thumb = models.ImageField(upload_to="profile/thumb/", blank=True, null=True)  # 목록용 작은 프로필 (자동 생성)
     birth_date = models.DateField(blank=True, null=True)
     name = models.CharField(max_length=100, blank=True, null=True)
     nickname = models.CharField(max_length=100, blank=True, null=True)
@@ -182,6 +182,31 @@ REST_FRAMEWORK = {
 
 }
 
+#____________________________________________________________
+# 채팅 설정
+# write-behind 모드: 메시지를 임시 id로 먼저 브로드캐스트하고, 저장은 워커의 writer가 모아서 처리
+CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "0") == "1"
+
+# 연결마다 보낼 프레임 대기열 크기. 느린 클라이언트 하나가 워커 메모리를 키우지 못하게 제한
+#   drop_reads: 가득 차면 오래된 읽음 이벤트부터 버리고, 버릴 게 없으면 resync(4008) 코드로 종료
+#   close:      가득 차면 바로 resync(4008) 코드로 종료
+CHAT_SEND_QUEUE_MAX = int(os.getenv("CHAT_SEND_QUEUE_MAX", "200"))
+CHAT_SEND_QUEUE_POLICY = os.getenv("CHAT_SEND_QUEUE_POLICY", "drop_reads")
+
+# Redis 토큰 버킷 (apps/chat_app/ratelimit.py). 이름: (초당 충전량, 최대 버스트)
+CHAT_RATE_LIMITS = {
+    "message_user": (2, 10),    # 유저 한 명이 보내는 메시지
+    "message_room": (20, 60),   # 방 하나에 들어오는 메시지 (모든 참가자 합산)
+    "upload_user": (0.5, 10),   # 유저 한 명이 올리는 이미지 수 (버스트 = 한 요청의 최대 이미지 수, 넘으면 413)
+}
+
+# 오프라인 참가자 푸시 알림을 실제로 보내는 클래스 (send(pushes) → 무효 토큰 목록)
+# 기본값은 보내지 않고 로그/outbox에만 남기는 로컬 sender
+CHAT_PUSH_SENDER = os.getenv("CHAT_PUSH_SENDER", "chatchat.apps.chat_app.notifications.LocalPushSender")
+
+# 분할 업로드(apps/chat_app/uploads.py) 조각을 이어 쓰는 임시 파일 위치
+CHAT_UPLOAD_DIR = BASE_DIR / "upload_parts"
+
 #____________________________________________________________
 AUTH_USER_MODEL = "user_app.User"
 #커스텀 유저 모델 설정, request.user로 유저 정보 가져올 때 이 모델을 사용함